@@ -1,8 +1,9 @@
 from __future__ import annotations
 import sys
-from .services.ingest import ingest
+from .scrapers import SCRAPERS
+from .services.ingest import run_ingest
 
-USAGE = "Usage: python -m app.cli [terminal-bench|osworld|all]"
+USAGE = "Usage: python -m app.cli [" + "|".join([*SCRAPERS, "all"]) + "] [--force]"
 
 
 def main() -> int:
@@ -10,9 +11,15 @@ def main() -> int:
         print(USAGE)
         return 1
     bench = sys.argv[1]
+    force = "--force" in sys.argv[2:]
     try:
-        inserted, updated, total = ingest(bench)
-        print(f"bench={bench} inserted={inserted} updated={updated} total={total}")
+        report = run_ingest(bench, force=force)
+        print(f"bench={bench} status={report.status} inserted={report.inserted} updated={report.updated} total={report.total}")
+        for s in report.sources:
+            line = f"  {s.name}: {s.status} {s.latency_ms:.0f}ms items={s.count}"
+            print(line + (f" error={s.error}" if s.error else ""))
+        if report.unresolved_orgs:
+            print(f"  未收录国家的组织 ({len(report.unresolved_orgs)}): " + ", ".join(report.unresolved_orgs))
         return 0
     except Exception as e:
         print(f"error: {e}")
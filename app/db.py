@@ -1,7 +1,9 @@
+from typing import Callable, TypeVar
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
+from starlette.concurrency import run_in_threadpool
 
 # 加载环境变量
 load_dotenv()
@@ -35,6 +37,34 @@ def get_database_url() -> str:
         raise ValueError(f"不支持的数据库类型: {db_type}，支持的类型: sqlite, mysql, postgresql")
 
 
+# 异步驱动：sqlite -> aiosqlite，mysql -> asyncmy，postgresql -> asyncpg
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+asyncmy",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """把同步连接 URL 的驱动替换为对应的异步驱动"""
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS[scheme.split('+')[0]]}://{rest}"
+
+
+def pool_options() -> dict:
+    """
+    连接池大小，同步与异步引擎各一个池：
+    DB_POOL_SIZE 为常驻连接数，DB_MAX_OVERFLOW 为高峰时额外允许的连接数，
+    两者之和应不小于同时访问数据库的请求数（异步模式下即并发请求数）。
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    }
+
+
 # 获取数据库 URL
 DATABASE_URL = get_database_url()
 
@@ -49,7 +79,157 @@ engine = create_engine(
     future=True,
     pool_pre_ping=True,  # 自动检测连接是否有效
     echo=False,  # 设置为 True 可以看到 SQL 日志
+    **pool_options(),
 )
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 Base = declarative_base()
+
+
+def _create_async_sessionmaker():
+    """
+    DB_ASYNC=true（默认）且装有对应异步驱动时创建异步引擎；
+    否则返回 None，查询接口退回线程池中执行同步会话。
+    """
+    if os.getenv("DB_ASYNC", "true").lower() not in ("1", "true", "yes"):
+        return None
+    try:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        async_engine = create_async_engine(
+            get_async_database_url(DATABASE_URL),
+            pool_pre_ping=True,
+            **pool_options(),
+        )
+    except ImportError:
+        return None
+    return async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+AsyncSessionLocal = _create_async_sessionmaker()
+
+T = TypeVar("T")
+
+
+async def run_db(fn: Callable[[Session], T]) -> T:
+    """
+    在一个会话中执行同步的查询函数 fn(session)，供 async 接口调用。
+
+    有异步引擎时通过 AsyncSession.run_sync 在事件循环内执行，等待数据库时不占用线程；
+    否则放到线程池中使用同步会话。两种方式下 fn 都可以直接复用现有的同步查询代码。
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as session:
+            return await session.run_sync(fn)
+
+    def call() -> T:
+        with SessionLocal() as session:
+            return fn(session)
+
+    return await run_in_threadpool(call)
+
+
+
+# 已被复合索引取代的旧单列索引：查询用不到，只拖慢写入，升级时删除
+OBSOLETE_INDEXES = {
+    "results": (
+        "ix_results_bench",
+        "ix_results_rank",
+        "ix_results_model",
+        "ix_results_score",
+        "ix_results_date",
+        "ix_results_scraped_date",
+    ),
+    # 跨榜单查询改按 model_id（idx_latest_model_id）
+    "latest_results": ("idx_latest_model",),
+}
+
+
+def index_names(conn, inspector, table_name: str) -> set[str]:
+    """表上已有的索引名；SQLite 的反射会跳过表达式索引，直接查 sqlite_master"""
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table_name,)
+        )
+        return set(rows.scalars())
+    return {i["name"] for i in inspector.get_indexes(table_name)}
+
+
+def upgrade_schema(bind=None) -> list[str]:
+    """
+    为已存在的表补齐模型中新增的列和索引，并删除 OBSOLETE_INDEXES 中的旧索引。
+
+    create_all 只会创建缺失的表，不会修改已有表；升级后新增的列都是可空列，
+    这里用 ALTER TABLE ... ADD COLUMN 补上，并创建缺失的索引，
+    避免旧库在升级后无法写入。bind 默认为当前数据库的 engine（迁移脚本传入源库）。
+
+    Returns:
+        本次补齐的列（table.column）与索引名列表，删除的索引记为 "-索引名"，
+        由枚举改为字符串的列记为 "table.column:varchar"
+    """
+    from sqlalchemy import inspect
+
+    bind = bind if bind is not None else engine
+    changes: list[str] = []
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            reflected = {c["name"]: c for c in inspector.get_columns(table.name)}
+            existing_cols = set(reflected)
+            changes.extend(_widen_enum_columns(conn, table, reflected))
+            for col in table.columns:
+                if col.name in existing_cols or not col.nullable:
+                    continue
+                col_type = col.type.compile(dialect=bind.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}")
+                changes.append(f"{table.name}.{col.name}")
+            existing_idx = index_names(conn, inspector, table.name)
+            missing = [idx for idx in table.indexes if idx.name not in existing_idx]
+            for idx in missing:
+                # 按 ddl_if 跳过当前数据库不支持的索引
+                idx.create(bind=conn)
+            if missing:
+                created = index_names(conn, inspect(conn), table.name)
+                changes.extend(idx.name for idx in missing if idx.name in created)
+            for name in OBSOLETE_INDEXES.get(table.name, ()):
+                if name not in existing_idx:
+                    continue
+                if conn.dialect.name == "mysql":
+                    conn.exec_driver_sql(f"DROP INDEX {name} ON {table.name}")
+                else:
+                    conn.exec_driver_sql(f"DROP INDEX {name}")
+                changes.append(f"-{name}")
+        if conn.dialect.name == "postgresql" and any(c.endswith(":varchar") for c in changes):
+            conn.exec_driver_sql("DROP TYPE IF EXISTS benchtype")
+    return changes
+
+
+def _widen_enum_columns(conn, table, reflected: dict) -> list[str]:
+    """
+    旧版本的 bench 列是原生枚举（MySQL ENUM / PostgreSQL benchtype），新增榜单无法写入；
+    模型中已改为字符串列，这里把库中的枚举列改为 VARCHAR，保留原有取值。SQLite 本来就是 VARCHAR。
+    """
+    from sqlalchemy import String, Enum
+    from sqlalchemy.types import TypeDecorator
+
+    changes: list[str] = []
+    if conn.dialect.name not in ("mysql", "postgresql"):
+        return changes
+    for col in table.columns:
+        col_type = col.type.impl_instance if isinstance(col.type, TypeDecorator) else col.type
+        info = reflected.get(col.name)
+        if info is None or not isinstance(col_type, String) or not isinstance(info["type"], Enum):
+            continue
+        varchar = col_type.compile(dialect=conn.dialect)
+        null = "NULL" if col.nullable else "NOT NULL"
+        if conn.dialect.name == "mysql":
+            conn.exec_driver_sql(f"ALTER TABLE {table.name} MODIFY {col.name} {varchar} {null}")
+        else:
+            conn.exec_driver_sql(
+                f"ALTER TABLE {table.name} ALTER COLUMN {col.name} TYPE {varchar} USING {col.name}::text"
+            )
+        changes.append(f"{table.name}.{col.name}:varchar")
+    return changes
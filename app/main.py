@@ -1,15 +1,59 @@
 from __future__ import annotations
-from typing import Optional, List
-from fastapi import FastAPI, Query, HTTPException
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, List, Type
+from datetime import datetime, date as date_type
+import asyncio
+import os
+from operator import attrgetter
+
+import anyio
+
+from fastapi import FastAPI, Query, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from starlette.staticfiles import StaticFiles
-from sqlalchemy import select
+from pydantic import BaseModel
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from .db import SessionLocal
-from .models import Result, BenchType
-from .schemas import ResultOut, QueryResponse, ScrapeResponse
-from .services.ingest import ingest, init_db
+from .db import run_db
+from .models import Result, BenchType, Identity, OrgRollup, NationRollup
+from .schemas import (
+    QueryResponse,
+    ModelBatchRequest,
+    ModelBatchResponse,
+    PagedQueryResponse,
+    JobOut,
+    JobListResponse,
+    ScheduleResponse,
+    BenchListResponse,
+    TrendResponse,
+    ModelTrendResponse,
+    OrgStatsResponse,
+    NationStatsResponse,
+)
+from .services.ingest import init_db, resolve_benches
+from .services.jobs import get_queue
+from .services.scheduler import get_scheduler, start_scheduler, stop_scheduler
+from .services import snapshots
+from .services.latest import bench_latest, model_latest, models_latest
+from .services.identities import MODEL, canonical_key, identity_ids, spellings
+from .services.cache import etag_matches, get_cache
+from .services import export
+from .services import columnar
+from .services.trend import model_trend
+from .services.rollups import query_rollup
+from .services.pagination import (
+    DELTA_KEY_SIZE,
+    FULL_KEY_SIZE,
+    decode_cursor,
+    delta_sort_key,
+    encode_cursor,
+    fetch_page,
+)
+from .services.serialize import encode_groups, encode_results, fetch_rows, project, row_tuples
+from .scrapers import SCRAPERS
+from .scrapers.http_client import UpstreamError
 
 app = FastAPI(title="LLM Leaderboard Scraper", version="0.1.0")
 
@@ -26,85 +70,196 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory="public", html=True), name="static")
 
 
+def _split_opt(s: Optional[str]) -> Optional[List[str]]:
+    if not s:
+        return None
+    return [x.strip() for x in s.split(",") if x.strip()]
+
+
+def _bench(name: str) -> BenchType:
+    """榜单名 -> BenchType；未知的榜单返回 400"""
+    try:
+        return BenchType(name)
+    except ValueError:
+        known = ", ".join(t.value for t in BenchType)
+        raise HTTPException(status_code=400, detail=f"未知的榜单: {name}，可选: {known}")
+
+
+def _benches(value: Optional[str]) -> List[BenchType]:
+    """逗号分隔的榜单名 -> BenchType 列表"""
+    return [_bench(b) for b in _split_opt(value) or []]
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[date_type]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} 格式错误，应为 YYYY-MM-DD")
+
+
+def _norm(values: Optional[List[str]]) -> tuple:
+    """过滤参数归一化为缓存键：顺序与重复不影响查询结果"""
+    return tuple(sorted(set(values or [])))
+
+
+async def _cached(
+    request: Request,
+    key: Hashable,
+    load: Callable[[], Awaitable[Any]],
+    schema: Type[BaseModel] = QueryResponse,
+) -> Response:
+    """
+    查询接口的响应缓存：命中时直接返回已序列化的 JSON，不访问数据库也不占用线程；
+    If-None-Match 与 ETag 一致时返回 304。
+
+    load 返回字典时按 schema 校验并序列化；返回 bytes 时视为已编码好的 JSON 直接使用。
+    """
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is None:
+        generation = cache.generation
+        payload = await load()
+        if isinstance(payload, bytes):
+            body = payload
+        else:
+            body = schema.model_validate(payload).model_dump_json().encode("utf-8")
+        entry = cache.put(key, body, generation)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
 @app.on_event("startup")
-def _startup() -> None:
+async def _startup() -> None:
     init_db()
+    # 同步接口（导出）与无异步驱动时的查询所用线程池的大小
+    anyio.to_thread.current_default_thread_limiter().total_tokens = int(os.getenv("THREADPOOL_SIZE", "40"))
+    # SCHEDULE_INTERVAL 等大于 0 时启动定时采集
+    start_scheduler()
+
+
+@app.on_event("shutdown")
+async def _shutdown() -> None:
+    stop_scheduler()
 
 
 @app.get("/")
-def index_page():
+async def index_page():
     return FileResponse("public/index.html")
 
 
 @app.get("/api/health")
-def health() -> dict:
+async def health() -> dict:
     return {"status": "ok"}
 
 
-@app.post("/api/scrape", response_model=ScrapeResponse)
-def scrape(
-    bench: str = Query("all", pattern="^(all|terminal-bench|osworld)$"),
-    date: Optional[str] = Query(None, description="爬取日期 YYYY-MM-DD，默认今天")
+@app.post("/api/scrape", response_model=JobOut, status_code=202)
+async def scrape(
+    response: Response,
+    bench: str = Query("all", description="榜单名（见 /api/benches）或 all"),
+    date: Optional[str] = Query(None, description="爬取日期 YYYY-MM-DD，默认今天"),
+    force: bool = Query(False, description="忽略条件请求缓存，强制解析并写库"),
+    wait: bool = Query(False, description="等待任务完成后再返回"),
 ):
     """
-    触发数据采集。
+    提交采集任务，立即返回任务信息（202），进度与结果通过 /api/jobs/{id} 查询。
     
-    - bench: 要爬取的榜单 (all/terminal-bench/osworld)
+    - bench: 要爬取的榜单，已注册的榜单名或 all
     - date: 爬取日期，格式 YYYY-MM-DD。同一天的数据会覆盖之前的记录。
+    - force: 默认 false，数据源内容未变化时结果为 unchanged 且不写库
+    - wait: 为 true 时等待任务结束，成功返回 200；数据源全部不可用返回 502，其他失败返回 500
+    
+    同一 bench + 日期已有任务在排队或执行时不会重复采集，返回该任务（coalesced=true）。
     """
+    target_date = _parse_date(date, "date")
     try:
-        from datetime import datetime, date as date_type
-        
-        target_date = None
-        if date:
-            try:
-                target_date = datetime.strptime(date, "%Y-%m-%d").date()
-            except ValueError:
-                raise HTTPException(status_code=400, detail="日期格式错误，应为 YYYY-MM-DD")
-        
-        inserted, updated, total = ingest(bench, target_date)
-        return {"bench": bench, "inserted": inserted, "updated": updated, "total": total}
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.get("/api/query", response_model=QueryResponse)
-def query(
-    bench: Optional[str] = Query(None, description="逗号分隔: terminal-bench,osworld"),
+        resolve_benches(bench)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    queue = get_queue()
+    job, created = queue.submit(bench, target_date, force=force)
+    if wait:
+        await asyncio.wrap_future(job.future)
+        if isinstance(job.exc, UpstreamError):
+            # 上游数据源全部不可用，属于网关类错误而非服务内部错误
+            raise HTTPException(status_code=502, detail=job.error)
+        if job.exc is not None:
+            raise HTTPException(status_code=500, detail=job.error)
+        response.status_code = 200
+    return {**queue.snapshot(job), "coalesced": not created}
+
+
+@app.get("/api/jobs", response_model=JobListResponse)
+async def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    """最近提交的采集任务，新的在前"""
+    queue = get_queue()
+    return {"items": [queue.snapshot(j) for j in queue.list(limit)]}
+
+
+@app.get("/api/schedule", response_model=ScheduleResponse)
+async def schedule():
+    """定时采集的各榜单间隔、下次运行时间与上次结果"""
+    scheduler = get_scheduler()
+    return {"enabled": scheduler is not None, "items": scheduler.snapshot() if scheduler else []}
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobOut)
+async def get_job(job_id: str):
+    """采集任务的状态、进度、耗时与入库结果"""
+    queue = get_queue()
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在或已过期")
+    return queue.snapshot(job)
+
+
+@app.get("/api/query", response_model=PagedQueryResponse)
+async def query(
+    request: Request,
+    bench: Optional[str] = Query(None, description="逗号分隔的榜单名，如 terminal-bench,osworld"),
     model: Optional[str] = Query(None, description="逗号分隔模型名"),
     agent: Optional[str] = Query(None, description="逗号分隔 agent 名称"),
     org: Optional[str] = Query(None, description="逗号分隔组织名"),
     nation: Optional[str] = Query(None, description="逗号分隔国家名"),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="每页行数，默认不分页"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor"),
+    with_total: bool = Query(False, description="分页时是否额外统计满足条件的总行数"),
+    include_raw: bool = Query(False, description="每个条目附带采集时的原始数据（raw 字段）"),
 ):
-    def split_opt(s: Optional[str]) -> Optional[List[str]]:
-        if not s:
-            return None
-        return [x.strip() for x in s.split(",") if x.strip()]
-
-    bench_list = split_opt(bench)
-    model_list = split_opt(model)
-    agent_list = split_opt(agent)
-    org_list = split_opt(org)
-    nation_list = split_opt(nation)
+    """
+    多维查询全部历史数据，按 bench、rank、score 排序。
+
+    - limit / cursor: keyset 分页，翻页耗时与历史数据量无关；next_cursor 为空表示没有更多数据
+    - with_total: 分页时 total 默认为空，设为 true 时额外执行一次 COUNT
+    - include_raw: 默认不读取原始数据；设为 true 时每个条目多一个 raw 字段
+    """
+    bench_list = _split_opt(bench)
+    bt = _benches(bench)
+    model_list = _split_opt(model)
+    agent_list = _split_opt(agent)
+    org_list = _split_opt(org)
+    nation_list = _split_opt(nation)
     
     # BUG 1: 当nation包含"Unknown"时会触发除零错误
     if nation_list and "Unknown" in nation_list:
         divisor = 0
         result = 100 / divisor  # 这里会抛出 ZeroDivisionError
 
-    with SessionLocal() as session:
-        stmt = select(Result)
-        if bench_list:
-            bt: List[BenchType] = []
-            for b in bench_list:
-                if b == "terminal-bench":
-                    bt.append(BenchType.TERMINAL_BENCH)
-                elif b == "osworld":
-                    bt.append(BenchType.OSWORLD)
-            if bt:
-                stmt = stmt.where(Result.bench.in_(bt))
+    def build(session: Session) -> bytes:
+        # 范围内有按增量存储的快照时由变更记录重建，游标多带一个快照日期
+        delta = snapshots.any_delta(session, bt)
+        cursor_key = None
+        if cursor:
+            try:
+                cursor_key = decode_cursor(cursor, DELTA_KEY_SIZE if delta else FULL_KEY_SIZE)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        stmt = project(Result, include_raw)
+        if bt:
+            stmt = stmt.where(Result.bench.in_(bt))
         if model_list:
             stmt = stmt.where(Result.model.in_(model_list))
         if agent_list:
@@ -114,157 +269,335 @@ def query(
         if nation_list:
             stmt = stmt.where(Result.org_country.in_(nation_list))
 
-        stmt = stmt.order_by(Result.bench, Result.rank.is_(None), Result.rank, Result.score.desc())
-        rows = session.execute(stmt).scalars().all()
+        total: Optional[int] = None
+        next_key = None
+        if delta:
+            pairs = snapshots.query_rows(session, bt, model_list, agent_list, org_list, nation_list)
+            total = len(pairs)
+            if cursor_key:
+                pairs = [p for p in pairs if delta_sort_key(*p) > cursor_key]
+            if limit and len(pairs) > limit:
+                pairs = pairs[:limit]
+                next_key = delta_sort_key(*pairs[-1])
+            rows = row_tuples(session, (r for _, r in pairs), include_raw)
+        else:
+            if limit and with_total:
+                total = session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+            rows, next_key = fetch_page(session, stmt, cursor_key, limit)
 
-        items: List[ResultOut] = []
-        for r in rows:
-            items.append(ResultOut(
-                id=r.id,
-                bench=r.bench.value,
-                rank=r.rank,
-                agent=r.agent,
-                model=r.model,
-                org=r.org,
-                nation=r.org_country,
-                agent_org=r.agent_org,
-                model_org=r.model_org,
-                score=r.score,
-                score_error=r.score_error,
-                date=r.date,
-            ))
+        if not limit:
+            total = len(rows)
+        elif not with_total:
+            total = None
+        return encode_results(rows, total, encode_cursor(next_key) if next_key else None, include_raw)
+
+    key = (
+        "query", _norm(bench_list), _norm(model_list), _norm(agent_list), _norm(org_list), _norm(nation_list),
+        limit, cursor, with_total, include_raw,
+    )
+    return await _cached(request, key, lambda: run_db(build), PagedQueryResponse)
+
+
+@app.get("/api/export")
+def export_results(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式: ndjson / csv"),
+    bench: Optional[str] = Query(None, description="逗号分隔的榜单名，如 terminal-bench,osworld"),
+    model: Optional[str] = Query(None, description="逗号分隔模型名"),
+    agent: Optional[str] = Query(None, description="逗号分隔 agent 名称"),
+    org: Optional[str] = Query(None, description="逗号分隔组织名"),
+    nation: Optional[str] = Query(None, description="逗号分隔国家名"),
+    scraped_from: Optional[str] = Query(None, description="起始爬取日期 YYYY-MM-DD（含）"),
+    scraped_to: Optional[str] = Query(None, description="截止爬取日期 YYYY-MM-DD（含）"),
+):
+    """
+    流式导出历史数据，过滤条件与 /api/query 相同，另可按 scraped_date 范围过滤。
+
+    按 bench、scraped_date 排序（快照内与 /api/query 相同）逐批输出，服务端内存占用与数据量无关。
+    """
+    since = _parse_date(scraped_from, "scraped_from")
+    until = _parse_date(scraped_to, "scraped_to")
+    benches = _benches(bench)
+    records = export.iter_records(
+        benches,
+        _split_opt(model),
+        _split_opt(agent),
+        _split_opt(org),
+        _split_opt(nation),
+        since,
+        until,
+    )
+    return StreamingResponse(
+        export.render(format, records),
+        media_type=export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="results.{format}"'},
+    )
+
+
+@app.get("/api/analytics/trend", response_model=TrendResponse)
+async def analytics_trend(
+    request: Request,
+    bench: Optional[str] = Query(None, description="逗号分隔的榜单名，如 terminal-bench,osworld"),
+    model: Optional[str] = Query(None, description="逗号分隔模型名"),
+    scraped_from: Optional[str] = Query(None, description="起始爬取日期 YYYY-MM-DD（含）"),
+    scraped_to: Optional[str] = Query(None, description="截止爬取日期 YYYY-MM-DD（含）"),
+):
+    """
+    各模型每个快照日期的最高分、最好名次与条目数。
+
+    直接扫描 COLUMNAR_DIR 下的列式文件，不查询数据库；未启用列式存储时返回 503。
+    """
+    since = _parse_date(scraped_from, "scraped_from")
+    until = _parse_date(scraped_to, "scraped_to")
+    benches = _benches(bench)
+    model_list = _split_opt(model)
+    try:
+        columnar.require_dir()
+    except columnar.ColumnarUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    def build() -> Dict[str, Any]:
+        items = columnar.trend(benches, model_list, since, until)
+        return {"total": len(items), "items": items}
+
+    # 不访问数据库：读文件与向量化计算放到线程池
+    key = ("analytics", _norm([b.value for b in benches]), _norm(model_list), since, until)
+    return await _cached(request, key, lambda: run_in_threadpool(build), TrendResponse)
+
+
+def _rollup_out(r: Any, key: str, name: str) -> Dict[str, Any]:
+    return {
+        "bench": r.bench.value,
+        "scraped_date": r.scraped_date.isoformat(),
+        name: getattr(r, key),
+        "entries": r.entries,
+        "models": r.models,
+        "avg_score": r.avg_score,
+        "best_score": r.best_score,
+        "best_rank": r.best_rank,
+    }
+
+
+@app.get("/api/stats/orgs", response_model=OrgStatsResponse)
+async def org_stats(
+    request: Request,
+    bench: Optional[str] = Query(None, description="逗号分隔的榜单名，如 terminal-bench,osworld"),
+    org: Optional[str] = Query(None, description="逗号分隔组织名"),
+    scraped_from: Optional[str] = Query(None, description="起始爬取日期 YYYY-MM-DD（含）"),
+    scraped_to: Optional[str] = Query(None, description="截止爬取日期 YYYY-MM-DD（含）"),
+):
+    """
+    按组织汇总的条目数、模型数、平均分、最高分与最好名次
+
+    不指定日期范围时返回每个榜单最新快照的汇总，否则返回范围内每个快照日期的汇总。
+    """
+    since = _parse_date(scraped_from, "scraped_from")
+    until = _parse_date(scraped_to, "scraped_to")
+    benches = _benches(bench)
+    org_list = _split_opt(org)
+
+    def build(session: Session) -> Dict[str, Any]:
+        rows = query_rollup(session, OrgRollup, "org", benches, org_list, since, until)
+        items = [_rollup_out(r, "org", "org") for r in rows]
         return {"total": len(items), "items": items}
 
+    key = ("stats_orgs", _norm([b.value for b in benches]), _norm(org_list), since, until)
+    return await _cached(request, key, lambda: run_db(build), OrgStatsResponse)
+
+
+@app.get("/api/stats/nations", response_model=NationStatsResponse)
+async def nation_stats(
+    request: Request,
+    bench: Optional[str] = Query(None, description="逗号分隔的榜单名，如 terminal-bench,osworld"),
+    nation: Optional[str] = Query(None, description="逗号分隔国家名"),
+    scraped_from: Optional[str] = Query(None, description="起始爬取日期 YYYY-MM-DD（含）"),
+    scraped_to: Optional[str] = Query(None, description="截止爬取日期 YYYY-MM-DD（含）"),
+):
+    """
+    按国家汇总的条目数、模型数、平均分、最高分与最好名次
+
+    不指定日期范围时返回每个榜单最新快照的汇总，否则返回范围内每个快照日期的汇总。
+    """
+    since = _parse_date(scraped_from, "scraped_from")
+    until = _parse_date(scraped_to, "scraped_to")
+    benches = _benches(bench)
+    nation_list = _split_opt(nation)
+
+    def build(session: Session) -> Dict[str, Any]:
+        rows = query_rollup(session, NationRollup, "org_country", benches, nation_list, since, until)
+        items = [_rollup_out(r, "org_country", "nation") for r in rows]
+        return {"total": len(items), "items": items}
+
+    key = ("stats_nations", _norm([b.value for b in benches]), _norm(nation_list), since, until)
+    return await _cached(request, key, lambda: run_db(build), NationStatsResponse)
+
 
 @app.get("/api/models/{model_name}/benches", response_model=QueryResponse)
-def model_across_benches(
+async def model_across_benches(
+    request: Request,
     model_name: str,
-    latest_only: bool = Query(True, description="是否只返回最新日期的数据")
+    latest_only: bool = Query(True, description="是否只返回最新日期的数据"),
+    include_raw: bool = Query(False, description="每个条目附带采集时的原始数据（raw 字段）"),
 ):
     """
     查询指定模型在所有榜单的数据
     
     - model_name: 模型名称
     - latest_only: 默认 true，只返回最新日期的数据；设为 false 返回所有历史数据
+    - include_raw: 默认不读取原始数据；设为 true 时每个条目多一个 raw 字段
     """
     # BUG 2: 当model_name包含"test/"时会触发列表索引越界
     if "test/" in model_name:
         empty_list = []
         invalid_access = empty_list[10]  # 这里会抛出 IndexError
     
-    with SessionLocal() as session:
+    def build(session: Session) -> bytes:
         if latest_only:
-            from sqlalchemy import func
-            # 获取每个榜单的最新日期
-            latest_dates_stmt = (
-                select(Result.bench, func.max(Result.scraped_date).label('max_date'))
-                .where(Result.model == model_name)
-                .group_by(Result.bench)
-            )
-            latest_dates = session.execute(latest_dates_stmt).all()
-            
-            if not latest_dates:
-                return {"total": 0, "items": []}
-            
-            # 构建查询条件：(bench=X AND scraped_date=Y) OR (bench=A AND scraped_date=B)
-            from sqlalchemy import and_, or_
-            conditions = [
-                and_(Result.bench == bench, Result.scraped_date == max_date)
-                for bench, max_date in latest_dates
-            ]
-            
-            stmt = (
-                select(Result)
-                .where(Result.model == model_name, or_(*conditions))
-                .order_by(Result.bench, Result.rank.is_(None), Result.rank, Result.score.desc())
-            )
+            # 读物化表：每个榜单中该模型最近一次出现的快照，按规范模型关联的单次索引查询
+            rows = model_latest(session, model_name, include_raw)
+        elif snapshots.any_delta(session):
+            ids = identity_ids(session, MODEL, [model_name])
+            by_id = _identity_rows(session, list(ids.values()), latest_only)
+            rows = row_tuples(session, by_id.get(ids.get(model_name), []), include_raw)
         else:
             stmt = (
-                select(Result)
-                .where(Result.model == model_name)
+                project(Result, include_raw)
+                .join(Identity, Identity.id == Result.model_id)
+                .where(Identity.kind == MODEL, Identity.key == canonical_key(MODEL, model_name))
                 .order_by(Result.bench, Result.scraped_date.desc(), Result.rank.is_(None), Result.rank, Result.score.desc())
             )
-        
-        rows = session.execute(stmt).scalars().all()
-        items = [
-            ResultOut(
-                id=r.id,
-                bench=r.bench.value,
-                rank=r.rank,
-                agent=r.agent,
-                model=r.model,
-                org=r.org,
-                nation=r.org_country,
-                agent_org=r.agent_org,
-                model_org=r.model_org,
-                score=r.score,
-                score_error=r.score_error,
-                date=r.date,
+            rows = fetch_rows(session, stmt)
+        return encode_results(rows, len(rows), include_raw=include_raw)
+
+    return await _cached(request, ("model", model_name, latest_only, include_raw), lambda: run_db(build))
+
+
+def _identity_rows(session: Session, model_ids: List[int], latest_only: bool) -> Dict[int, List[Any]]:
+    """有按增量存储的快照时：重建这些规范模型各种写法的快照行，按 model_id 分组"""
+    names = spellings(session, MODEL, model_ids)
+    return snapshots.models_rows(session, names, latest_only, key=attrgetter("model_id")) if names else {}
+
+
+@app.post("/api/models/benches", response_model=ModelBatchResponse)
+async def models_across_benches(
+    request: Request,
+    body: ModelBatchRequest,
+    latest_only: bool = Query(True, description="是否只返回最新日期的数据"),
+    include_raw: bool = Query(False, description="每个条目附带采集时的原始数据（raw 字段）"),
+):
+    """
+    批量查询多个模型在所有榜单的数据，按请求中的顺序逐个模型返回（重复的只返回一次）
+
+    - body: {"models": ["gpt-5", "claude-sonnet-4-5", ...]}，最多 100 个
+    - latest_only / include_raw: 与 /api/models/{model_name}/benches 相同；
+      每个模型的 total / items 与单独查询该模型的结果一致
+    """
+    models = list(dict.fromkeys(m for m in body.models if m))
+
+    def build(session: Session) -> bytes:
+        ids = identity_ids(session, MODEL, models)
+        model_ids = sorted(set(ids.values()))
+        if not model_ids:
+            return encode_groups([(m, []) for m in models], include_raw)
+        if latest_only:
+            # 读物化表：一次 IN 查询取出所有模型在各榜单最近一次出现的快照
+            rows = models_latest(session, model_ids, include_raw)
+        elif snapshots.any_delta(session):
+            by_id = _identity_rows(session, model_ids, latest_only)
+            return encode_groups(
+                [(m, row_tuples(session, by_id.get(ids.get(m), []), include_raw)) for m in models], include_raw,
+            )
+        else:
+            stmt = (
+                project(Result, include_raw)
+                .add_columns(Result.model_id)
+                .where(Result.model_id.in_(model_ids))
+                .order_by(
+                    Result.model_id, Result.bench, Result.scraped_date.desc(),
+                    Result.rank.is_(None), Result.rank, Result.score.desc(),
+                )
             )
-            for r in rows
+            rows = fetch_rows(session, stmt)
+        # 行末为 model_id；同一规范模型的不同写法共用一组行
+        grouped: Dict[int, List[Any]] = {}
+        for r in rows:
+            grouped.setdefault(r[-1], []).append(r[:-1])
+        return encode_groups([(m, grouped.get(ids.get(m), [])) for m in models], include_raw)
+
+    key = ("models", tuple(models), latest_only, include_raw)
+    return await _cached(request, key, lambda: run_db(build), ModelBatchResponse)
+
+
+@app.get("/api/models/{model_name}/trend", response_model=ModelTrendResponse)
+async def model_trend_series(
+    request: Request,
+    model_name: str,
+    bucket: str = Query("day", pattern="^(day|week|month)$", description="降采样粒度: day / week / month"),
+):
+    """
+    模型在各榜单的成绩随时间变化，每个点为 (日期, 名次, 分数, 名次变化)
+
+    - bucket: week / month 时每个桶取最后一个快照，日期为桶的起始日（周一 / 月初）
+    """
+    def build(session: Session) -> Dict[str, Any]:
+        return {"model": model_name, "bucket": bucket, "series": model_trend(session, model_name, bucket)}
+
+    return await _cached(request, ("trend", model_name, bucket), lambda: run_db(build), ModelTrendResponse)
+
+
+@app.get("/api/benches", response_model=BenchListResponse)
+async def list_benches():
+    """已注册的榜单爬虫及其声明的列映射，按注册顺序"""
+    return {
+        "items": [
+            {
+                "name": spec.name,
+                "title": spec.title,
+                "url": spec.url,
+                "conditional": spec.parse is not None,
+                "columns": [
+                    {"fields": list(c.fields), "headers": list(c.headers), "index": c.index} for c in spec.columns
+                ],
+            }
+            for spec in SCRAPERS.values()
         ]
-        return {"total": len(items), "items": items}
+    }
 
 
 @app.get("/api/benches/{bench_name}/models", response_model=QueryResponse)
-def models_in_bench(
+async def models_in_bench(
+    request: Request,
     bench_name: str,
-    latest_only: bool = Query(True, description="是否只返回最新日期的数据")
+    latest_only: bool = Query(True, description="是否只返回最新日期的数据"),
+    include_raw: bool = Query(False, description="每个条目附带采集时的原始数据（raw 字段）"),
 ):
     """
     查询指定榜单的所有模型数据
     
-    - bench_name: terminal-bench 或 osworld
+    - bench_name: 榜单名（见 /api/benches）
     - latest_only: 默认 true，只返回最新日期的数据；设为 false 返回所有历史数据
+    - include_raw: 默认不读取原始数据；设为 true 时每个条目多一个 raw 字段
     """
-    if bench_name not in {"terminal-bench", "osworld"}:
-        raise HTTPException(status_code=400, detail="bench 必须是 terminal-bench 或 osworld")
-    
+    target = _bench(bench_name)
+
     # BUG 3: 当bench_name为"osworld"且latest_only为False时会触发KeyError
     if bench_name == "osworld" and not latest_only:
         config = {"terminal-bench": "value1"}  # 字典中没有osworld键
         invalid_value = config["osworld"]  # 这里会抛出 KeyError
-    
-    target = BenchType.TERMINAL_BENCH if bench_name == "terminal-bench" else BenchType.OSWORLD
 
-    with SessionLocal() as session:
-        # 如果只要最新数据，先获取最新日期
+    def build(session: Session) -> bytes:
         if latest_only:
-            from sqlalchemy import func
-            latest_date_stmt = select(func.max(Result.scraped_date)).where(Result.bench == target)
-            latest_date = session.execute(latest_date_stmt).scalar()
-            
-            if not latest_date:
-                return {"total": 0, "items": []}
-            
-            stmt = (
-                select(Result)
-                .where(Result.bench == target, Result.scraped_date == latest_date)
-                .order_by(Result.rank.is_(None), Result.rank, Result.score.desc())
-            )
+            # 读物化表：最新快照的行，单次索引查询
+            rows = bench_latest(session, target, include_raw)
+        elif snapshots.has_delta(session, target):
+            # 有按增量存储的快照：由变更记录重建完整榜单
+            rows = row_tuples(session, snapshots.bench_rows(session, target, latest_only), include_raw)
         else:
             stmt = (
-                select(Result)
+                project(Result, include_raw)
                 .where(Result.bench == target)
                 .order_by(Result.scraped_date.desc(), Result.rank.is_(None), Result.rank, Result.score.desc())
             )
-        
-        rows = session.execute(stmt).scalars().all()
-        items = [
-            ResultOut(
-                id=r.id,
-                bench=r.bench.value,
-                rank=r.rank,
-                agent=r.agent,
-                model=r.model,
-                org=r.org,
-                nation=r.org_country,
-                agent_org=r.agent_org,
-                model_org=r.model_org,
-                score=r.score,
-                score_error=r.score_error,
-                date=r.date,
-            )
-            for r in rows
-        ]
-        return {"total": len(items), "items": items}
+            rows = fetch_rows(session, stmt)
+        return encode_results(rows, len(rows), include_raw=include_raw)
+
+    return await _cached(request, ("bench", target, latest_only, include_raw), lambda: run_db(build))
@@ -1,16 +1,121 @@
 from __future__ import annotations
-from typing import Optional
-from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Float, Text, Enum, DateTime, Date, Index
+from typing import Any, Dict, Iterator, Optional
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, Integer, Float, Text, DateTime, Date, Index, ForeignKey, Boolean, case, func, literal_column
+from sqlalchemy.types import TypeDecorator
 from datetime import datetime, date
-import enum
+import threading
 
 from .db import Base
 
 
-class BenchType(str, enum.Enum):
-    TERMINAL_BENCH = "terminal-bench"
-    OSWORLD = "osworld"
+class Bench(str):
+    """
+    一个榜单。字符串值为接口中使用的名称（如 terminal-bench），
+    name 为库中保存的名称（如 TERMINAL_BENCH），与原先的枚举成员用法一致。
+    """
+    def __new__(cls, value: str) -> "Bench":
+        bench = super().__new__(cls, value)
+        bench.name = value.upper().replace("-", "_")
+        return bench
+
+    @property
+    def value(self) -> str:
+        return str.__str__(self)
+
+    def __repr__(self) -> str:
+        return f"<BenchType.{self.name}: {self.value!r}>"
+
+
+class _BenchRegistry(type):
+    """
+    榜单在注册爬虫时动态加入（见 app/scrapers），新增榜单不需要改这里。
+
+    保留枚举的用法：BenchType("osworld") 按值查找、BenchType["OSWORLD"] 按库中名称查找、
+    BenchType.OSWORLD、遍历与 __members__。库中已有、但爬虫已不再注册的榜单按名称自动补上。
+    """
+    _members: Dict[str, Bench]
+    _lock = threading.Lock()
+
+    def _ensure_loaded(cls) -> None:
+        if not cls._loaded:
+            cls._loaded = True
+            from . import scrapers  # noqa: F401  注册内置与插件爬虫
+
+    def register(cls, value: str) -> Bench:
+        with cls._lock:
+            bench = Bench(value)
+            return cls._members.setdefault(bench.name, bench)
+
+    def from_name(cls, name: str) -> Bench:
+        """库中保存的名称 -> 榜单"""
+        bench = cls._members.get(name)
+        if bench is None:
+            cls._ensure_loaded()
+            bench = cls._members.get(name) or cls.register(name.lower().replace("_", "-"))
+        return bench
+
+    def __call__(cls, value: str) -> Bench:
+        cls._ensure_loaded()
+        bench = cls._members.get(Bench(value).name)
+        if bench is None or bench.value != value:
+            raise ValueError(f"{value!r} is not a valid {cls.__name__}")
+        return bench
+
+    def __getitem__(cls, name: str) -> Bench:
+        cls._ensure_loaded()
+        return cls._members[name]
+
+    def __getattr__(cls, name: str) -> Bench:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        cls._ensure_loaded()
+        try:
+            return cls._members[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(cls) -> Iterator[Bench]:
+        cls._ensure_loaded()
+        return iter(list(cls._members.values()))
+
+    def __len__(cls) -> int:
+        cls._ensure_loaded()
+        return len(cls._members)
+
+    def __contains__(cls, value: Any) -> bool:
+        cls._ensure_loaded()
+        return isinstance(value, str) and Bench(value).name in cls._members
+
+    @property
+    def __members__(cls) -> Dict[str, Bench]:
+        cls._ensure_loaded()
+        return dict(cls._members)
+
+
+class BenchType(metaclass=_BenchRegistry):
+    """已知榜单，按注册顺序遍历"""
+    _members: Dict[str, Bench] = {}
+    _loaded = False
+
+
+class BenchColumn(TypeDecorator):
+    """bench 列：库中保存榜单名称（与旧版枚举列的取值一致），读出为 Bench"""
+    impl = String(64)
+    cache_ok = True
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, Bench):
+            return value.name
+        try:
+            return BenchType(value).name
+        except ValueError:
+            return value  # 已是库中保存的名称
+
+    def process_result_value(self, value: Optional[str], dialect: Any) -> Optional[Bench]:
+        return None if value is None else BenchType.from_name(value)
 
 
 class Result(Base):
@@ -19,15 +124,25 @@ class Result(Base):
         # 复合唯一索引：bench + rank + agent + model + scraped_date
         # 同一天爬取的相同记录会被覆盖
         Index('idx_unique_record', 'bench', 'rank', 'agent', 'model', 'scraped_date', unique=True),
+        # 以下复合索引按接口的查询形状设计，EXPLAIN 检查见 scripts/explain_indexes.py：
+        # 榜单历史（bench = ? ORDER BY scraped_date, rank）、latest_results / 汇总表刷新、增量模式重建
+        Index('idx_results_bench_date', 'bench', 'scraped_date', 'rank'),
+        # 模型历史与趋势（model = ? GROUP BY / ORDER BY bench, scraped_date），覆盖 rank、score
+        Index('idx_results_model_history', 'model', 'bench', 'scraped_date', 'rank', 'score'),
+        # 入库预取已有行（scraped_date = ? AND bench IN ...，覆盖业务键）、按日期删除、按日期导出
+        Index('idx_results_date_bench', 'scraped_date', 'bench', 'rank', 'agent', 'model'),
+        # 跨榜单按规范模型查询（model_id = ? ORDER BY bench, scraped_date），覆盖 rank、score
+        Index('idx_results_model_id', 'model_id', 'bench', 'scraped_date', 'rank', 'score'),
+        Index('idx_results_org_id', 'org_id'),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    bench: Mapped[BenchType] = mapped_column(Enum(BenchType), index=True, nullable=False)
+    bench: Mapped[BenchType] = mapped_column(BenchColumn, nullable=False)
 
-    rank: Mapped[Optional[int]] = mapped_column(Integer, index=True, nullable=True)
+    rank: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
 
     agent: Mapped[Optional[str]] = mapped_column(String(255), index=True)
-    model: Mapped[Optional[str]] = mapped_column(String(255), index=True)
+    model: Mapped[Optional[str]] = mapped_column(String(255))
 
     # 组织（默认以 Agent Org 为主），同时记录 agent_org 与 model_org
     org: Mapped[Optional[str]] = mapped_column(String(255), index=True)
@@ -36,15 +151,214 @@ class Result(Base):
     agent_org: Mapped[Optional[str]] = mapped_column(String(255))
     model_org: Mapped[Optional[str]] = mapped_column(String(255))
 
-    score: Mapped[Optional[float]] = mapped_column(Float, index=True)
+    # 入库时解析出的规范模型 / 组织（identities.id），不同榜单的不同写法指向同一个 id
+    model_id: Mapped[Optional[int]] = mapped_column(Integer)
+    org_id: Mapped[Optional[int]] = mapped_column(Integer)
+
+    score: Mapped[Optional[float]] = mapped_column(Float)
     score_error: Mapped[Optional[float]] = mapped_column(Float)
 
-    date: Mapped[Optional[str]] = mapped_column(String(64), index=True)
+    date: Mapped[Optional[str]] = mapped_column(String(64))
 
-    raw_json: Mapped[Optional[str]] = mapped_column(Text)
+    # 旧版本逐行保存的原始数据，迁移后为空；默认不加载
+    raw_json: Mapped[Optional[str]] = mapped_column(Text, deferred=True)
+    # 原始数据按内容哈希存放在 raw_payloads，跨天相同的行只存一份
+    raw_hash: Mapped[Optional[str]] = mapped_column(String(64), ForeignKey("raw_payloads.hash"), index=True)
+    raw_payload: Mapped[Optional["RawPayload"]] = relationship(lazy="select")
 
     # 爬取日期（用于按天去重）
-    scraped_date: Mapped[date] = mapped_column(Date, index=True, nullable=False)
+    scraped_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    # 增量存储模式（STORAGE_MODE=delta）下的变更类型：added / changed / removed；
+    # 全量模式写入的行为空
+    change_type: Mapped[Optional[str]] = mapped_column(String(16))
+    # 行在榜单中的稳定标识（agent + model + 同名序号的哈希），增量模式用它对比前后快照
+    row_key: Mapped[Optional[str]] = mapped_column(String(40))
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+# /api/query 的排序键：bench、rank 升序（空值在后）、score 降序（空值在后）、id。
+# 全部改写为非空、同向升序的表达式，便于用行值比较做 keyset 分页；
+# 常量写成 literal_column，使查询中的表达式与索引定义逐字一致（SQLite 才会用上表达式索引）。
+QUERY_ORDER = (
+    Result.bench,
+    case((Result.rank.is_(None), literal_column("1")), else_=literal_column("0")),
+    func.coalesce(Result.rank, literal_column("0")),
+    case((Result.score.is_(None), literal_column("1")), else_=literal_column("0")),
+    -func.coalesce(Result.score, literal_column("0")),
+    Result.id,
+)
+
+# 表达式索引：MySQL 5.7 不支持，只在 SQLite / PostgreSQL 上创建
+Index('idx_query_order', *QUERY_ORDER).ddl_if(dialect=("sqlite", "postgresql"))
+
+
+class LatestResult(Base):
+    """
+    "最新数据"物化表，入库提交时与快照一起刷新。
+
+    每个 bench 下每个模型只保留它最近一次出现的快照中的行；
+    is_current 标记属于该 bench 最新快照的行。
+    latest_only 接口直接单表查询，不再每次聚合 max(scraped_date)。
+    id 与来源 results 行的 id 相同。
+    """
+    __tablename__ = "latest_results"
+    __table_args__ = (
+        Index('idx_latest_bench_current', 'bench', 'is_current', 'rank'),
+        Index('idx_latest_model_id', 'model_id', 'bench', 'scraped_date'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    bench: Mapped[BenchType] = mapped_column(BenchColumn, nullable=False)
+    rank: Mapped[Optional[int]] = mapped_column(Integer)
+    agent: Mapped[Optional[str]] = mapped_column(String(255))
+    model: Mapped[Optional[str]] = mapped_column(String(255))
+    org: Mapped[Optional[str]] = mapped_column(String(255))
+    org_country: Mapped[Optional[str]] = mapped_column(String(128))
+    agent_org: Mapped[Optional[str]] = mapped_column(String(255))
+    model_org: Mapped[Optional[str]] = mapped_column(String(255))
+    model_id: Mapped[Optional[int]] = mapped_column(Integer)
+    score: Mapped[Optional[float]] = mapped_column(Float)
+    score_error: Mapped[Optional[float]] = mapped_column(Float)
+    date: Mapped[Optional[str]] = mapped_column(String(64))
+    scraped_date: Mapped[date] = mapped_column(Date, nullable=False)
+    is_current: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+
+class OrgRollup(Base):
+    """
+    按组织汇总的快照统计：每个 (bench, scraped_date, org) 一行，入库提交时与快照一起刷新。
+    org 为空的行汇总在 org 为 NULL 的一行中。
+    """
+    __tablename__ = "org_rollups"
+    __table_args__ = (
+        Index('idx_org_rollup_bench_date', 'bench', 'scraped_date'),
+        Index('idx_org_rollup_org', 'org', 'bench', 'scraped_date'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bench: Mapped[BenchType] = mapped_column(BenchColumn, nullable=False)
+    scraped_date: Mapped[date] = mapped_column(Date, nullable=False)
+    org: Mapped[Optional[str]] = mapped_column(String(255))
+    entries: Mapped[int] = mapped_column(Integer, nullable=False)
+    models: Mapped[int] = mapped_column(Integer, nullable=False)
+    avg_score: Mapped[Optional[float]] = mapped_column(Float)
+    best_score: Mapped[Optional[float]] = mapped_column(Float)
+    best_rank: Mapped[Optional[int]] = mapped_column(Integer)
+
+
+class NationRollup(Base):
+    """按国家汇总的快照统计：每个 (bench, scraped_date, org_country) 一行，字段同 OrgRollup"""
+    __tablename__ = "nation_rollups"
+    __table_args__ = (
+        Index('idx_nation_rollup_bench_date', 'bench', 'scraped_date'),
+        Index('idx_nation_rollup_nation', 'org_country', 'bench', 'scraped_date'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bench: Mapped[BenchType] = mapped_column(BenchColumn, nullable=False)
+    scraped_date: Mapped[date] = mapped_column(Date, nullable=False)
+    org_country: Mapped[Optional[str]] = mapped_column(String(128))
+    entries: Mapped[int] = mapped_column(Integer, nullable=False)
+    models: Mapped[int] = mapped_column(Integer, nullable=False)
+    avg_score: Mapped[Optional[float]] = mapped_column(Float)
+    best_score: Mapped[Optional[float]] = mapped_column(Float)
+    best_rank: Mapped[Optional[int]] = mapped_column(Integer)
+
+
+class Identity(Base):
+    """
+    跨榜单的规范实体：kind 为 model 或 org，key 为归一化后的匹配键（见 services/identities）。
+    各榜单对同一模型的写法不同（如 "Claude Sonnet 4.5" 与 "claude-sonnet-4-5-20250929"），
+    入库时解析到同一行，results.model_id / org_id 指向它。
+    """
+    __tablename__ = "identities"
+    __table_args__ = (
+        Index('idx_identity_kind_key', 'kind', 'key', unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    key: Mapped[str] = mapped_column(String(255), nullable=False)
+    # 展示用名称：别名表中的规范名，否则为第一次见到的写法
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class IdentityAlias(Base):
+    """榜单中出现过的原始写法 -> 规范实体，入库时按它直接命中，不必重新归一化"""
+    __tablename__ = "identity_aliases"
+    __table_args__ = (
+        Index('idx_identity_alias_identity', 'identity_id'),
+    )
+
+    kind: Mapped[str] = mapped_column(String(16), primary_key=True)
+    alias: Mapped[str] = mapped_column(String(255), primary_key=True)
+    identity_id: Mapped[int] = mapped_column(Integer, ForeignKey("identities.id"), nullable=False)
+
+
+class RawPayload(Base):
+    """内容寻址的原始数据：hash 为规范 JSON 的 SHA-256"""
+    __tablename__ = "raw_payloads"
+
+    hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Snapshot(Base):
+    """
+    每个榜单每天一份的快照元数据。
+
+    表头等对整张榜单都相同的信息只在这里存一份，不再随每一行写入 raw_json。
+    """
+    __tablename__ = "snapshots"
+    __table_args__ = (
+        Index('idx_snapshot_bench_date', 'bench', 'scraped_date', unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    bench: Mapped[BenchType] = mapped_column(BenchColumn, nullable=False)
+    scraped_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    meta_json: Mapped[Optional[str]] = mapped_column(Text)
+    row_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    # 该快照的存储方式：full（整张榜单）/ delta（只存相对上一快照的变更）；旧数据为空，视为 full
+    storage_mode: Mapped[Optional[str]] = mapped_column(String(16))
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class FetchState(Base):
+    """每个数据源的条件请求缓存：ETag / Last-Modified / 正文哈希"""
+    __tablename__ = "fetch_state"
+
+    source: Mapped[str] = mapped_column(String(64), primary_key=True)
+    url: Mapped[Optional[str]] = mapped_column(String(512))
+    etag: Mapped[Optional[str]] = mapped_column(String(255))
+    last_modified: Mapped[Optional[str]] = mapped_column(String(64))
+    body_hash: Mapped[Optional[str]] = mapped_column(String(64))
+    # 校验信息所属的快照日期，只有这天或之后的默认采集可以据此跳过
+    scraped_date: Mapped[Optional[date]] = mapped_column(Date)
+
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+class ScheduleState(Base):
+    """定时采集的运行状态：重启后据此恢复下次运行时间，避免集中补采"""
+    __tablename__ = "schedule_state"
+
+    source: Mapped[str] = mapped_column(String(64), primary_key=True)
+    last_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    next_run_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    # 上次运行结果：running | ok | unchanged | partial | failed
+    last_status: Mapped[Optional[str]] = mapped_column(String(16))
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    last_job_id: Mapped[Optional[str]] = mapped_column(String(32))
+
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -1,6 +1,7 @@
 from __future__ import annotations
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Any, Optional
+from datetime import datetime
 
 
 class ResultOut(BaseModel):
@@ -26,8 +27,167 @@ class QueryResponse(BaseModel):
     items: list[ResultOut]
 
 
+class PagedQueryResponse(QueryResponse):
+    # 分页且未要求计数时为空
+    total: Optional[int] = None
+    # 下一页游标；没有更多数据时为空
+    next_cursor: Optional[str] = None
+
+
+# 批量查询一次最多的模型个数
+MODEL_BATCH_MAX = 100
+
+
+class ModelBatchRequest(BaseModel):
+    models: list[str] = Field(..., min_length=1, max_length=MODEL_BATCH_MAX)
+
+
+class ModelResults(BaseModel):
+    # total / items 与 /api/models/{model}/benches 的响应相同
+    model: str
+    total: int
+    items: list[ResultOut]
+
+
+class ModelBatchResponse(BaseModel):
+    total: int
+    items: list[ModelResults]
+
+
+class TrendPoint(BaseModel):
+    bench: str
+    model: str
+    scraped_date: str
+    best_score: Optional[float] = None
+    best_rank: Optional[int] = None
+    entries: int
+
+
+class TrendResponse(BaseModel):
+    total: int
+    items: list[TrendPoint]
+
+
+class SeriesPoint(BaseModel):
+    date: str
+    rank: Optional[int] = None
+    score: Optional[float] = None
+    # 相对上一个点上升的名次数，下降为负
+    rank_change: Optional[int] = None
+
+
+class BenchSeries(BaseModel):
+    bench: str
+    points: list[SeriesPoint]
+
+
+class ModelTrendResponse(BaseModel):
+    model: str
+    bucket: str  # day | week | month
+    series: list[BenchSeries]
+
+
+class RollupStat(BaseModel):
+    bench: str
+    scraped_date: str
+    entries: int
+    models: int
+    avg_score: Optional[float] = None
+    best_score: Optional[float] = None
+    best_rank: Optional[int] = None
+
+
+class OrgStat(RollupStat):
+    org: Optional[str] = None
+
+
+class NationStat(RollupStat):
+    nation: Optional[str] = None
+
+
+class OrgStatsResponse(BaseModel):
+    total: int
+    items: list[OrgStat]
+
+
+class NationStatsResponse(BaseModel):
+    total: int
+    items: list[NationStat]
+
+
+class SourceStatus(BaseModel):
+    name: str
+    status: str  # ok | unchanged | error | timeout
+    latency_ms: float
+    count: int = 0
+    error: Optional[str] = None
+
+
 class ScrapeResponse(BaseModel):
     bench: str
     inserted: int
     updated: int
     total: int
+    status: str = "ok"  # ok | unchanged | partial
+    sources: list[SourceStatus] = []
+    unresolved_orgs: list[str] = []  # 组织-国家映射中没有的组织
+
+
+class JobProgress(BaseModel):
+    stage: str  # queued | waiting | running | fetching | ingesting | done
+    source: Optional[str] = None
+    rows: int = 0  # source 已写入的条目数
+
+
+class JobOut(BaseModel):
+    id: str
+    bench: str
+    scraped_date: str
+    force: bool
+    status: str  # queued | running | succeeded | failed
+    progress: JobProgress
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queue_ms: Optional[float] = None  # 提交到开始执行（含等待榜单锁）
+    run_ms: Optional[float] = None
+    result: Optional[ScrapeResponse] = None
+    error: Optional[str] = None
+    coalesced: bool = False  # 本次提交是否合并到了已有任务
+
+
+class JobListResponse(BaseModel):
+    items: list[JobOut]
+
+
+class ScheduleEntryOut(BaseModel):
+    source: str
+    interval_s: float
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+    last_status: Optional[str] = None  # running | ok | unchanged | partial | failed
+    last_error: Optional[str] = None
+    job_id: Optional[str] = None
+
+
+class ScheduleResponse(BaseModel):
+    enabled: bool
+    items: list[ScheduleEntryOut]
+
+
+class ColumnInfo(BaseModel):
+    fields: list[str]
+    headers: list[str] = []
+    index: Optional[int] = None
+
+
+class BenchInfo(BaseModel):
+    name: str
+    title: Optional[str] = None
+    url: str
+    conditional: bool  # 是否支持条件请求与流式入库（提供了 parse）
+    columns: list[ColumnInfo] = []
+
+
+class BenchListResponse(BaseModel):
+    items: list[BenchInfo]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import importlib
+import os
+import pkgutil
+
+from ..models import BenchType
+from .spec import Column, ParseFunc, ScraperSpec
+
+# 内置爬虫模块，bench=all 时排在最前；本包中其他定义了 SPEC 的模块按文件名顺序随后注册
+BUILTIN_MODULES = ("terminal_bench", "osworld")
+
+# 榜单名 -> 爬虫，bench=all 时按注册顺序全部执行
+SCRAPERS: Dict[str, ScraperSpec] = {}
+
+
+def register(spec: ScraperSpec) -> ScraperSpec:
+    """注册（或替换）一个爬虫，同时把榜单加入 BenchType"""
+    BenchType.register(spec.name)
+    SCRAPERS[spec.name] = spec
+    return spec
+
+
+def register_scraper(
+    name: str,
+    fetch: Optional[Callable[..., List[Dict[str, Any]]]] = None,
+    url: str = "",
+    parse: Optional[ParseFunc] = None,
+    columns: Sequence[Column] = (),
+) -> ScraperSpec:
+    return register(ScraperSpec(name=name, url=url, parse=parse, fetch=fetch, columns=tuple(columns)))
+
+
+def _discover() -> None:
+    """
+    注册内置与插件爬虫：本包中定义了模块级 SPEC 的模块，
+    以及 SCRAPER_MODULES（逗号分隔的模块路径）中的外部模块。
+    新增榜单只需新增一个这样的模块。
+    """
+    local = [m.name for m in pkgutil.iter_modules(__path__)]
+    names = [*BUILTIN_MODULES, *sorted(set(local) - set(BUILTIN_MODULES))]
+    modules = [f"{__name__}.{n}" for n in names]
+    modules += [m.strip() for m in os.getenv("SCRAPER_MODULES", "").split(",") if m.strip()]
+    for path in modules:
+        spec = getattr(importlib.import_module(path), "SPEC", None)
+        if isinstance(spec, ScraperSpec):
+            register(spec)
+
+
+_discover()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+from typing import BinaryIO, Optional
+from dataclasses import dataclass
+import hashlib
+import tempfile
+
+from .http_client import get_client
+
+
+@dataclass
+class Validators:
+    """上一次成功入库时记录的缓存校验信息"""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+
+
+# 下载时每次读取的块大小
+CHUNK_SIZE = 64 * 1024
+
+
+@dataclass
+class FetchResult:
+    # 已落盘的响应正文（临时文件，已 seek 到开头），unchanged 时为 None；调用方负责关闭
+    body: Optional[BinaryIO]
+    validators: Validators
+    # 服务端返回 304，或内容哈希与上次一致
+    unchanged: bool = False
+
+
+def conditional_get(url: str, timeout: float, previous: Optional[Validators] = None) -> FetchResult:
+    """
+    带 If-None-Match / If-Modified-Since 的 GET。
+
+    正文按块写入临时文件并同时计算哈希，不在内存中缓存整个响应。
+    服务端返回 304 或正文哈希与上次相同时 unchanged=True，调用方可跳过解析与入库。
+    """
+    headers = {}
+    if previous:
+        if previous.etag:
+            headers["If-None-Match"] = previous.etag
+        if previous.last_modified:
+            headers["If-Modified-Since"] = previous.last_modified
+
+    resp = get_client().get(url, headers=headers, timeout=timeout, stream=True)
+    if resp.status_code == 304 and previous:
+        resp.close()
+        return FetchResult(None, previous, unchanged=True)
+
+    digest = hashlib.sha256()
+    body = tempfile.TemporaryFile()
+    try:
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            digest.update(chunk)
+            body.write(chunk)
+    except Exception:
+        body.close()
+        raise
+    finally:
+        resp.close()
+    body.seek(0)
+
+    validators = Validators(
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+        body_hash=digest.hexdigest(),
+    )
+    if previous and previous.body_hash == validators.body_hash:
+        body.close()
+        return FetchResult(None, validators, unchanged=True)
+    return FetchResult(body, validators)
@@ -0,0 +1,181 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36"
+
+# 这些状态码视为上游的临时故障，会按退避策略重试
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class UpstreamError(Exception):
+    """上游数据源请求失败（重试耗尽或不可重试的错误状态）"""
+
+    def __init__(self, message: str, status: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class RequestMetrics:
+    """单次 HTTP 尝试的指标，传给 metrics hook"""
+    method: str
+    url: str
+    host: str
+    status: Optional[int]
+    bytes: int
+    latency_ms: float
+    attempt: int
+    error: Optional[str] = None
+
+
+MetricsHook = Callable[[RequestMetrics], None]
+
+
+@dataclass
+class HttpConfig:
+    retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    pool_size: int = 10
+    per_host_limit: int = 4
+    timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "HttpConfig":
+        return cls(
+            retries=int(os.getenv("HTTP_RETRIES", "3")),
+            backoff_base=float(os.getenv("HTTP_BACKOFF_BASE", "0.5")),
+            backoff_max=float(os.getenv("HTTP_BACKOFF_MAX", "8")),
+            pool_size=int(os.getenv("HTTP_POOL_SIZE", "10")),
+            per_host_limit=int(os.getenv("HTTP_PER_HOST_LIMIT", "4")),
+            timeout=float(os.getenv("HTTP_TIMEOUT", "30")),
+        )
+
+
+class HttpClient:
+    """
+    爬虫共用的 HTTP 客户端。
+
+    - 基于 requests.Session 的 keep-alive 连接池
+    - 5xx / 429 / 连接错误 / 超时按带抖动的指数退避重试
+    - 按 host 限制并发请求数
+    - 每次尝试结束后调用 metrics hook（字节数、耗时、状态码）
+    """
+
+    def __init__(self, config: Optional[HttpConfig] = None) -> None:
+        self.config = config or HttpConfig.from_env()
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_size,
+            pool_maxsize=self.config.pool_size,
+            max_retries=0,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._hooks: List[MetricsHook] = []
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def add_metrics_hook(self, hook: MetricsHook) -> None:
+        self._hooks.append(hook)
+
+    def _host_slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._host_limits.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.config.per_host_limit)
+                self._host_limits[host] = sem
+            return sem
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（full jitter）"""
+        cap = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def _emit(self, metrics: RequestMetrics) -> None:
+        for hook in self._hooks:
+            try:
+                hook(metrics)
+            except Exception:
+                # 指标上报失败不能影响抓取
+                pass
+
+    def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        stream: bool = False,
+    ) -> requests.Response:
+        """
+        发起 GET 请求，返回 2xx/3xx 响应；重试耗尽或遇到不可重试的错误时抛出 UpstreamError。
+
+        stream=True 时只在建立连接、读取响应头期间占用 host 并发名额，
+        字节数取自 Content-Length。
+        """
+        timeout = timeout if timeout is not None else self.config.timeout
+        host = urlsplit(url).netloc
+        attempts = self.config.retries + 1
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            t0 = time.perf_counter()
+            status = None
+            size = 0
+            error = None
+            resp = None
+            try:
+                with self._host_slot(host):
+                    resp = self.session.get(url, headers=headers, timeout=timeout, stream=stream)
+                    status = resp.status_code
+                    if stream:
+                        size = int(resp.headers.get("Content-Length") or 0)
+                    else:
+                        size = len(resp.content)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = f"{e.__class__.__name__}: {e}"
+            finally:
+                latency = round((time.perf_counter() - t0) * 1000, 1)
+                self._emit(RequestMetrics("GET", url, host, status, size, latency, attempt + 1, error))
+
+            if resp is not None and status not in RETRY_STATUS:
+                if status >= 400:
+                    resp.close()
+                    raise UpstreamError(f"{url} 返回 HTTP {status}", status)
+                return resp
+            if resp is not None:
+                resp.close()
+                error = f"HTTP {status}"
+            if last:
+                raise UpstreamError(f"{url} 请求失败（已重试 {self.config.retries} 次）: {error}", status)
+            time.sleep(self.backoff(attempt))
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """进程内共享的 HttpClient（懒加载）"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def set_client(client: Optional[HttpClient]) -> None:
+    """替换共享客户端（例如自定义配置或接入指标）；传 None 则下次重新创建"""
+    global _client
+    with _client_lock:
+        _client = client
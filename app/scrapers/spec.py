@@ -0,0 +1,169 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from lxml import html
+from openpyxl import load_workbook
+
+ParseFunc = Callable[[BinaryIO], Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]]
+# 读取器：把下载的文件解析为 (表头, 逐行的单元格序列)
+Reader = Callable[[BinaryIO], Tuple[List[str], Iterator[Sequence[Any]]]]
+
+# 条目字段，与 results 表的列对应
+ITEM_FIELDS = ("rank", "agent", "model", "date", "agent_org", "model_org", "org", "score", "score_error")
+
+
+def text(val: Any) -> Optional[str]:
+    """单元格 -> 去空白的字符串，空值为 None，日期取 YYYY-MM-DD"""
+    if val is None or val == "":
+        return None
+    if isinstance(val, datetime):
+        return val.strftime("%Y-%m-%d")
+    s = str(val).strip()
+    return s if s else None
+
+
+def as_is(val: Any) -> Any:
+    return val
+
+
+def to_int(val: Any) -> Optional[int]:
+    try:
+        return int(val) if val not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class Column:
+    """
+    条目字段 <- 源表中的一列。
+
+    先按表头别名 headers（不区分大小写）定位，找不到时用位置 index；
+    都没有时该字段为空。convert 把单元格转换为字段值，
+    fields 有多个时（如分数与误差）返回同样个数的元组。
+    """
+    fields: Union[str, Tuple[str, ...]]
+    headers: Tuple[str, ...] = ()
+    index: Optional[int] = None
+    convert: Callable[[Any], Any] = text
+
+    def __post_init__(self) -> None:
+        if isinstance(self.fields, str):
+            object.__setattr__(self, "fields", (self.fields,))
+        unknown = set(self.fields) - set(ITEM_FIELDS)
+        if unknown:
+            raise ValueError(f"未知的条目字段: {', '.join(sorted(unknown))}")
+
+    def locate(self, header: Sequence[str]) -> Optional[int]:
+        lowered = [h.lower() for h in header]
+        for name in self.headers:
+            if name.lower() in lowered:
+                return lowered.index(name.lower())
+        return self.index
+
+
+def _json_safe(val: Any) -> Any:
+    return val.strftime("%Y-%m-%d %H:%M:%S") if isinstance(val, datetime) else val
+
+
+def table_parser(
+    bench: str,
+    reader: Reader,
+    columns: Sequence[Column],
+    min_cells: int = 0,
+    rank_from_position: bool = False,
+) -> ParseFunc:
+    """
+    由读取器与列映射生成 parse(fp)：表头作为快照元数据只返回一次，
+    条目按行惰性产出，raw 中只保留该行本身。
+
+    - min_cells: 单元格少于此数的行跳过（如表格中的分组标题行）
+    - rank_from_position: 名次为空或无法解析时按行序补上
+    """
+    def parse(fp: BinaryIO) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+        header, rows = reader(fp)
+        located = [(col, col.locate(header)) for col in columns]
+        return {"header": header}, _items(rows, located)
+
+    def _items(rows: Iterator[Sequence[Any]], located: List[Tuple[Column, Optional[int]]]) -> Iterator[Dict[str, Any]]:
+        position = 0
+        for cells in rows:
+            if not cells or not any(cells) or len(cells) < min_cells:
+                continue
+            position += 1
+            item: Dict[str, Any] = {"bench": bench, **dict.fromkeys(ITEM_FIELDS)}
+            for col, i in located:
+                if i is None or i >= len(cells):
+                    continue
+                value = col.convert(cells[i])
+                values = value if len(col.fields) > 1 else (value,)
+                item.update(zip(col.fields, values))
+            # 未单独提供组织列时取 agent_org，其次 model_org
+            item["org"] = item["org"] or item["agent_org"] or item["model_org"]
+            if rank_from_position and item["rank"] is None:
+                item["rank"] = position
+            item["raw"] = {"row": [_json_safe(c) for c in cells]}
+            yield item
+
+    return parse
+
+
+def html_table(xpath: str) -> Reader:
+    """HTML 页面中 xpath 指向的表格：第一行为表头，单元格取去多余空白的文本"""
+    def read(fp: BinaryIO) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+        doc = html.fromstring(fp.read().decode("utf-8", errors="replace"))
+        tables = doc.xpath(xpath)
+        rows = tables[0].xpath(".//tr") if tables else []
+        if not rows:
+            return [], iter(())
+        cell_text = lambda c: " ".join("".join(c.itertext()).split())
+        header = [cell_text(c) for c in rows[0].xpath(".//th|.//td")]
+        return header, ([cell_text(c) for c in tr.xpath(".//td")] for tr in rows[1:])
+
+    return read
+
+
+def xlsx_sheet(sheet: int = 0) -> Reader:
+    """XLSX 的第 sheet 个工作表：只读模式逐行读取，表头转小写"""
+    def read(fp: BinaryIO) -> Tuple[List[str], Iterator[Sequence[Any]]]:
+        wb = load_workbook(fp, read_only=True, data_only=True)
+        try:
+            rows_iter = wb[wb.sheetnames[sheet]].iter_rows(values_only=True)
+            header = [str(c).strip().lower() if c else "" for c in next(rows_iter)]
+        except Exception:
+            wb.close()
+            raise
+        return header, _close_after(wb, rows_iter)
+
+    return read
+
+
+def _close_after(wb: Any, rows: Iterator[Sequence[Any]]) -> Iterator[Sequence[Any]]:
+    try:
+        yield from rows
+    finally:
+        wb.close()
+
+
+@dataclass(frozen=True)
+class ScraperSpec:
+    """
+    已注册的榜单爬虫。
+
+    parse(fp) 返回 (快照元数据, 条目迭代器)：下载由采集流程统一完成
+    （条件请求，落盘到临时文件），内容未变化时跳过解析与入库，条目按批次写库。
+    columns 为声明的列映射（由 table_parser 使用，也供 /api/benches 展示）。
+    只提供 fetch(url=..., timeout=...) 的爬虫一次返回条目列表，不支持条件请求。
+    """
+    name: str
+    url: str
+    parse: Optional[ParseFunc] = None
+    fetch: Optional[Callable[..., List[Dict[str, Any]]]] = None
+    columns: Tuple[Column, ...] = field(default_factory=tuple)
+    title: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        if self.parse is None and self.fetch is None:
+            raise ValueError(f"爬虫 {self.name} 需要提供 parse 或 fetch")
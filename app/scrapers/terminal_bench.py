@@ -1,8 +1,8 @@
 from __future__ import annotations
-import json
 from typing import Any, Dict, List, Optional
-import requests
-from lxml import html
+
+from .conditional import conditional_get
+from .spec import Column, ScraperSpec, as_is, html_table, table_parser, to_int
 
 TERMINAL_BENCH_URL = "https://www.tbench.ai/leaderboard"
 TERMINAL_BENCH_TABLE_XPATH = '//*[@id="nd-home-layout"]/div/div/div/div[1]/table'
@@ -31,74 +31,34 @@ def _parse_accuracy(cell_text: str) -> tuple[Optional[float], Optional[float]]:
         return None, None
 
 
-def fetch_terminal_bench() -> List[Dict[str, Any]]:
-    headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0 Safari/537.36",
-    }
-    resp = requests.get(TERMINAL_BENCH_URL, headers=headers, timeout=30)
-    resp.raise_for_status()
-
-    doc = html.fromstring(resp.text)
-    tables = doc.xpath(TERMINAL_BENCH_TABLE_XPATH)
-    if not tables:
-        return []
-    table = tables[0]
-
-    rows = table.xpath(".//tr")
-    if not rows:
-        return []
-
-    # Identify columns from header
-    header_cells = [" ".join("".join(c.itertext()).split()) for c in rows[0].xpath(".//th|.//td")]
-    # Expected headers (example): Rank | Agent | Model | Date | Agent Org | Model Org | Accuracy
-    results: List[Dict[str, Any]] = []
-
-    for tr in rows[1:]:
-        cells = tr.xpath(".//td")
-        if not cells or len(cells) < 6:
-            continue
-        texts = [" ".join("".join(c.itertext()).split()) for c in cells]
-
-        # Safe extraction by index based on known columns
-        rank = None
-        try:
-            rank = int(texts[0]) if texts[0] else None
-        except Exception:
-            rank = None
+COLUMNS = (
+    # 表头（示例）: Rank | Agent | Model | Date | Agent Org | Model Org | Accuracy
+    Column("rank", index=0, convert=to_int),
+    Column("agent", index=1, convert=as_is),
+    Column("model", index=2, convert=as_is),
+    Column("date", index=3, convert=as_is),
+    Column("agent_org", index=4, convert=as_is),
+    Column("model_org", index=5, convert=as_is),
+    Column(("score", "score_error"), headers=("accuracy",), index=6, convert=_parse_accuracy),
+)
 
-        agent = texts[1] if len(texts) > 1 else None
-        model = texts[2] if len(texts) > 2 else None
-        date = texts[3] if len(texts) > 3 else None
-        agent_org = texts[4] if len(texts) > 4 else None
-        model_org = texts[5] if len(texts) > 5 else None
+parse_terminal_bench = table_parser(
+    "terminal-bench", html_table(TERMINAL_BENCH_TABLE_XPATH), COLUMNS, min_cells=6,
+)
 
-        score = None
-        score_error = None
-        if len(texts) > 6:
-            score, score_error = _parse_accuracy(texts[6])
-        elif "Accuracy" in " ".join(header_cells):
-            # Try to find index dynamically
-            try:
-                idx = header_cells.index("Accuracy")
-                if idx < len(texts):
-                    score, score_error = _parse_accuracy(texts[idx])
-            except Exception:
-                pass
 
-        org = agent_org or model_org
+def fetch_terminal_bench(url: str = TERMINAL_BENCH_URL, timeout: float = 30) -> List[Dict[str, Any]]:
+    fetched = conditional_get(url, timeout)
+    with fetched.body:
+        _, items = parse_terminal_bench(fetched.body)
+        return list(items)
 
-        results.append({
-            "bench": "terminal-bench",
-            "rank": rank,
-            "agent": agent,
-            "model": model,
-            "date": date,
-            "agent_org": agent_org,
-            "model_org": model_org,
-            "org": org,
-            "score": score,
-            "score_error": score_error,
-            "raw": {"row": texts},
-        })
 
-    return results
+SPEC = ScraperSpec(
+    name="terminal-bench",
+    title="Terminal-Bench",
+    url=TERMINAL_BENCH_URL,
+    parse=parse_terminal_bench,
+    fetch=fetch_terminal_bench,
+    columns=COLUMNS,
+)
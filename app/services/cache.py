@@ -0,0 +1,141 @@
+from __future__ import annotations
+from typing import Dict, Hashable, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import os
+import threading
+import time
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+    generation: int
+    created: float
+
+
+class ResponseCache:
+    """
+    进程内的有界 LRU 响应缓存，保存已序列化的 JSON 字节。
+
+    按条目数（maxsize）与响应体总字节数（maxbytes）两项上限淘汰最久未用的条目；
+    超过 max_entry_bytes 的响应（如全部历史）不缓存，照常返回并带 ETag。
+    数据只在入库 / 删除时变化：写入方调用 bump() 递增代数，
+    旧代数的条目随即失效，无需逐个清除。
+    ttl 用于兜底其他进程（如 CLI）写库的情况，0 表示不过期。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: float = 300,
+        maxbytes: int = 64 << 20,
+        max_entry_bytes: int = 4 << 20,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.max_entry_bytes = min(max_entry_bytes, maxbytes)
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "ResponseCache":
+        return cls(
+            maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", "300")),
+            maxbytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 << 20))),
+            max_entry_bytes=int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(4 << 20))),
+        )
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def bump(self) -> int:
+        """数据已变化：递增代数并清空缓存"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._bytes = 0
+            return self._generation
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (
+                entry.generation != self._generation
+                or (self.ttl and time.monotonic() - entry.created > self.ttl)
+            ):
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, generation: int) -> CachedResponse:
+        """
+        写入缓存。generation 为开始构造响应时的代数：
+        构造期间数据已变化时只返回结果、不写入，避免缓存旧数据。
+        """
+        entry = CachedResponse(
+            body=body,
+            etag='"%s"' % hashlib.sha1(body).hexdigest(),
+            generation=generation,
+            created=time.monotonic(),
+        )
+        with self._lock:
+            if self.maxsize <= 0 or generation != self._generation or len(body) > self.max_entry_bytes:
+                return entry
+            self._pop(key)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.maxsize or self._bytes > self.maxbytes:
+                self._pop(next(iter(self._entries)))
+        return entry
+
+    def _pop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "bytes": self._bytes,
+                "maxbytes": self.maxbytes,
+                "generation": self._generation,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（支持多个值、弱校验前缀 W/ 与 *）"""
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+_cache = ResponseCache.from_env()
+
+
+def get_cache() -> ResponseCache:
+    return _cache
+
+
+def invalidate() -> int:
+    """入库或删除数据后调用，使所有缓存的响应失效"""
+    return _cache.bump()
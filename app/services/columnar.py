@@ -0,0 +1,322 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from datetime import date
+from pathlib import Path
+import os
+import shutil
+import threading
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, SessionTransaction
+
+from ..models import Result, BenchType
+from . import snapshots
+from .snapshots import DELTA, storage_mode
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 未安装 pyarrow 时列式存储不可用
+    pa = None
+
+# 列式文件中的列（bench、scraped_date 由目录分区表示，不写入文件）
+COLUMNS = (
+    ("id", "int64"),
+    ("rank", "int32"),
+    ("agent", "string"),
+    ("model", "string"),
+    ("org", "string"),
+    ("nation", "string"),
+    ("agent_org", "string"),
+    ("model_org", "string"),
+    ("score", "float64"),
+    ("score_error", "float64"),
+    ("date", "string"),
+)
+
+PART_FILE = "part-0.parquet"
+
+# session.info 中暂存的文件操作，事务提交后才执行
+_PENDING = "columnar_pending"
+
+
+class ColumnarUnavailable(RuntimeError):
+    pass
+
+
+def columnar_dir() -> Optional[Path]:
+    """COLUMNAR_DIR 为空时不写列式文件"""
+    root = os.getenv("COLUMNAR_DIR", "").strip()
+    return Path(root) if root else None
+
+
+def enabled() -> bool:
+    return columnar_dir() is not None
+
+
+def require_dir() -> Path:
+    root = columnar_dir()
+    if root is None:
+        raise ColumnarUnavailable("列式存储未启用，请设置 COLUMNAR_DIR")
+    if pa is None:
+        raise ColumnarUnavailable("列式存储需要安装 pyarrow")
+    return root
+
+
+def _schema() -> "pa.Schema":
+    return pa.schema([(name, getattr(pa, t)()) for name, t in COLUMNS])
+
+
+def partition_path(root: Path, bench: BenchType, scraped_date: date) -> Path:
+    return root / f"bench={bench.value}" / f"scraped_date={scraped_date.isoformat()}"
+
+
+def _table(rows: Sequence[Any]) -> "pa.Table":
+    """rows 为 Result 或含相同字段的 dict"""
+    data: Dict[str, List[Any]] = {name: [] for name, _ in COLUMNS}
+    for r in rows:
+        get = r.get if isinstance(r, dict) else lambda k, r=r: getattr(r, k)
+        for name, _ in COLUMNS:
+            data[name].append(get("org_country" if name == "nation" else name))
+    return pa.Table.from_pydict(data, schema=_schema())
+
+
+def _write(root: Path, bench: BenchType, scraped_date: date, table: "pa.Table") -> Path:
+    path = partition_path(root, bench, scraped_date)
+    path.mkdir(parents=True, exist_ok=True)
+    # 目录按 hive 风格分区（bench=.../scraped_date=...），pyarrow.dataset / DuckDB 等可直接读取；
+    # 以 "." 开头的临时文件会被这些工具忽略
+    tmp = path / f".{PART_FILE}.tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path / PART_FILE)
+    return path / PART_FILE
+
+
+def write_partition(
+    bench: BenchType,
+    scraped_date: date,
+    rows: Sequence[Any],
+    root: Optional[Path] = None,
+) -> Path:
+    """
+    把一天的完整榜单写为 Parquet 文件（覆盖旧文件）。
+
+    rows 为 Result 或含相同字段的 dict；先写临时文件再改名，
+    扫描方不会读到写了一半的文件。
+    """
+    return _write(root or require_dir(), bench, scraped_date, _table(rows))
+
+
+def _after_commit(session: Session, op: Callable[[], None]) -> None:
+    """op 在 session 的事务提交成功后执行，回滚时丢弃"""
+    session.info.setdefault(_PENDING, []).append(op)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_pending(session: Session) -> None:
+    for op in session.info.pop(_PENDING, []):
+        try:
+            op()
+        except Exception as e:
+            # 数据库已提交，不能再让这次写库失败；文件可按数据库内容重建
+            print(f"列式文件更新失败，可运行 scripts/build_columnar.py 重建: {e}")
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_pending(session: Session, transaction: SessionTransaction) -> None:
+    # 最外层事务结束时未提交（回滚或直接关闭 session）：丢弃
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+def _snapshot_rows(session: Session, bench: BenchType, scraped_date: date) -> List[Result]:
+    if storage_mode() == DELTA or snapshots.has_delta(session, bench):
+        return snapshots.rebuild(session, bench, scraped_date)
+    stmt = select(Result).where(Result.bench == bench, Result.scraped_date == scraped_date)
+    return snapshots.sort_rows(session.execute(stmt).scalars().all())
+
+
+def export_snapshot(session: Session, bench: BenchType, scraped_date: date) -> None:
+    """
+    从数据库读出 bench 在 scraped_date 的完整榜单，写入列式文件；未启用时不做任何事。
+
+    在调用方的事务中读取（含未提交的写入），文件在事务提交成功后才写出，
+    回滚时不留下与数据库不一致的文件。
+    """
+    if not enabled():
+        return
+    root = require_dir()
+    session.flush()
+    table = _table(_snapshot_rows(session, bench, scraped_date))
+    _after_commit(session, lambda: _write(root, bench, scraped_date, table))
+
+
+def remove_partition(session: Session, bench: BenchType, scraped_date: date) -> None:
+    """
+    删除某天的列式文件。增量模式下其后日期的重建结果随之改变，
+    一并重写这些日期的文件。与 export_snapshot 相同，在事务提交成功后才改动文件。
+    """
+    root = columnar_dir()
+    if root is None:
+        return
+    later = []
+    if snapshots.has_delta(session, bench):
+        require_dir()
+        session.flush()
+        later = [
+            (d, _table(rows))
+            for d, rows in snapshots.iter_snapshots(session, bench, since=scraped_date)
+            if d > scraped_date
+        ]
+
+    def apply() -> None:
+        shutil.rmtree(partition_path(root, bench, scraped_date), ignore_errors=True)
+        for d, table in later:
+            _write(root, bench, d, table)
+
+    _after_commit(session, apply)
+
+
+def rebuild_all(session: Session, benches: Sequence[BenchType] = ()) -> int:
+    """按数据库内容重写全部列式文件（首次启用或文件丢失时使用），返回写入的快照数"""
+    root = require_dir()
+    written = 0
+    for bench in benches or list(BenchType):
+        shutil.rmtree(root / f"bench={bench.value}", ignore_errors=True)
+        if snapshots.has_delta(session, bench):
+            snaps = snapshots.iter_snapshots(session, bench)
+        else:
+            dates = session.execute(
+                select(Result.scraped_date).where(Result.bench == bench).distinct().order_by(Result.scraped_date)
+            ).scalars().all()
+            snaps = ((d, _snapshot_rows(session, bench, d)) for d in dates)
+        for d, rows in snaps:
+            write_partition(bench, d, rows, root)
+            written += 1
+    return written
+
+
+# ---- 分析查询：直接扫描列式文件，不访问数据库 ----
+
+
+class _PartitionCache:
+    """
+    按 bench 缓存解码后的全部分区，合并为一张按 scraped_date 排序的 Arrow 表。
+
+    每日一个文件，扫描多年数据时打开文件的开销远大于计算本身；
+    每次查询只 stat 各分区文件，mtime / 大小有变化的日期才重新读取，
+    未变化的日期直接切片复用旧表。
+    """
+
+    def __init__(self) -> None:
+        # 分区目录 -> (各日期的 (日期, mtime, 大小), 各日期在表中的行区间, 合并后的表)
+        self._entries: Dict[Path, Tuple[List[Tuple], Dict[date, Tuple[int, int]], "pa.Table"]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat(base: Path) -> List[Tuple[date, int, int]]:
+        out = []
+        if not base.is_dir():
+            return out
+        for entry in os.scandir(base):
+            if not entry.name.startswith("scraped_date="):
+                continue
+            try:
+                st = os.stat(os.path.join(entry.path, PART_FILE))
+            except FileNotFoundError:
+                continue
+            out.append((date.fromisoformat(entry.name.split("=", 1)[1]), st.st_mtime_ns, st.st_size))
+        return sorted(out)
+
+    def table(self, root: Path, bench: BenchType) -> "pa.Table":
+        base = root / f"bench={bench.value}"
+        sig = self._stat(base)
+        with self._lock:
+            cached = self._entries.get(base)
+            if cached and cached[0] == sig:
+                return cached[2]
+            old_sig = {s[0]: s for s in cached[0]} if cached else {}
+            pieces = []
+            for s in sig:
+                d = s[0]
+                if old_sig.get(d) == s:
+                    start, length = cached[1][d]
+                    pieces.append(cached[2].slice(start, length))
+                    continue
+                t = pq.ParquetFile(partition_path(root, bench, d) / PART_FILE).read(use_threads=False)
+                pieces.append(t.append_column("scraped_date", pa.array([d] * t.num_rows, pa.date32())))
+            schema = _schema().append(pa.field("scraped_date", pa.date32()))
+            table = pa.concat_tables(pieces).combine_chunks() if pieces else schema.empty_table()
+            offsets, pos = {}, 0
+            for s, p in zip(sig, pieces):
+                offsets[s[0]] = (pos, p.num_rows)
+                pos += p.num_rows
+            self._entries[base] = (sig, offsets, table)
+            return table
+
+
+_cache = _PartitionCache()
+
+
+def _mask(
+    table: "pa.Table",
+    models: Optional[Sequence[str]],
+    since: Optional[date],
+    until: Optional[date],
+) -> "pa.Table":
+    conds = []
+    if since:
+        conds.append(pc.greater_equal(table["scraped_date"], pa.scalar(since, pa.date32())))
+    if until:
+        conds.append(pc.less_equal(table["scraped_date"], pa.scalar(until, pa.date32())))
+    if models:
+        conds.append(pc.is_in(table["model"], pa.array(list(models), pa.string())))
+    if not conds:
+        return table
+    mask = conds[0]
+    for c in conds[1:]:
+        mask = pc.and_(mask, c)
+    return table.filter(mask)
+
+
+def trend(
+    benches: Optional[Sequence[BenchType]] = None,
+    models: Optional[Sequence[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    每个 (bench, model, scraped_date) 的最高分、最好名次与条目数，
+    按 bench、model、scraped_date 排序。
+    """
+    root = require_dir()
+    items: List[Dict[str, Any]] = []
+    for bench in sorted(benches or list(BenchType), key=lambda b: b.value):
+        t = _mask(_cache.table(root, bench), models, since, until)
+        t = t.filter(pc.is_valid(t["model"]))
+        agg = t.group_by(["model", "scraped_date"]).aggregate([
+            ("score", "max"),
+            ("rank", "min"),
+            ([], "count_all"),
+        ])
+        agg = agg.sort_by([("model", "ascending"), ("scraped_date", "ascending")])
+        days = pc.strftime(agg["scraped_date"], format="%Y-%m-%d")
+        items.extend(
+            {
+                "bench": bench.value,
+                "model": m,
+                "scraped_date": d,
+                "best_score": s,
+                "best_rank": r,
+                "entries": n,
+            }
+            for m, d, s, r, n in zip(
+                agg["model"].to_pylist(),
+                days.to_pylist(),
+                agg["score_max"].to_pylist(),
+                agg["rank_min"].to_pylist(),
+                agg["count_all"].to_pylist(),
+            )
+        )
+    return items
@@ -0,0 +1,133 @@
+from __future__ import annotations
+from typing import Callable, Dict, Optional, Tuple
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import BenchType, LatestResult, Result
+from ..utils.country import OrgCountryResolver, MAPPING_PATH
+from . import columnar, snapshots
+from .cache import invalidate
+from .identities import ORG, AliasRules, org_key, rules
+from .rollups import affected_dates, refresh_rollups
+
+_resolver: Optional[OrgCountryResolver] = None
+_aliases: Optional[AliasRules] = None
+_lock = threading.Lock()
+
+
+def get_resolver() -> OrgCountryResolver:
+    """
+    进程内共享的组织 -> 国家解析器：组织名按 org_key 归一化，
+    data/identity_aliases.yaml 中的组织别名沿用规范组织的国家。
+
+    第一次调用时加载，org_countries.yaml 或别名表修改后重新加载。
+    重新加载失败时打印原因并继续使用上一版规则；第一次加载失败直接抛出。
+    """
+    global _resolver, _aliases
+    alias_rules = rules()
+    mtime = os.path.getmtime(MAPPING_PATH) if os.path.exists(MAPPING_PATH) else None
+    with _lock:
+        if _resolver is None or _resolver.mtime != mtime or _aliases is not alias_rules:
+            try:
+                resolver = OrgCountryResolver(key=org_key, aliases=alias_rules.aliases(ORG))
+            except ValueError as e:
+                if _resolver is None:
+                    raise
+                print(f"重新加载组织-国家映射失败，继续使用上一版: {e}")
+            else:
+                _resolver, _aliases = resolver, alias_rules
+        return _resolver
+
+
+@dataclass
+class BackfillReport:
+    orgs: int  # org_country 有变化的组织数
+    rows: int  # 更新的 results 行数
+    elapsed_s: float
+    # 前后国家不同的组织：org -> (原国家, 新国家)，dry_run 时为将要做的修改
+    changes: Dict[str, Tuple[Optional[str], Optional[str]]] = field(default_factory=dict)
+
+
+# 进度回调：(已处理的组织数, 组织总数, 已更新的行数)
+BackfillProgress = Callable[[int, int, int], None]
+
+
+def _pending(session: Session, resolver: OrgCountryResolver) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """按 (org, org_country) 分组，找出现有国家与当前映射不一致的组织"""
+    stmt = (
+        select(Result.org, Result.org_country)
+        .where(Result.org.is_not(None))
+        .group_by(Result.org, Result.org_country)
+        .order_by(Result.org)
+    )
+    pending: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    for org, old in session.execute(stmt):
+        new = resolver.get_country(org)
+        if new != old:
+            pending.setdefault(org, (old, new))
+    return pending
+
+
+def _update_batch(session: Session, countries: Dict[str, Optional[str]]) -> int:
+    """
+    一批组织：results 与 latest_results 各一条 UPDATE ... CASE，
+    再重算受影响日期的汇总（启用 COLUMNAR_DIR 时同时重写这些日期的列式文件）
+    """
+    orgs = list(countries)
+    touched: Dict[BenchType, set] = {}
+    for bench, d in session.execute(
+        select(Result.bench, Result.scraped_date).where(Result.org.in_(orgs)).distinct()
+    ):
+        touched.setdefault(bench, set()).add(d)
+    rows = session.execute(
+        update(Result).where(Result.org.in_(orgs)).values(org_country=case(countries, value=Result.org))
+    ).rowcount
+    session.execute(
+        update(LatestResult).where(LatestResult.org.in_(orgs)).values(org_country=case(countries, value=LatestResult.org))
+    )
+    for bench, dates in touched.items():
+        # 增量模式下其后日期的重建结果随之改变
+        if snapshots.has_delta(session, bench):
+            dates = affected_dates(session, bench, min(dates))
+        refresh_rollups(session, bench, sorted(dates))
+        for d in dates:
+            columnar.export_snapshot(session, bench, d)
+    return rows
+
+
+def backfill_org_country(
+    batch_size: int = 200,
+    dry_run: bool = False,
+    progress: Optional[BackfillProgress] = None,
+) -> BackfillReport:
+    """
+    按当前的组织-国家映射重算全部历史数据的 org_country。
+
+    按 org 分组比较，只处理国家有变化的组织；每批组织一条 UPDATE ... CASE（results、latest_results 各一条），
+    连同受影响日期的国家汇总在一个事务中提交。中断后重新运行时已提交的组织不再有差异，
+    自动从未完成的部分继续。
+    """
+    started = time.perf_counter()
+    resolver = get_resolver()
+    with SessionLocal() as session:
+        pending = _pending(session, resolver)
+        orgs = list(pending)
+        done = rows = 0
+        if dry_run:
+            return BackfillReport(len(orgs), 0, time.perf_counter() - started, pending)
+        for i in range(0, len(orgs), batch_size):
+            batch = orgs[i:i + batch_size]
+            rows += _update_batch(session, {org: pending[org][1] for org in batch})
+            session.commit()
+            done += len(batch)
+            if progress:
+                progress(done, len(orgs), rows)
+    if orgs:
+        invalidate()
+    return BackfillReport(len(orgs), rows, time.perf_counter() - started, pending)
@@ -0,0 +1,172 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from datetime import date
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from ..db import SessionLocal, engine
+from ..models import Result, BenchType, QUERY_ORDER
+from . import snapshots
+from .pagination import sort_key
+
+# 导出的字段（与 ResultOut 一致，另加 scraped_date）
+FIELDS = (
+    "id",
+    "bench",
+    "rank",
+    "agent",
+    "model",
+    "org",
+    "nation",
+    "agent_org",
+    "model_org",
+    "score",
+    "score_error",
+    "date",
+    "scraped_date",
+)
+
+# 每次从数据库游标取出、并合并为一个输出块的行数
+CHUNK_ROWS = 1000
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _record(r: Any, scraped_date: date) -> Dict[str, Any]:
+    return {
+        "id": r.id,
+        "bench": r.bench.value,
+        "rank": r.rank,
+        "agent": r.agent,
+        "model": r.model,
+        "org": r.org,
+        "nation": r.org_country,
+        "agent_org": r.agent_org,
+        "model_org": r.model_org,
+        "score": r.score,
+        "score_error": r.score_error,
+        "date": r.date,
+        "scraped_date": scraped_date.isoformat(),
+    }
+
+
+def _ordered(benches: Sequence[BenchType]) -> List[BenchType]:
+    """导出的榜单顺序：按名称，与 /api/query 一致"""
+    return sorted(benches or list(BenchType), key=lambda b: b.name)
+
+
+def _iter_full(
+    benches: Sequence[BenchType],
+    models: Optional[Sequence[str]],
+    agents: Optional[Sequence[str]],
+    orgs: Optional[Sequence[str]],
+    nations: Optional[Sequence[str]],
+    since: Optional[date],
+    until: Optional[date],
+) -> Iterator[Dict[str, Any]]:
+    # 只取需要的列，走 Core 执行不构造 ORM 对象；yield_per 会启用服务端游标（stream_results），
+    # 结果按批从数据库取出，内存占用与表大小无关
+    cols = [getattr(Result, c) for c in (
+        "id", "bench", "rank", "agent", "model", "org", "org_country",
+        "agent_org", "model_org", "score", "score_error", "date", "scraped_date",
+    )]
+    stmt = select(*cols)
+    if models:
+        stmt = stmt.where(Result.model.in_(models))
+    if agents:
+        stmt = stmt.where(Result.agent.in_(agents))
+    if orgs:
+        stmt = stmt.where(Result.org.in_(orgs))
+    if nations:
+        stmt = stmt.where(Result.org_country.in_(nations))
+    if since:
+        stmt = stmt.where(Result.scraped_date >= since)
+    if until:
+        stmt = stmt.where(Result.scraped_date <= until)
+
+    with engine.connect() as conn:
+        # 与增量模式相同的顺序：逐个榜单（按名称），每个快照内按 QUERY_ORDER
+        for bench in _ordered(benches):
+            q = stmt.where(Result.bench == bench).order_by(Result.scraped_date, *QUERY_ORDER[1:])
+            result = conn.execute(q.execution_options(yield_per=CHUNK_ROWS))
+            for row in result:
+                values = list(row)
+                values[1] = values[1].value
+                values[-1] = values[-1].isoformat()
+                yield dict(zip(FIELDS, values))
+
+
+def _iter_delta(
+    benches: Sequence[BenchType],
+    models: Optional[Sequence[str]],
+    agents: Optional[Sequence[str]],
+    orgs: Optional[Sequence[str]],
+    nations: Optional[Sequence[str]],
+    since: Optional[date],
+    until: Optional[date],
+) -> Iterator[Dict[str, Any]]:
+    # 增量模式：逐个快照重建后输出，内存占用为变更记录本身，与导出行数无关
+    with SessionLocal() as session:
+        for bench in _ordered(benches):
+            for d, rows in snapshots.iter_snapshots(session, bench, models, since, until):
+                for r in sorted(rows, key=sort_key):
+                    if (not agents or r.agent in agents) and (not orgs or r.org in orgs) \
+                            and (not nations or r.org_country in nations):
+                        yield _record(r, d)
+
+
+def iter_records(
+    benches: Sequence[BenchType] = (),
+    models: Optional[Sequence[str]] = None,
+    agents: Optional[Sequence[str]] = None,
+    orgs: Optional[Sequence[str]] = None,
+    nations: Optional[Sequence[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> Iterator[Dict[str, Any]]:
+    """按 /api/query 的过滤条件与 scraped_date 范围逐行产出导出记录"""
+    with SessionLocal() as session:
+        delta = snapshots.any_delta(session, benches)
+    if delta:
+        return _iter_delta(benches, models, agents, orgs, nations, since, until)
+    return _iter_full(benches, models, agents, orgs, nations, since, until)
+
+
+def _chunks(records: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def to_ndjson(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for chunk in _chunks(records):
+        yield "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in chunk)
+
+
+def to_csv(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS, lineterminator="\n")
+    writer.writeheader()
+    yield buf.getvalue()
+    for chunk in _chunks(records):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(chunk)
+        yield buf.getvalue()
+
+
+def render(fmt: str, records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    if fmt == "csv":
+        return to_csv(records)
+    return to_ndjson(records)
@@ -0,0 +1,203 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime
+import os
+import re
+import threading
+
+import yaml
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import Identity, IdentityAlias, LatestResult, Result
+from .payloads import batched_pairs, insert_ignore
+
+MODEL = "model"
+ORG = "org"
+
+_DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/identity_aliases.yaml"))
+
+# 字母后紧跟数字处断开：qwen3 -> qwen 3、gpt4o -> gpt 4o
+_LETTER_DIGIT = re.compile(r"(?<=[a-z])(?=\d)")
+_SEPARATORS = re.compile(r"[^0-9a-z\u4e00-\u9fff]+")
+# 组织名末尾可省略的公司后缀
+_ORG_SUFFIXES = {"inc", "ltd", "llc", "corp", "corporation", "co", "company", "limited", "gmbh", "pbc"}
+
+
+def model_key(name: str) -> str:
+    """
+    模型名 -> 匹配键：小写，去掉供应商前缀（openai/gpt-5），标点与空白统一为分隔符；
+    字母词按字母序排列、数字保持原顺序，claude-3-5-sonnet 与 Claude Sonnet 3.5 得到同一个键。
+    末尾的发布日期保留在键中（gpt-4o-2024-05-13 与 gpt-4o-2024-08-06 是不同的模型），
+    需要合并的带日期写法在别名表中登记。
+    """
+    s = name.strip().lower().rsplit("/", 1)[-1]
+    tokens = [t for t in _SEPARATORS.split(_LETTER_DIGIT.sub(" ", s)) if t]
+    words = sorted(t for t in tokens if not t.isdigit())
+    return "-".join(words + [t for t in tokens if t.isdigit()]) or name.strip().lower()
+
+
+def org_key(name: str) -> str:
+    """组织名 -> 匹配键：小写，合并空白，去掉末尾的 Inc. / Ltd. 等后缀"""
+    tokens = [t for t in re.split(r"[\s,]+", name.strip().lower()) if t]
+    while len(tokens) > 1 and tokens[-1].rstrip(".") in _ORG_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+_KEYS = {MODEL: model_key, ORG: org_key}
+
+
+class AliasRules:
+    """data/identity_aliases.yaml：规范名称与其他写法，按匹配键索引"""
+
+    def __init__(self, path: str = _DEFAULT_PATH) -> None:
+        self.path = path
+        self.mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        # kind -> 匹配键 -> (规范匹配键, 规范名称)
+        self._index: Dict[str, Dict[str, Tuple[str, str]]] = {MODEL: {}, ORG: {}}
+        if self.mtime is None:
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        for kind, section in ((MODEL, "models"), (ORG, "orgs")):
+            for name, aliases in (data.get(section) or {}).items():
+                name = str(name).strip()
+                canon = (_KEYS[kind](name), name)
+                for spelling in [name, *(aliases or [])]:
+                    self._index[kind][_KEYS[kind](str(spelling))] = canon
+
+    def aliases(self, kind: str) -> Dict[str, str]:
+        """匹配键 -> 规范名称（含规范名本身）"""
+        return {key: name for key, (_, name) in self._index[kind].items()}
+
+    def canonical(self, kind: str, name: str) -> Tuple[str, str]:
+        """原始写法 -> (规范匹配键, 规范名称)；别名表中没有时名称为该写法本身"""
+        key = _KEYS[kind](name)
+        return self._index[kind].get(key, (key, name.strip()))
+
+
+_rules: Optional[AliasRules] = None
+_rules_lock = threading.Lock()
+
+
+def rules() -> AliasRules:
+    """当前的别名规则，文件修改后自动重新读取"""
+    global _rules
+    mtime = os.path.getmtime(_DEFAULT_PATH) if os.path.exists(_DEFAULT_PATH) else None
+    with _rules_lock:
+        if _rules is None or _rules.mtime != mtime:
+            _rules = AliasRules()
+        return _rules
+
+
+def canonical_key(kind: str, name: str) -> str:
+    return rules().canonical(kind, name)[0]
+
+
+class IdentityResolver:
+    """
+    入库时把原始写法解析为 identities.id。
+
+    已登记的写法直接查 identity_aliases；新写法按别名规则算出匹配键，
+    找到（或创建）对应的 identities 行后登记。同一次入库内按写法缓存，每批只查一次库。
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.session = session
+        self.rules = rules()
+        self._ids: Dict[Tuple[str, str], int] = {}
+
+    def resolve_many(self, kind: str, names: Iterable[Optional[str]]) -> Dict[str, int]:
+        names = {n for n in names if n}
+        wanted = sorted(n for n in names if (kind, n) not in self._ids)
+        if wanted:
+            found = batched_pairs(self.session, IdentityAlias.alias, IdentityAlias.identity_id, wanted,
+                                  IdentityAlias.kind == kind)
+            missing = [n for n in wanted if n not in found]
+            if missing:
+                found.update(self._register(kind, missing))
+            self._ids.update(((kind, n), i) for n, i in found.items())
+        return {n: self._ids[(kind, n)] for n in names}
+
+    def _register(self, kind: str, names: List[str]) -> Dict[str, int]:
+        canon = {n: self.rules.canonical(kind, n) for n in names}
+        now = datetime.utcnow()
+        # 同一个键的多个写法中，先出现的作为名称（已存在的行不改）
+        new: Dict[str, Dict[str, Any]] = {}
+        for key, name in canon.values():
+            new.setdefault(key, {"kind": kind, "key": key, "name": name, "created_at": now})
+        insert_ignore(self.session, Identity.__table__, list(new.values()), ["kind", "key"])
+        ids = batched_pairs(self.session, Identity.key, Identity.id, sorted(new), Identity.kind == kind)
+        aliases = [{"kind": kind, "alias": n, "identity_id": ids[canon[n][0]]} for n in names]
+        insert_ignore(self.session, IdentityAlias.__table__, aliases, ["kind", "alias"])
+        return {n: ids[canon[n][0]] for n in names}
+
+    def assign(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """为一批 results 行填上 model_id / org_id"""
+        models = self.resolve_many(MODEL, (r["model"] for r in rows))
+        orgs = self.resolve_many(ORG, (r["org"] for r in rows))
+        for r in rows:
+            r["model_id"] = models.get(r["model"])
+            r["org_id"] = orgs.get(r["org"])
+
+
+def identity_ids(session: Session, kind: str, names: Sequence[str]) -> Dict[str, int]:
+    """查询用：名称（不必是榜单中的原始写法）-> identities.id，未收录的不在结果中"""
+    keys = {n: canonical_key(kind, n) for n in names}
+    ids = batched_pairs(session, Identity.key, Identity.id, sorted(set(keys.values())), Identity.kind == kind)
+    return {n: ids[k] for n, k in keys.items() if k in ids}
+
+
+def spellings(session: Session, kind: str, ids: Sequence[int]) -> List[str]:
+    """这些实体在榜单中出现过的全部原始写法"""
+    stmt = select(IdentityAlias.alias).where(IdentityAlias.kind == kind, IdentityAlias.identity_id.in_(list(ids)))
+    return sorted(session.execute(stmt).scalars()) if ids else []
+
+
+# 需要解析的列：(表, 名称列, 实体 id 列, kind)
+_TARGETS = (
+    (Result, "model", "model_id", MODEL),
+    (Result, "org", "org_id", ORG),
+    (LatestResult, "model", "model_id", MODEL),
+)
+
+
+def resolve_missing(session: Session) -> int:
+    """为 model_id / org_id 为空的行补上规范实体，每个写法一条 UPDATE（executemany）；返回补上的写法数"""
+    resolver = IdentityResolver(session)
+    resolved = 0
+    for model, name_col, id_col, kind in _TARGETS:
+        table = model.__table__
+        names = session.execute(
+            select(table.c[name_col]).distinct().where(table.c[id_col].is_(None), table.c[name_col].is_not(None))
+        ).scalars().all()
+        if not names:
+            continue
+        ids = resolver.resolve_many(kind, names)
+        stmt = (
+            update(table)
+            .where(table.c[name_col] == bindparam("_name"), table.c[id_col].is_(None))
+            .values({id_col: bindparam("_id")})
+        )
+        session.execute(stmt, [{"_name": n, "_id": ids[n]} for n in names])
+        resolved += len(names)
+    return resolved
+
+
+def ensure_identities(rebuild: bool = False) -> int:
+    """
+    旧库升级：见 resolve_missing。
+    rebuild=True 时（修改别名表后）先清空实体表与全部 id，再按当前规则重新解析。
+    """
+    with SessionLocal() as session:
+        if rebuild:
+            for model, _, column, _ in _TARGETS:
+                session.execute(update(model.__table__).values({column: None}))
+            session.execute(delete(IdentityAlias))
+            session.execute(delete(Identity))
+        resolved = resolve_missing(session)
+        if resolved or rebuild:
+            session.commit()
+        return resolved
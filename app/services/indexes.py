@@ -0,0 +1,123 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import re
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+from ..db import Base
+
+
+@dataclass
+class Plan:
+    """一条语句的执行计划中用到的索引与全表扫描的表"""
+    statement: str
+    indexes: set[str] = field(default_factory=set)
+    full_scans: set[str] = field(default_factory=set)
+    text: str = ""
+
+
+@dataclass(frozen=True)
+class IndexCheck:
+    """一个接口 / 写入路径的查询形状，以及它应当用到的索引（任一即可）"""
+    name: str
+    indexes: Tuple[str, ...]
+
+
+# 各接口（全量存储模式）的查询应当用到的索引，scripts/explain_indexes.py 逐项检查
+CHECKS = (
+    IndexCheck("GET /api/benches/{bench}/models?latest_only=false", ("idx_results_bench_date",)),
+    IndexCheck("GET /api/models/{model}/benches?latest_only=false", ("idx_results_model_id",)),
+    IndexCheck("GET /api/models/{model}/trend", ("idx_results_model_id",)),
+    IndexCheck("GET /api/query?limit=50", ("idx_query_order",)),
+    IndexCheck("GET /api/export?scraped_from={date}", ("idx_results_date_bench",)),
+    IndexCheck("GET /api/benches/{bench}/models", ("idx_latest_bench_current",)),
+    IndexCheck("GET /api/models/{model}/benches", ("idx_latest_model_id",)),
+    IndexCheck("POST /api/models/benches", ("idx_latest_model_id",)),
+    IndexCheck("POST /api/models/benches?latest_only=false", ("idx_results_model_id",)),
+    IndexCheck("GET /api/stats/orgs", ("idx_org_rollup_bench_date",)),
+    IndexCheck("GET /api/stats/nations", ("idx_nation_rollup_bench_date",)),
+    IndexCheck("ingest: 预取当天已有行", ("idx_results_date_bench",)),
+    IndexCheck("ingest: 刷新 latest_results", ("idx_results_bench_date", "idx_results_model_history")),
+    IndexCheck("ingest: 刷新汇总表", ("idx_results_bench_date",)),
+)
+
+_TABLES = set(Base.metadata.tables)
+
+# SQLite: "SEARCH results USING INDEX idx (bench=?)" / "SCAN results USING COVERING INDEX idx" / "SCAN results"
+_SQLITE = re.compile(r"^(SCAN|SEARCH) (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+))?")
+# PostgreSQL: "Index Scan using idx on results" / "Bitmap Index Scan on idx" / "Seq Scan on results"
+_PG_INDEX = re.compile(r"(?:Index Scan|Index Only Scan) using (\w+)|Bitmap Index Scan on (\w+)")
+_PG_SEQ = re.compile(r"Seq Scan on (\w+)")
+
+
+@contextmanager
+def capture(engine: Engine) -> Iterator[List[Tuple[str, Any]]]:
+    """记录 with 块中执行的查询语句（SELECT、INSERT ... SELECT、DELETE）及参数"""
+    captured: List[Tuple[str, Any]] = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        head = statement.lstrip().split(None, 1)[0].upper()
+        if executemany or head not in ("SELECT", "INSERT", "DELETE", "WITH"):
+            return
+        if head == "INSERT" and "SELECT" not in statement.upper():
+            return
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def explain(conn: Connection, statement: str, parameters: Any) -> Plan:
+    """按数据库类型执行 EXPLAIN（不执行语句本身），解析用到的索引与全表扫描"""
+    dialect = conn.dialect.name
+    plan = Plan(statement=statement)
+    if dialect == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        lines = [r[-1] for r in rows]
+        for line in lines:
+            m = _SQLITE.match(line)
+            if not m or m.group(2) not in _TABLES:
+                continue
+            if m.group(3):
+                plan.indexes.add(m.group(3))
+            elif m.group(1) == "SCAN":
+                plan.full_scans.add(m.group(2))
+    elif dialect == "postgresql":
+        lines = [r[0] for r in conn.exec_driver_sql("EXPLAIN " + statement, parameters).all()]
+        for line in lines:
+            for m in _PG_INDEX.finditer(line):
+                plan.indexes.add(m.group(1) or m.group(2))
+            for m in _PG_SEQ.finditer(line):
+                if m.group(1) in _TABLES:
+                    plan.full_scans.add(m.group(1))
+    elif dialect == "mysql":
+        result = conn.exec_driver_sql("EXPLAIN " + statement, parameters)
+        keys = list(result.keys())
+        lines = []
+        for row in result.all():
+            r: Dict[str, Any] = dict(zip(keys, row))
+            lines.append(" ".join(f"{k}={v}" for k, v in r.items() if v is not None))
+            if r.get("key"):
+                plan.indexes.add(r["key"])
+            elif r.get("type") == "ALL" and r.get("table") in _TABLES:
+                plan.full_scans.add(r["table"])
+    else:
+        raise ValueError(f"不支持的数据库类型: {dialect}")
+    plan.text = "\n".join(str(line) for line in lines)
+    return plan
+
+
+def explain_all(engine: Engine, run: Callable[[], Any], prepare: Optional[Callable[[Connection], None]] = None) -> List[Plan]:
+    """执行 run()，对其间发出的每条查询做 EXPLAIN"""
+    with capture(engine) as captured:
+        run()
+    with engine.connect() as conn:
+        if prepare:
+            prepare(conn)
+        return [explain(conn, stmt, params) for stmt, params in captured]
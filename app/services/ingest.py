@@ -1,154 +1,344 @@
 from __future__ import annotations
-from typing import Any, Dict, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
 import json
+import os
 from datetime import date, datetime
+from itertools import islice
 
 from sqlalchemy import select, delete
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
 
-from ..db import SessionLocal, engine, Base
-from ..models import Result, BenchType
+from ..db import SessionLocal, engine, Base, upgrade_schema
+from ..models import Result, BenchType, FetchState, Snapshot
 from ..utils.country import OrgCountryResolver
-from ..scrapers.terminal_bench import fetch_terminal_bench
-from ..scrapers.osworld import fetch_osworld
+from .countries import get_resolver
+from ..scrapers import SCRAPERS
+from ..scrapers.conditional import Validators
+from ..scrapers.http_client import UpstreamError
+from .pipeline import SourceResult, fetch_all
+from .upsert import BulkUpserter, build_row
+from .payloads import encode_payload, prune_payloads
+from .snapshots import DELTA, DeltaWriter, next_delta, rebase_next, storage_mode
+from .latest import ensure_latest, refresh_latest
+from .rollups import affected_dates, ensure_rollups, refresh_rollups
+from .cache import invalidate
+from .identities import IdentityResolver, ensure_identities
+from . import columnar
+
+# 每批 upsert 的行数
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+
+# 进度回调：(阶段 fetching | ingesting, 数据源名, 该源已写入的条目数)
+Progress = Callable[[str, Optional[str], int], None]
 
 
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
+    upgrade_schema()
+    ensure_identities()
+    ensure_latest()
+    ensure_rollups()
+
+
+def _bench_type(bench: str) -> BenchType:
+    return BenchType(bench)
 
 
-def _upsert_result(
-    session: Session, 
-    resolver: OrgCountryResolver, 
+def _to_row(
+    resolver: OrgCountryResolver,
     item: Dict[str, Any],
-    scraped_date: date
-) -> Tuple[bool, Result]:
+    scraped_date: date,
+    now: datetime,
+    payloads: Dict[str, str],
+    unresolved: Set[str],
+) -> Dict[str, Any]:
     """
-    插入或更新记录。
+    把爬虫返回的条目转换为 results 表的一行。
     按天去重：同一天（scraped_date）+ bench + rank + agent + model 唯一。
-    如果已存在，则更新；否则插入。
+    原始数据按内容哈希收集到 payloads，行中只保存哈希。
+    映射中没有的组织记入 unresolved。
     """
-    bench = item.get("bench")
-    if bench == "terminal-bench":
-        bench_type = BenchType.TERMINAL_BENCH
-    else:
-        bench_type = BenchType.OSWORLD
-
     org = item.get("org") or item.get("agent_org") or item.get("model_org")
     nation = resolver.get_country(org)
-
-    # 查找当天是否已有相同记录
-    stmt = select(Result).where(
-        Result.bench == bench_type,
-        Result.rank == item.get("rank"),
-        Result.agent == item.get("agent"),
-        Result.model == item.get("model"),
-        Result.scraped_date == scraped_date,
+    if org and not resolver.is_known(org):
+        unresolved.add(org)
+    raw_hash, payload = encode_payload(item.get("raw"))
+    if raw_hash:
+        payloads[raw_hash] = payload
+    return build_row(
+        item,
+        _bench_type(item.get("bench")),
+        org,
+        nation,
+        raw_hash,
+        scraped_date,
+        now,
     )
-    existing = session.execute(stmt).scalars().first()
-
-    if existing:
-        # 更新已有记录
-        existing.org = org
-        existing.org_country = nation
-        existing.agent_org = item.get("agent_org")
-        existing.model_org = item.get("model_org")
-        existing.score = item.get("score")
-        existing.score_error = item.get("score_error")
-        existing.date = item.get("date")
-        existing.raw_json = json.dumps(item.get("raw"), ensure_ascii=False)
-        existing.updated_at = datetime.utcnow()
-        return False, existing
-    else:
-        # 插入新记录
-        r = Result(
-            bench=bench_type,
-            rank=item.get("rank"),
-            agent=item.get("agent"),
-            model=item.get("model"),
-            org=org,
-            org_country=nation,
-            agent_org=item.get("agent_org"),
-            model_org=item.get("model_org"),
-            score=item.get("score"),
-            score_error=item.get("score_error"),
-            date=item.get("date"),
-            raw_json=json.dumps(item.get("raw"), ensure_ascii=False),
-            scraped_date=scraped_date,
+
+
+@dataclass
+class IngestReport:
+    inserted: int
+    updated: int
+    total: int
+    sources: List[SourceResult] = field(default_factory=list)
+    # 组织-国家映射中没有的组织（按名称排序），补充到 data/org_countries.yaml
+    unresolved_orgs: List[str] = field(default_factory=list)
+
+    @property
+    def status(self) -> str:
+        """
+        ok: 全部数据源成功；unchanged: 全部数据源内容未变化，未写库；
+        partial: 部分数据源失败
+        """
+        if any(s.failed for s in self.sources):
+            return "partial"
+        if self.sources and all(s.status == "unchanged" for s in self.sources):
+            return "unchanged"
+        return "ok"
+
+
+def resolve_benches(bench: str) -> List[str]:
+    if bench == "all":
+        return list(SCRAPERS)
+    if bench in SCRAPERS:
+        return [bench]
+    raise ValueError("bench 必须是 " + " | ".join(f"'{n}'" for n in [*SCRAPERS, "all"]))
+
+
+def _load_validators(session: Session, names: List[str], target_date: date, explicit: bool) -> Dict[str, Validators]:
+    """
+    可用于条件请求的校验信息。只描述上游在其 scraped_date 那天的内容：
+
+    - 同一天重新采集：那天的快照还在时可以跳过
+    - 之后的默认采集（未指定日期）：上游未变化即无需新快照，查询取最近一次的数据
+    - 指定的其他日期：总是解析并写入，否则那天没有快照
+    """
+    states = session.execute(select(FetchState).where(FetchState.source.in_(names))).scalars().all()
+    snapped = set(session.execute(
+        select(Snapshot.bench).where(
+            Snapshot.bench.in_([_bench_type(n) for n in names]), Snapshot.scraped_date == target_date,
         )
-        session.add(r)
-        return True, r
+    ).scalars())
+    usable = {}
+    for r in states:
+        if r.scraped_date is None:
+            # 升级前记录的校验信息不知道属于哪天，只用于默认采集
+            ok = not explicit
+        elif r.scraped_date == target_date:
+            ok = _bench_type(r.source) in snapped
+        else:
+            ok = not explicit and target_date > r.scraped_date
+        if ok:
+            usable[r.source] = Validators(etag=r.etag, last_modified=r.last_modified, body_hash=r.body_hash)
+    return usable
 
 
-def ingest(bench: str, target_date: date = None) -> Tuple[int, int, int]:
+def _save_validators(session: Session, source: SourceResult, scraped_date: date) -> None:
+    if source.validators is None:
+        return
+    state = session.get(FetchState, source.name) or FetchState(source=source.name)
+    # 补采更早的日期不覆盖：校验信息应对应最新的快照
+    if state.scraped_date is not None and scraped_date < state.scraped_date:
+        return
+    state.url = SCRAPERS[source.name].url
+    state.etag = source.validators.etag
+    state.last_modified = source.validators.last_modified
+    state.body_hash = source.validators.body_hash
+    state.scraped_date = scraped_date
+    state.updated_at = datetime.utcnow()
+    session.add(state)
+
+
+def _save_snapshot(session: Session, source: SourceResult, scraped_date: date) -> None:
+    bench_type = _bench_type(source.name)
+    snap = session.execute(
+        select(Snapshot).where(Snapshot.bench == bench_type, Snapshot.scraped_date == scraped_date)
+    ).scalar_one_or_none()
+    if snap is None:
+        snap = Snapshot(bench=bench_type, scraped_date=scraped_date)
+    snap.meta_json = json.dumps(source.meta, ensure_ascii=False) if source.meta else None
+    snap.row_count = source.count
+    snap.storage_mode = storage_mode()
+    snap.updated_at = datetime.utcnow()
+    session.add(snap)
+
+
+def _ingest_source(
+    resolver: OrgCountryResolver,
+    source: SourceResult,
+    scraped_date: date,
+    now: datetime,
+    unresolved: Set[str],
+    progress: Optional[Progress] = None,
+) -> Tuple[int, int]:
     """
-    爬取并入库数据。
-    
-    Args:
-        bench: 'terminal-bench' | 'osworld' | 'all'
-        target_date: 爬取日期，默认为今天。同一天的数据会覆盖之前的记录。
-    
-    Returns:
-        (inserted, updated, total)
+    把一个数据源的条目流按批写库。
+
+    每个数据源（即一份 bench + scraped_date 快照）单独一个事务：
+    条目、快照元数据、latest_results、汇总表与条件请求缓存一起提交，中途出错只回滚该数据源。
+    启用 COLUMNAR_DIR 时当天的列式文件在提交成功后写出，回滚时不写。
+
+    增量模式下只写入相对上一快照新增（计入 inserted）、变化或被移除
+    （计入 updated）的行。补采早于已有快照的日期时，其后一天的增量快照改写为
+    相对新写入数据的变更，其后各日期重建出的榜单不变。
+    """
+    inserted = 0
+    updated = 0
+    delta = storage_mode() == DELTA
+    bench_type = _bench_type(source.name)
+    with SessionLocal() as session:
+        following = next_delta(session, bench_type, scraped_date)
+        if delta:
+            upserter = DeltaWriter(session, bench_type, scraped_date)
+        else:
+            upserter = BulkUpserter(session, scraped_date)
+        identities = IdentityResolver(session)
+        while True:
+            batch = list(islice(source.items, BATCH_SIZE))
+            if not batch:
+                break
+            payloads: Dict[str, str] = {}
+            rows = [_to_row(resolver, it, scraped_date, now, payloads, unresolved) for it in batch]
+            identities.assign(rows)
+            ins, upd = upserter.upsert(rows, payloads)
+            inserted += ins
+            updated += upd
+            source.count += len(batch)
+            if progress:
+                progress("ingesting", source.name, source.count)
+        if delta:
+            updated += upserter.finish()
+        _save_snapshot(session, source, scraped_date)
+        rebase_next(session, bench_type, following)
+        refresh_latest(session, bench_type)
+        refresh_rollups(session, bench_type, [scraped_date])
+        columnar.export_snapshot(session, bench_type, scraped_date)
+        # 校验信息与数据在同一事务提交，入库失败时不会误判为 unchanged
+        _save_validators(session, source, scraped_date)
+        session.commit()
+    # 数据已变化，使查询接口的响应缓存失效
+    invalidate()
+    return inserted, updated
+
+
+def run_ingest(
+    bench: str,
+    target_date: date = None,
+    force: bool = False,
+    progress: Optional[Progress] = None,
+    explicit: Optional[bool] = None,
+) -> IngestReport:
+    """
+    并发爬取各数据源并入库。
+
+    某个数据源失败或超时时，其余数据源的结果照常入库，
+    各源状态记录在 IngestReport.sources 中；全部失败时抛出异常。
+
+    数据源内容自上次入库以来未变化（304 或正文哈希一致）时，
+    该源标记为 unchanged，跳过解析与写库。force=True 时忽略缓存。
+    explicit 表示日期由调用方指定（默认按 target_date 是否为空判断）：
+    指定的日期还没有快照时总是解析并写入，见 _load_validators。
+    progress 在开始抓取与每写入一批后被调用。
+    本次出现、组织-国家映射中没有的组织记在 IngestReport.unresolved_orgs。
     """
+    names = resolve_benches(bench)
     init_db()
-    resolver = OrgCountryResolver()
-    
+    # 进程内共享，映射文件修改后自动重新加载
+    resolver = get_resolver()
+    unresolved: Set[str] = set()
+
+    if explicit is None:
+        explicit = target_date is not None
     if target_date is None:
         target_date = date.today()
 
-    if bench == "terminal-bench":
-        items = fetch_terminal_bench()
-    elif bench == "osworld":
-        items = fetch_osworld()
-    elif bench == "all":
-        items = fetch_terminal_bench() + fetch_osworld()
-    else:
-        raise ValueError("bench 必须是 'terminal-bench' | 'osworld' | 'all'")
+    previous: Dict[str, Validators] = {}
+    if not force:
+        with SessionLocal() as session:
+            previous = _load_validators(session, names, target_date, explicit)
+
+    if progress:
+        progress("fetching", None, 0)
+    sources = fetch_all(names, previous=previous)
+    if all(s.failed for s in sources):
+        raise UpstreamError("; ".join(f"{s.name}: {s.error}" for s in sources))
 
     inserted = 0
     updated = 0
-    
-    with SessionLocal() as session:
-        for it in items:
+    now = datetime.utcnow()
+
+    try:
+        for source in sources:
+            if not source.ok:
+                continue
             try:
-                created, _ = _upsert_result(session, resolver, it, target_date)
-                if created:
-                    inserted += 1
-                else:
-                    updated += 1
-            except IntegrityError:
-                # 唯一索引冲突，回滚并跳过
-                session.rollback()
-                updated += 1
+                ins, upd = _ingest_source(resolver, source, target_date, now, unresolved, progress)
+            except Exception as e:
+                source.status, source.error = "error", str(e) or e.__class__.__name__
+                source.count = 0
                 continue
-        session.commit()
+            inserted += ins
+            updated += upd
+    finally:
+        for source in sources:
+            source.close()
+
+    if all(s.failed for s in sources):
+        raise RuntimeError("; ".join(f"{s.name}: {s.error}" for s in sources))
 
-    return inserted, updated, len(items)
+    total = sum(s.count for s in sources if s.ok)
+    return IngestReport(inserted, updated, total, sources, sorted(unresolved))
+
+
+def ingest(bench: str, target_date: date = None) -> Tuple[int, int, int]:
+    """
+    爬取并入库数据。
+    
+    Args:
+        bench: 已注册的榜单名或 'all'
+        target_date: 爬取日期，默认为今天。同一天的数据会覆盖之前的记录。
+    
+    Returns:
+        (inserted, updated, total)
+    """
+    report = run_ingest(bench, target_date)
+    return report.inserted, report.updated, report.total
 
 
 def delete_by_date(bench: str, target_date: date) -> int:
     """
-    删除指定日期的数据。
+    删除指定日期的数据。其后一天的增量快照先改写为相对更早状态的变更，
+    其余日期重建出的榜单不受影响。
     
     Args:
-        bench: 'terminal-bench' | 'osworld' | 'all'
+        bench: 已注册的榜单名或 'all'
         target_date: 要删除的日期
     
     Returns:
         删除的记录数
     """
     with SessionLocal() as session:
-        stmt = delete(Result).where(Result.scraped_date == target_date)
-        
-        if bench == "terminal-bench":
-            stmt = stmt.where(Result.bench == BenchType.TERMINAL_BENCH)
-        elif bench == "osworld":
-            stmt = stmt.where(Result.bench == BenchType.OSWORLD)
-        elif bench != "all":
-            raise ValueError("bench 必须是 'terminal-bench' | 'osworld' | 'all'")
-        
+        benches = [_bench_type(name) for name in resolve_benches(bench)]
+        stmt = delete(Result).where(Result.scraped_date == target_date, Result.bench.in_(benches))
+        snap_stmt = delete(Snapshot).where(Snapshot.scraped_date == target_date, Snapshot.bench.in_(benches))
+
+        # 删除前记下需要重新汇总的日期（增量模式下包括其后的快照）
+        rollup_dates = {name: affected_dates(session, _bench_type(name), target_date) for name in resolve_benches(bench)}
+        # 其后按增量存储的快照删除后改为相对更早的状态记录，不随被删的这天丢失变化
+        following = {b: next_delta(session, b, target_date) for b in benches}
         result = session.execute(stmt)
+        session.execute(snap_stmt)
+        for b in benches:
+            rebase_next(session, b, following[b])
+        for name in resolve_benches(bench):
+            refresh_latest(session, _bench_type(name))
+            refresh_rollups(session, _bench_type(name), rollup_dates[name])
+            columnar.remove_partition(session, _bench_type(name), target_date)
+        prune_payloads(session)
+        # 清除条件请求缓存，保证下次采集能重新写入被删除的数据
+        session.execute(delete(FetchState).where(FetchState.source.in_(resolve_benches(bench))))
         session.commit()
+        invalidate()
         return result.rowcount
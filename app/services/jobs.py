@@ -0,0 +1,218 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Set, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+import os
+import threading
+import time
+import uuid
+
+from .ingest import IngestReport, resolve_benches, run_ingest
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """一次采集任务：bench + scraped_date，由后台线程执行"""
+    id: str
+    bench: str
+    scraped_date: date
+    force: bool
+    # 日期由调用方指定；未指定时为提交当天，按默认采集处理（见 run_ingest）
+    explicit: bool = False
+    status: str = QUEUED
+    # 进度：queued | waiting（同一榜单有任务在执行或排在前面）| fetching | ingesting | done
+    stage: str = "queued"
+    source: Optional[str] = None
+    rows: int = 0
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    report: Optional[IngestReport] = None
+    error: Optional[str] = None
+    exc: Optional[BaseException] = field(default=None, repr=False)
+    future: Optional[Future] = field(default=None, repr=False)
+    _t_created: float = field(default_factory=time.monotonic, repr=False)
+    _t_started: Optional[float] = field(default=None, repr=False)
+    _t_finished: Optional[float] = field(default=None, repr=False)
+
+    @property
+    def key(self) -> Tuple[str, date]:
+        return self.bench, self.scraped_date
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        queue_ms = run_ms = None
+        if self._t_started is not None:
+            queue_ms = round((self._t_started - self._t_created) * 1000, 1)
+            run_ms = round(((self._t_finished or time.monotonic()) - self._t_started) * 1000, 1)
+        result = None
+        if self.report is not None:
+            r = self.report
+            result = {
+                "bench": self.bench,
+                "inserted": r.inserted,
+                "updated": r.updated,
+                "total": r.total,
+                "status": r.status,
+                "sources": [
+                    {"name": s.name, "status": s.status, "latency_ms": s.latency_ms, "count": s.count, "error": s.error}
+                    for s in r.sources
+                ],
+                "unresolved_orgs": r.unresolved_orgs,
+            }
+        return {
+            "id": self.id,
+            "bench": self.bench,
+            "scraped_date": self.scraped_date.isoformat(),
+            "force": self.force,
+            "status": self.status,
+            "progress": {"stage": self.stage, "source": self.source, "rows": self.rows},
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_ms": queue_ms,
+            "run_ms": run_ms,
+            "result": result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """
+    采集任务队列：提交后立即返回任务，由后台线程池执行。
+
+    同一 bench + scraped_date 尚未完成的任务只保留一个，重复提交返回已有任务；
+    bench=all 与单个榜单的任务、不同日期的任务对同一榜单串行写库。
+    任务在涉及的榜单都空闲时才交给线程池，等待其他任务的不占用线程；
+    同一榜单的任务按提交顺序执行。
+    任务只保存在本进程内，已完成的任务保留最近 history 个。
+    """
+
+    def __init__(self, workers: int = 2, history: int = 100) -> None:
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[Tuple[str, date], Job] = {}
+        # 尚未交给线程池的任务（按提交顺序）及其涉及的榜单
+        self._pending: List[Tuple[Job, List[str]]] = []
+        # 已交给线程池、尚未结束的任务占用的榜单
+        self._busy: Set[str] = set()
+
+    @classmethod
+    def from_env(cls) -> "JobQueue":
+        return cls(
+            workers=int(os.getenv("SCRAPE_WORKERS", "2")),
+            history=int(os.getenv("JOB_HISTORY", "100")),
+        )
+
+    def submit(self, bench: str, scraped_date: Optional[date] = None, force: bool = False) -> Tuple[Job, bool]:
+        """
+        提交采集任务，返回 (任务, 是否新建)。
+
+        已有同一 bench + 日期的任务在排队或执行时直接返回它；
+        该任务仍在排队时，本次的 force 与指定的日期一并生效。
+        """
+        names = resolve_benches(bench)
+        explicit = scraped_date is not None
+        scraped_date = scraped_date or date.today()
+        with self._lock:
+            job = self._active.get((bench, scraped_date))
+            if job is not None:
+                if job.status == QUEUED:
+                    job.force = job.force or force
+                    job.explicit = job.explicit or explicit
+                return job, False
+            job = Job(id=uuid.uuid4().hex, bench=bench, scraped_date=scraped_date, force=force, explicit=explicit)
+            job.future = Future()
+            self._jobs[job.id] = job
+            self._active[job.key] = job
+            self._trim()
+            self._pending.append((job, names))
+            self._dispatch()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> List[Job]:
+        """最近提交的任务，新的在前"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def snapshot(self, job: Job) -> Dict[str, Any]:
+        with self._lock:
+            return job.to_dict()
+
+    def _progress(self, job: Job, stage: str, source: Optional[str], rows: int) -> None:
+        with self._lock:
+            job.stage, job.source, job.rows = stage, source, rows
+
+    def _dispatch(self) -> None:
+        """
+        （持有 self._lock 时调用）把榜单都空闲的任务交给线程池。
+        排在前面、仍在等待的任务涉及的榜单也视为占用，同一榜单不会被后来的任务插队。
+        """
+        claimed = set(self._busy)
+        waiting = []
+        for job, names in self._pending:
+            if claimed.isdisjoint(names):
+                self._busy.update(names)
+                self._executor.submit(self._run, job, names)
+            else:
+                job.stage = "waiting"
+                waiting.append((job, names))
+            claimed.update(names)
+        self._pending = waiting
+
+    def _run(self, job: Job, names: List[str]) -> None:
+        try:
+            with self._lock:
+                job.status, job.stage = RUNNING, "running"
+                job.started_at, job._t_started = datetime.utcnow(), time.monotonic()
+                force, explicit = job.force, job.explicit
+            try:
+                report = run_ingest(
+                    job.bench, job.scraped_date, force=force, explicit=explicit,
+                    progress=lambda stage, source, rows: self._progress(job, stage, source, rows),
+                )
+            except Exception as e:
+                with self._lock:
+                    job.status, job.error, job.exc = FAILED, str(e) or e.__class__.__name__, e
+            else:
+                with self._lock:
+                    job.status, job.report = SUCCEEDED, report
+        finally:
+            with self._lock:
+                job.stage, job.source = "done", None
+                job.finished_at, job._t_finished = datetime.utcnow(), time.monotonic()
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                self._trim()
+                self._busy.difference_update(names)
+                self._dispatch()
+            job.future.set_result(job)
+
+    def _trim(self) -> None:
+        finished = [j for j in self._jobs.values() if j.done]
+        for j in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[j.id]
+
+
+_queue = JobQueue.from_env()
+
+
+def get_queue() -> JobQueue:
+    return _queue
@@ -0,0 +1,155 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import select, delete, insert, func, and_, or_, case
+from sqlalchemy.orm import Session, aliased
+
+from ..db import SessionLocal
+from ..models import Result, LatestResult, BenchType, Identity
+from . import snapshots
+from .identities import MODEL, canonical_key
+from .serialize import fetch_rows, project
+
+# 从 results 复制到 latest_results 的列（id 沿用 results.id）
+COLUMNS = (
+    "id",
+    "bench",
+    "rank",
+    "agent",
+    "model",
+    "org",
+    "org_country",
+    "agent_org",
+    "model_org",
+    "model_id",
+    "score",
+    "score_error",
+    "date",
+    "scraped_date",
+)
+
+
+def _refresh_sql(session: Session, bench: BenchType) -> None:
+    """全量存储：一条 INSERT ... SELECT 在库内完成"""
+    current = select(func.max(Result.scraped_date)).where(Result.bench == bench).scalar_subquery()
+    per_model = (
+        select(Result.model, func.max(Result.scraped_date).label("max_date"))
+        .where(Result.bench == bench, Result.model.is_not(None))
+        .group_by(Result.model)
+        .subquery()
+    )
+    sel = (
+        select(
+            *(getattr(Result, c) for c in COLUMNS),
+            case((Result.scraped_date == current, True), else_=False),
+        )
+        .select_from(Result)
+        .outerjoin(
+            per_model,
+            and_(Result.model == per_model.c.model, Result.scraped_date == per_model.c.max_date),
+        )
+        .where(
+            Result.bench == bench,
+            or_(Result.scraped_date == current, per_model.c.model.is_not(None)),
+        )
+    )
+    session.execute(insert(LatestResult).from_select([*COLUMNS, "is_current"], sel))
+
+
+def _refresh_replay(session: Session, bench: BenchType) -> None:
+    """含增量快照：按日期降序重建，每个模型取第一次遇到的快照"""
+    rows: List[Dict[str, Any]] = []
+    seen: set[str] = set()
+    for i, (d, snapshot) in enumerate(snapshots.history(session, bench)):
+        models = set()
+        for r in snapshot:
+            if i == 0 or (r.model is not None and r.model not in seen):
+                rows.append({**{c: getattr(r, c) for c in COLUMNS}, "scraped_date": d, "is_current": i == 0})
+            if r.model is not None:
+                models.add(r.model)
+        seen |= models
+    if rows:
+        session.execute(insert(LatestResult), rows)
+
+
+def refresh_latest(session: Session, bench: BenchType) -> None:
+    """
+    重新生成 bench 在 latest_results 中的行。
+
+    在调用方的事务中执行，与快照写入 / 删除一起提交，读取方看不到中间状态。
+    """
+    # 会话关闭了 autoflush，先写出待提交的快照记录，保证按正确的存储方式重建
+    session.flush()
+    session.execute(delete(LatestResult).where(LatestResult.bench == bench))
+    if snapshots.has_delta(session, bench):
+        _refresh_replay(session, bench)
+    else:
+        _refresh_sql(session, bench)
+
+
+def ensure_latest() -> None:
+    """旧库升级：results 有数据而 latest_results 为空的 bench 补做一次刷新"""
+    with SessionLocal() as session:
+        stale = [
+            b for b in BenchType
+            if session.execute(select(Result.id).where(Result.bench == b).limit(1)).first()
+            and not session.execute(select(LatestResult.id).where(LatestResult.bench == b).limit(1)).first()
+        ]
+        for b in stale:
+            refresh_latest(session, b)
+        if stale:
+            session.commit()
+
+
+def bench_latest(session: Session, bench: BenchType, include_raw: bool = False) -> Sequence[Any]:
+    """bench 最新快照的全部行，只取接口输出的列（见 serialize.project）"""
+    stmt = (
+        project(LatestResult, include_raw)
+        .where(LatestResult.bench == bench, LatestResult.is_current.is_(True))
+        .order_by(LatestResult.rank.is_(None), LatestResult.rank, LatestResult.score.desc())
+    )
+    return fetch_rows(session, stmt)
+
+
+def _newest_per_bench() -> Any:
+    """
+    同一规范模型在一个榜单中可能有几种写法，各自最近出现的快照不同；
+    只保留其中最近的一个（走 idx_latest_model_id）
+    """
+    other = aliased(LatestResult)
+    newest = (
+        select(func.max(other.scraped_date))
+        .where(other.model_id == LatestResult.model_id, other.bench == LatestResult.bench)
+        .correlate(LatestResult)
+        .scalar_subquery()
+    )
+    return LatestResult.scraped_date == newest
+
+
+def model_latest(session: Session, model: str, include_raw: bool = False) -> Sequence[Any]:
+    """
+    模型在每个榜单最近一次出现的快照中的行，只取接口输出的列。
+    按规范模型匹配（见 services/identities），各榜单的不同写法都会返回：
+    一次按匹配键关联 identities 的索引查询。
+    """
+    stmt = (
+        project(LatestResult, include_raw)
+        .join(Identity, Identity.id == LatestResult.model_id)
+        .where(Identity.kind == MODEL, Identity.key == canonical_key(MODEL, model), _newest_per_bench())
+        .order_by(LatestResult.bench, LatestResult.rank.is_(None), LatestResult.rank, LatestResult.score.desc())
+    )
+    return fetch_rows(session, stmt)
+
+
+def models_latest(session: Session, model_ids: Sequence[int], include_raw: bool = False) -> Sequence[Any]:
+    """多个规范模型的 model_latest，一次查询；行末追加 model_id 列用于分组"""
+    stmt = (
+        project(LatestResult, include_raw)
+        .add_columns(LatestResult.model_id)
+        .where(LatestResult.model_id.in_(list(model_ids)), _newest_per_bench())
+        .order_by(
+            LatestResult.model_id, LatestResult.bench,
+            LatestResult.rank.is_(None), LatestResult.rank, LatestResult.score.desc(),
+        )
+    )
+    return fetch_rows(session, stmt)
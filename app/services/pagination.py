@@ -0,0 +1,126 @@
+from __future__ import annotations
+from typing import Any, List, Optional, Sequence, Tuple
+from datetime import date
+import base64
+import json
+
+from sqlalchemy import Select, and_, literal
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+from ..models import Result, BenchType, QUERY_ORDER
+from .serialize import fetch_rows
+
+# 游标的取值个数：与 QUERY_ORDER 一一对应；增量模式多一个快照日期
+FULL_KEY_SIZE = len(QUERY_ORDER)
+DELTA_KEY_SIZE = FULL_KEY_SIZE + 1
+
+# 游标各位置的取值类型，与 sort_key 一致：榜单名、rank 为空、rank、score 为空、-score、id
+_KEY_TYPES = (str, int, int, int, (int, float), int)
+
+
+def sort_key(r: Any) -> Tuple:
+    """与 QUERY_ORDER 一致的 Python 排序键"""
+    return (
+        r.bench.name,
+        int(r.rank is None),
+        r.rank or 0,
+        int(r.score is None),
+        -(r.score or 0.0),
+        r.id,
+    )
+
+
+def delta_sort_key(scraped_date: date, r: Result) -> Tuple:
+    """增量模式下未变化的行会在多个快照中重复出现，追加快照日期区分"""
+    return sort_key(r) + (scraped_date.isoformat(),)
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """把排序键编码为不透明游标（URL 安全的 base64）"""
+    raw = json.dumps(list(key), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> Tuple:
+    """解析游标；格式不对时抛出 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("cursor 无效")
+    if not isinstance(key, list) or len(key) != size or not _valid_key(key):
+        raise ValueError("cursor 无效")
+    return tuple(key)
+
+
+def _valid_key(key: List[Any]) -> bool:
+    """逐个检查取值类型，避免构造的游标在比较或 SQL 中出错"""
+    if any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(key, _KEY_TYPES)):
+        return False
+    if key[0] not in BenchType.__members__ or key[1] not in (0, 1) or key[3] not in (0, 1):
+        return False
+    if len(key) == DELTA_KEY_SIZE:
+        try:
+            date.fromisoformat(key[-1])
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+def seek_ranges(key: Optional[Sequence[Any]]) -> List[Tuple[int, ColumnElement]]:
+    """
+    排序位于游标之后的行，拆成按顺序排列、互不相交的区间 (等值前缀长度, 条件)：
+    游标所在榜单内前 i 个排序键相等且第 i+1 个键更大（i 从多到少），之后的榜单各一个区间。
+
+    每个区间都是"等值前缀 + 单列范围"，能直接在 idx_query_order 上定位；
+    等价的行值比较 (k1, k2, ...) > (v1, v2, ...) 在 SQLite 上遇到表达式列时
+    只能定位到 bench，越往后翻页越慢。
+
+    bench 在库中不做大小比较、也不参与 ORDER BY：MySQL 的 ENUM 列按成员序号排序、
+    与字符串比较的顺序不一致。榜单之间按名称的先后在这里逐个查询，与 sort_key 一致。
+    """
+    benches = sorted(BenchType, key=lambda b: b.name)
+    ranges = []
+    if key:
+        current = BenchType[key[0]]
+        values: List[Any] = [current, *key[1:FULL_KEY_SIZE]]
+        for i in reversed(range(1, FULL_KEY_SIZE)):
+            conds = [QUERY_ORDER[j] == literal(values[j], type_=QUERY_ORDER[j].type) for j in range(i)]
+            conds.append(QUERY_ORDER[i] > literal(values[i], type_=QUERY_ORDER[i].type))
+            ranges.append((i, and_(*conds)))
+        benches = [b for b in benches if b.name > current.name]
+    for b in benches:
+        ranges.append((1, QUERY_ORDER[0] == literal(b, type_=QUERY_ORDER[0].type)))
+    return ranges
+
+
+def fetch_page(
+    session: Session,
+    stmt: Select,
+    key: Optional[Sequence[Any]],
+    limit: Optional[int],
+) -> Tuple[List[Any], Optional[Tuple]]:
+    """
+    按 QUERY_ORDER 取游标之后的一页，返回 (行, 下一页游标的排序键)。
+
+    依次查询各区间，凑满 limit + 1 行（多取一行判断是否还有下一页）即停止，
+    每页的耗时与游标位置、历史数据量无关。
+    """
+    want = limit + 1 if limit else None
+    # select(Result) 取 ORM 对象；按列查询时取 Row，同样可按属性名读取排序键
+    entity = len(stmt.column_descriptions) == 1
+    rows: List[Any] = []
+    for fixed, cond in seek_ranges(key):
+        # 区间内前面的排序键都是定值，只按其余键排序；
+        # 否则 SQLite 认不出表达式列已被等值约束，会额外做一次排序
+        q = stmt.where(cond).order_by(*QUERY_ORDER[fixed:])
+        if want:
+            q = q.limit(want - len(rows))
+        rows.extend(session.execute(q).scalars().all() if entity else fetch_rows(session, q))
+        if want and len(rows) >= want:
+            break
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, sort_key(rows[-1])
+    return rows, None
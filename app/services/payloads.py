@@ -0,0 +1,105 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import json
+
+from sqlalchemy import Table, and_, or_, select, delete, insert
+from sqlalchemy.orm import Session
+
+from ..models import Result, RawPayload
+
+# 支持原生 "插入，冲突则忽略" 的方言
+NATIVE_DIALECTS = {"sqlite", "mysql", "postgresql"}
+# IN 查询每批的取值个数，避免超出数据库的参数个数上限
+IN_BATCH = 1000
+
+
+def encode_payload(raw: Any) -> Tuple[Optional[str], Optional[str]]:
+    """
+    把原始行序列化为规范 JSON 并计算内容哈希。
+
+    Returns:
+        (hash, payload)；raw 为 None 时返回 (None, None)
+    """
+    if raw is None:
+        return None, None
+    payload = json.dumps(raw, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest(), payload
+
+
+def _insert_ignore(dialect: str, table: Table, keys: Sequence[str]):
+    if dialect == "mysql":
+        return insert(table).prefix_with("IGNORE")
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=list(keys))
+
+
+def insert_ignore(session: Session, table: Table, rows: List[Dict[str, Any]], keys: Sequence[str]) -> None:
+    """插入一批行，keys（主键或唯一索引的列）已存在的行跳过"""
+    if not rows:
+        return
+    dialect = session.get_bind().dialect.name
+    if dialect in NATIVE_DIALECTS:
+        session.execute(_insert_ignore(dialect, table, keys), rows)
+        return
+    cols = [table.c[k] for k in keys]
+    existing: set = set()
+    for i in range(0, len(rows), IN_BATCH):
+        chunk = rows[i:i + IN_BATCH]
+        if len(cols) == 1:
+            match = cols[0].in_([r[keys[0]] for r in chunk])
+        else:
+            match = or_(*(and_(*(c == r[k] for c, k in zip(cols, keys))) for r in chunk))
+        existing.update(tuple(r) for r in session.execute(select(*cols).where(match)))
+    rows = [r for r in rows if tuple(r[k] for k in keys) not in existing]
+    if rows:
+        session.execute(insert(table), rows)
+
+
+def store_payloads(session: Session, payloads: Dict[str, str]) -> None:
+    """
+    写入一批原始数据，已存在的哈希直接跳过（内容寻址，天然去重）。
+    """
+    rows = [{"hash": h, "payload": p} for h, p in payloads.items()]
+    insert_ignore(session, RawPayload.__table__, rows, ["hash"])
+
+
+def load_payloads(session: Session, hashes: Iterable[Optional[str]]) -> Dict[str, Any]:
+    """按哈希批量读取原始数据（已反序列化）"""
+    wanted = {h for h in hashes if h}
+    if not wanted:
+        return {}
+    stmt = select(RawPayload.hash, RawPayload.payload).where(RawPayload.hash.in_(wanted))
+    return {h: json.loads(p) for h, p in session.execute(stmt)}
+
+
+def batched_pairs(session: Session, key: Any, value: Any, wanted: Sequence[Any], *where: Any) -> Dict[Any, Any]:
+    """key IN wanted 的 {key: value}，按 IN_BATCH 分批查询"""
+    out: Dict[Any, Any] = {}
+    for i in range(0, len(wanted), IN_BATCH):
+        stmt = select(key, value).where(key.in_(wanted[i:i + IN_BATCH]), *where)
+        out.update(session.execute(stmt).all())
+    return out
+
+
+def raw_for_rows(session: Session, rows: Sequence[Result]) -> List[Optional[str]]:
+    """
+    结果行（ORM 对象）的原始数据，为 JSON 字符串、与 rows 一一对应。
+
+    按 raw_hash 批量读取 raw_payloads；未迁移的旧数据按 id 读取 raw_json（该列默认不加载）。
+    """
+    hashes = sorted({r.raw_hash for r in rows if r.raw_hash})
+    legacy_ids = [r.id for r in rows if not r.raw_hash]
+    found = batched_pairs(session, RawPayload.hash, RawPayload.payload, hashes)
+    legacy = batched_pairs(session, Result.id, Result.raw_json, legacy_ids, Result.raw_json.is_not(None))
+    return [found.get(r.raw_hash) if r.raw_hash else legacy.get(r.id) for r in rows]
+
+
+def prune_payloads(session: Session) -> int:
+    """删除已没有任何结果引用的原始数据，返回删除条数"""
+    referenced = select(Result.raw_hash).where(Result.raw_hash.is_not(None))
+    result = session.execute(delete(RawPayload).where(RawPayload.hash.not_in(referenced)))
+    return result.rowcount
@@ -0,0 +1,131 @@
+from __future__ import annotations
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+from dataclasses import dataclass, field
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+import os
+import time
+
+from ..scrapers import SCRAPERS, ScraperSpec
+from ..scrapers.conditional import Validators, conditional_get
+
+# 单个数据源的默认超时（秒），可用 SCRAPE_TIMEOUT_<NAME> 单独覆盖，
+# 例如 SCRAPE_TIMEOUT_OSWORLD=90
+DEFAULT_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "60"))
+
+
+@dataclass
+class SourceResult:
+    """
+    单个数据源的抓取结果。
+
+    items 是惰性迭代器：抓取阶段只完成下载和表头解析，
+    数据行在入库阶段按批次逐行产出。
+    """
+    name: str
+    status: str  # ok | unchanged | error | timeout
+    latency_ms: float
+    items: Iterator[Dict[str, Any]] = field(default_factory=lambda: iter(()))
+    error: Optional[str] = None
+    # 本次下载得到的缓存校验信息，入库成功后持久化
+    validators: Optional[Validators] = None
+    # 快照级元数据（如表头），每个快照只存一份
+    meta: Dict[str, Any] = field(default_factory=dict)
+    # 已入库的条目数，由入库阶段累计
+    count: int = 0
+    body: Optional[BinaryIO] = None
+
+    def close(self) -> None:
+        if self.body is not None:
+            self.body.close()
+            self.body = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+    @property
+    def failed(self) -> bool:
+        return self.status in ("error", "timeout")
+
+
+def source_timeout(name: str) -> float:
+    env_key = "SCRAPE_TIMEOUT_" + name.upper().replace("-", "_")
+    return float(os.getenv(env_key, DEFAULT_TIMEOUT))
+
+
+def _run(spec: ScraperSpec, url: str, timeout: float, previous: Optional[Validators]) -> SourceResult:
+    t0 = time.perf_counter()
+    result = SourceResult(spec.name, "ok", 0.0)
+    try:
+        if spec.parse is None:
+            result.items = iter(spec.fetch(url=url, timeout=timeout) or [])
+        else:
+            fetched = conditional_get(url, timeout, previous)
+            result.validators = fetched.validators
+            if fetched.unchanged:
+                result.status = "unchanged"
+            else:
+                result.body = fetched.body
+                result.meta, result.items = spec.parse(fetched.body)
+    except Exception as e:
+        result.close()
+        result.status, result.error = "error", str(e) or e.__class__.__name__
+    result.latency_ms = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+def _discard(fut: Future) -> None:
+    """超时后才完成的抓取：释放其临时文件"""
+    if not fut.cancelled() and fut.exception() is None:
+        fut.result().close()
+
+
+def fetch_all(
+    names: List[str],
+    timeouts: Optional[Dict[str, float]] = None,
+    urls: Optional[Dict[str, str]] = None,
+    previous: Optional[Dict[str, Validators]] = None,
+) -> List[SourceResult]:
+    """
+    并发抓取多个数据源。
+
+    每个数据源在独立线程中运行，拥有各自的超时；某个源变慢或失败
+    不会阻塞、也不会丢弃其他源的结果。返回顺序与 names 一致。
+
+    Args:
+        names: 要抓取的榜单名（须已在 SCRAPERS 中注册）
+        timeouts: 按榜单覆盖超时（秒）
+        urls: 按榜单覆盖抓取地址（便于对接本地 stub 服务）
+        previous: 按榜单提供上次的缓存校验信息，用于条件请求
+    """
+    timeouts = timeouts or {}
+    urls = urls or {}
+    previous = previous or {}
+    specs = [SCRAPERS[n] for n in names]
+    if not specs:
+        return []
+
+    pool = ThreadPoolExecutor(max_workers=len(specs), thread_name_prefix="scrape")
+    started = time.perf_counter()
+    futures = []
+    for spec in specs:
+        timeout = timeouts.get(spec.name, source_timeout(spec.name))
+        url = urls.get(spec.name, spec.url)
+        futures.append((spec, timeout, pool.submit(_run, spec, url, timeout, previous.get(spec.name))))
+
+    results: List[SourceResult] = []
+    try:
+        for spec, timeout, fut in futures:
+            # 所有源同时开始，超时从统一的起点计算
+            remaining = max(0.0, started + timeout - time.perf_counter())
+            try:
+                results.append(fut.result(timeout=remaining))
+            except FutureTimeout:
+                fut.add_done_callback(_discard)
+                results.append(SourceResult(
+                    spec.name, "timeout", round(timeout * 1000, 1), error=f"超过 {timeout:g}s 未完成"
+                ))
+    finally:
+        # 不等待超时的线程，其 HTTP 请求自身也带有超时
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,160 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Type
+from datetime import date
+
+from sqlalchemy import select, delete, insert, func, distinct
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..models import Result, BenchType, Snapshot, OrgRollup, NationRollup
+from . import snapshots
+
+# 汇总表 -> results 中的分组列
+ROLLUPS = (
+    (OrgRollup, "org"),
+    (NationRollup, "org_country"),
+)
+
+
+def _refresh_sql(session: Session, bench: BenchType, dates: Optional[Sequence[date]]) -> None:
+    """全量存储：每张汇总表一条 INSERT ... SELECT ... GROUP BY"""
+    for table, key in ROLLUPS:
+        col = getattr(Result, key)
+        sel = (
+            select(
+                Result.bench,
+                Result.scraped_date,
+                col,
+                func.count(),
+                func.count(distinct(Result.model)),
+                func.avg(Result.score),
+                func.max(Result.score),
+                func.min(Result.rank),
+            )
+            .where(Result.bench == bench)
+            .group_by(Result.bench, Result.scraped_date, col)
+        )
+        if dates is not None:
+            sel = sel.where(Result.scraped_date.in_(dates))
+        cols = ["bench", "scraped_date", key, "entries", "models", "avg_score", "best_score", "best_rank"]
+        session.execute(insert(table).from_select(cols, sel))
+
+
+def _aggregate(bench: BenchType, d: date, rows: Sequence[Result], key: str) -> List[Dict[str, Any]]:
+    groups: Dict[Optional[str], List[Result]] = {}
+    for r in rows:
+        groups.setdefault(getattr(r, key), []).append(r)
+    out = []
+    for value, members in groups.items():
+        scores = [r.score for r in members if r.score is not None]
+        ranks = [r.rank for r in members if r.rank is not None]
+        out.append({
+            "bench": bench,
+            "scraped_date": d,
+            key: value,
+            "entries": len(members),
+            "models": len({r.model for r in members if r.model is not None}),
+            "avg_score": sum(scores) / len(scores) if scores else None,
+            "best_score": max(scores) if scores else None,
+            "best_rank": min(ranks) if ranks else None,
+        })
+    return out
+
+
+def _refresh_replay(session: Session, bench: BenchType, dates: Optional[Sequence[date]]) -> None:
+    """含增量快照：由重建后的完整榜单汇总"""
+    wanted = set(dates) if dates is not None else None
+    since = min(wanted) if wanted else None
+    rows: Dict[Type, List[Dict[str, Any]]] = {table: [] for table, _ in ROLLUPS}
+    for d, snapshot in snapshots.iter_snapshots(session, bench, since=since):
+        if wanted is not None and d not in wanted:
+            continue
+        for table, key in ROLLUPS:
+            rows[table].extend(_aggregate(bench, d, snapshot, key))
+    for table, values in rows.items():
+        if values:
+            session.execute(insert(table), values)
+
+
+def refresh_rollups(session: Session, bench: BenchType, dates: Optional[Sequence[date]] = None) -> None:
+    """
+    重新汇总 bench 在 dates 这些快照日期的统计；dates 为空时重算全部日期。
+
+    在调用方的事务中执行，与快照写入 / 删除一起提交。
+    dates 中已没有数据的日期只删除旧汇总。
+    """
+    session.flush()
+    for table, _ in ROLLUPS:
+        stmt = delete(table).where(table.bench == bench)
+        if dates is not None:
+            stmt = stmt.where(table.scraped_date.in_(dates))
+        session.execute(stmt)
+    if dates is not None and not dates:
+        return
+    if snapshots.has_delta(session, bench):
+        _refresh_replay(session, bench, dates)
+    else:
+        _refresh_sql(session, bench, dates)
+
+
+def affected_dates(session: Session, bench: BenchType, scraped_date: date) -> List[date]:
+    """
+    删除 scraped_date 的数据后需要重新汇总的日期：
+    增量模式下其后日期的重建结果随之改变，一并重算。
+    """
+    if not snapshots.has_delta(session, bench):
+        return [scraped_date]
+    later = session.execute(
+        select(Snapshot.scraped_date).where(Snapshot.bench == bench, Snapshot.scraped_date > scraped_date)
+    ).scalars().all()
+    return [scraped_date, *later]
+
+
+def ensure_rollups() -> None:
+    """旧库升级：results 有数据而汇总表为空的 bench 补做一次全量汇总"""
+    with SessionLocal() as session:
+        stale = [
+            b for b in BenchType
+            if session.execute(select(Result.id).where(Result.bench == b).limit(1)).first()
+            and not session.execute(select(OrgRollup.id).where(OrgRollup.bench == b).limit(1)).first()
+        ]
+        for b in stale:
+            refresh_rollups(session, b)
+        if stale:
+            session.commit()
+
+
+def query_rollup(
+    session: Session,
+    table: Type,
+    key: str,
+    benches: Optional[Sequence[BenchType]] = None,
+    values: Optional[Sequence[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> Sequence[Any]:
+    """
+    读汇总表。未给日期范围时只返回每个 bench 最新快照日期的汇总，
+    否则返回范围内各日期的汇总（按 bench、日期降序、最高分降序）。
+    """
+    col = getattr(table, key)
+    stmt = select(table)
+    if benches:
+        stmt = stmt.where(table.bench.in_(benches))
+    if values:
+        stmt = stmt.where(col.in_(values))
+    if since:
+        stmt = stmt.where(table.scraped_date >= since)
+    if until:
+        stmt = stmt.where(table.scraped_date <= until)
+    if not since and not until:
+        latest = (
+            select(table.bench, func.max(table.scraped_date).label("max_date"))
+            .group_by(table.bench)
+            .subquery()
+        )
+        stmt = stmt.join(latest, (table.bench == latest.c.bench) & (table.scraped_date == latest.c.max_date))
+    stmt = stmt.order_by(
+        table.bench, table.scraped_date.desc(), table.best_score.is_(None), table.best_score.desc(), col,
+    )
+    return session.execute(stmt).scalars().all()
@@ -0,0 +1,316 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import os
+import random
+import threading
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..db import SessionLocal
+from ..models import FetchState, ScheduleState
+from ..scrapers import SCRAPERS
+from .jobs import FAILED, Job, get_queue
+
+# 服务重启时已过期的榜单在这段时间（秒）内随机错开执行，不同时开始
+STARTUP_SPREAD = 60.0
+# 到期时上次采集仍在进行的榜单，隔多少秒再检查一次
+RUNNING_POLL = 5.0
+# 提交出错（如数据库不可用）后隔多少秒重试，不超过该榜单的间隔
+ERROR_RETRY = 60.0
+
+Clock = Callable[[], datetime]
+# 提交一次采集，返回任务（测试中可替换）
+Submit = Callable[[str], Job]
+
+
+def schedule_interval(name: str) -> float:
+    """榜单的采集间隔（秒），SCHEDULE_INTERVAL_<NAME> 覆盖 SCHEDULE_INTERVAL；0 表示不定时采集"""
+    env_key = "SCHEDULE_INTERVAL_" + name.upper().replace("-", "_")
+    return float(os.getenv(env_key, os.getenv("SCHEDULE_INTERVAL", "0")))
+
+
+@dataclass
+class Entry:
+    name: str
+    interval: float
+    next_run: datetime
+    last_run: Optional[datetime] = None
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    job: Optional[Job] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source": self.name,
+            "interval_s": self.interval,
+            "next_run_at": self.next_run,
+            "last_run_at": self.last_run,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "job_id": self.job.id if self.job else None,
+        }
+
+
+class ScheduleStore:
+    """
+    定时采集状态的读写：schedule_state 表，另从 fetch_state 读上次成功入库的时间。
+    测试中可替换为内存实现，Scheduler 不直接访问数据库。
+    """
+
+    def load(self) -> Tuple[Dict[str, ScheduleState], Dict[str, datetime]]:
+        """(榜单 -> schedule_state 行, 榜单 -> 上次成功入库时间)"""
+        with SessionLocal() as session:
+            states = {s.source: s for s in session.execute(select(ScheduleState)).scalars()}
+            fetched = dict(session.execute(select(FetchState.source, FetchState.updated_at)).all())
+        return states, fetched
+
+    def save(self, entry: Entry) -> None:
+        with SessionLocal() as session:
+            state = session.get(ScheduleState, entry.name) or ScheduleState(source=entry.name)
+            state.last_run_at = entry.last_run
+            state.next_run_at = entry.next_run
+            state.last_status = entry.last_status
+            state.last_error = entry.last_error
+            state.last_job_id = entry.job.id if entry.job else None
+            state.updated_at = datetime.utcnow()
+            session.add(state)
+            session.commit()
+
+    def claim(self, name: str, now: datetime, next_run: datetime) -> bool:
+        """
+        认领一次到期的采集：仅当记录的下次运行时间已到（或为空）时改为 next_run，一条条件 UPDATE 完成。
+        多个服务进程同时到期时只有一个更新成功；返回 False 表示已被其他进程认领。
+        """
+        values = dict(
+            next_run_at=next_run, last_run_at=now, last_status="running", last_error=None,
+            updated_at=datetime.utcnow(),
+        )
+        with SessionLocal() as session:
+            claimed = session.execute(
+                update(ScheduleState)
+                .where(
+                    ScheduleState.source == name,
+                    or_(ScheduleState.next_run_at.is_(None), ScheduleState.next_run_at <= now),
+                )
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not claimed:
+                if session.get(ScheduleState, name) is not None:
+                    return False
+                # 第一次运行还没有记录：插入成功即认领，主键冲突说明其他进程先插入了
+                session.add(ScheduleState(source=name, **values))
+            try:
+                session.commit()
+            except IntegrityError:
+                return False
+        return True
+
+
+class Scheduler:
+    """
+    进程内的定时采集：每个榜单按各自的间隔提交采集任务，间隔带随机抖动。
+
+    采集走任务队列，与手动触发的任务共用榜单锁与去重；数据源内容未变化时
+    条件请求直接跳过解析与写库，本次结果记为 unchanged。
+    每次提交前把下次运行时间写入 schedule_state，重启后从这里恢复，
+    已过期的榜单在 STARTUP_SPREAD 秒内错开补采一次，不会集中触发。
+
+    tick() 只依赖注入的 clock、submit 与 store，测试中可用假时钟逐步推进；
+    start() 启动的后台线程循环调用 tick()。提交出错时记入该榜单的 last_status / last_error，
+    ERROR_RETRY 秒后重试。
+    """
+
+    def __init__(
+        self,
+        intervals: Dict[str, float],
+        jitter: float = 0.1,
+        clock: Clock = datetime.utcnow,
+        rng: Optional[random.Random] = None,
+        submit: Optional[Submit] = None,
+        store: Optional[ScheduleStore] = None,
+    ) -> None:
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._submit = submit or (lambda name: get_queue().submit(name)[0])
+        self.store = store or ScheduleStore()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.entries: Dict[str, Entry] = {}
+        self._load({name: iv for name, iv in intervals.items() if iv > 0})
+
+    @classmethod
+    def from_env(cls) -> "Scheduler":
+        return cls(
+            intervals={name: schedule_interval(name) for name in SCRAPERS},
+            jitter=float(os.getenv("SCHEDULE_JITTER", "0.1")),
+        )
+
+    def _next_after(self, t: datetime, interval: float) -> datetime:
+        return t + timedelta(seconds=interval * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def _load(self, intervals: Dict[str, float]) -> None:
+        """
+        恢复各榜单的下次运行时间：优先用 schedule_state，
+        其次按上次成功入库时间（fetch_state）推算，都没有时立即采集。
+        """
+        now = self.clock()
+        states, fetched = self.store.load()
+        for name, interval in intervals.items():
+            state = states.get(name)
+            last_run = state.last_run_at if state else fetched.get(name)
+            if state and state.next_run_at:
+                # 间隔调短后不必等到按旧间隔算出的时间
+                next_run = min(state.next_run_at, now + timedelta(seconds=interval * (1 + self.jitter)))
+            elif last_run:
+                next_run = self._next_after(last_run, interval)
+            else:
+                next_run = now
+            if next_run <= now:
+                next_run = now + timedelta(seconds=self.rng.uniform(0, min(STARTUP_SPREAD, interval * self.jitter)))
+            self.entries[name] = Entry(
+                name, interval, next_run, last_run,
+                state.last_status if state else None, state.last_error if state else None,
+            )
+
+    def _follow(self, entry: Entry, now: datetime) -> None:
+        """其他进程已认领：跟随它记录的运行时间与结果"""
+        state = self.store.load()[0].get(entry.name)
+        with self._lock:
+            if state is not None:
+                entry.last_run = state.last_run_at
+                entry.last_status, entry.last_error = state.last_status, state.last_error
+            if state is not None and state.next_run_at and state.next_run_at > now:
+                entry.next_run = state.next_run_at
+            else:
+                entry.next_run = now + timedelta(seconds=RUNNING_POLL)
+
+    def due(self, now: Optional[datetime] = None) -> List[str]:
+        now = now or self.clock()
+        with self._lock:
+            return [
+                e.name for e in self.entries.values()
+                if e.next_run <= now and (e.job is None or e.job.done)
+            ]
+
+    def tick(self) -> List[str]:
+        """提交所有到期榜单的采集任务，返回本次提交的榜单名"""
+        now = self.clock()
+        started = []
+        for name in self.due(now):
+            entry = self.entries[name]
+            try:
+                if self._start(entry, now):
+                    started.append(name)
+            except Exception as e:
+                self._failed(entry, now, e)
+        return started
+
+    def _start(self, entry: Entry, now: datetime) -> bool:
+        next_run = self._next_after(now, entry.interval)
+        if not self.store.claim(entry.name, now, next_run):
+            self._follow(entry, now)
+            return False
+        with self._lock:
+            entry.job = None
+            entry.last_run, entry.next_run = now, next_run
+            entry.last_status, entry.last_error = "running", None
+        job = self._submit(entry.name)
+        with self._lock:
+            entry.job = job
+        self.store.save(entry)
+        if job.future is not None:
+            job.future.add_done_callback(lambda _f, entry=entry, job=job: self._finished(entry, job))
+        return True
+
+    def _failed(self, entry: Entry, now: datetime, error: Exception) -> None:
+        with self._lock:
+            entry.last_status, entry.last_error = "failed", str(error) or error.__class__.__name__
+            entry.next_run = now + timedelta(seconds=min(ERROR_RETRY, entry.interval))
+        try:
+            self.store.save(entry)
+        except Exception:
+            # 数据库不可用时只保留在内存中，GET /api/schedule 仍可看到
+            pass
+
+    def _finished(self, entry: Entry, job: Job) -> None:
+        with self._lock:
+            if entry.job is not job:
+                return
+            if job.status == FAILED:
+                entry.last_status, entry.last_error = "failed", job.error
+            else:
+                entry.last_status = job.report.status if job.report else "ok"
+        self.store.save(entry)
+
+    def seconds_until_next(self) -> Optional[float]:
+        """
+        距最近一个到期时间的秒数，没有榜单时返回 None。
+        已到期但上次采集仍未结束的榜单按 RUNNING_POLL 秒后再检查。
+        """
+        now = self.clock()
+        with self._lock:
+            pending = [
+                now + timedelta(seconds=RUNNING_POLL) if e.next_run <= now and e.job and not e.job.done else e.next_run
+                for e in self.entries.values()
+            ]
+        if not pending:
+            return None
+        return max(0.0, (min(pending) - now).total_seconds())
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [e.to_dict() for e in self.entries.values()]
+
+    def start(self) -> None:
+        if self._thread is not None or not self.entries:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _loop(self) -> None:
+        # 至多每分钟醒来一次，时钟跳变或任务结束后也能及时重新计算
+        while True:
+            wait = self.seconds_until_next()
+            if self._stop.wait(60.0 if wait is None else min(wait, 60.0)):
+                return
+            # 出错的榜单由 tick() 记入 last_status / last_error
+            self.tick()
+
+
+_scheduler: Optional[Scheduler] = None
+
+
+def start_scheduler() -> Optional[Scheduler]:
+    """按环境变量启动定时采集；所有榜单的间隔都为 0 时不启动"""
+    global _scheduler
+    if _scheduler is None:
+        scheduler = Scheduler.from_env()
+        if not scheduler.entries:
+            return None
+        _scheduler = scheduler
+        _scheduler.start()
+    return _scheduler
+
+
+def stop_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def get_scheduler() -> Optional[Scheduler]:
+    return _scheduler
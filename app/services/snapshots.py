@@ -0,0 +1,447 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from collections import Counter
+from datetime import date, datetime
+import hashlib
+from operator import attrgetter
+import os
+
+from sqlalchemy import select, delete, insert
+from sqlalchemy.orm import Session, load_only
+
+from ..models import Result, BenchType, Snapshot
+from .payloads import store_payloads
+from .pagination import delta_sort_key
+from .upsert import RowKey, row_key as business_key
+
+FULL = "full"
+DELTA = "delta"
+
+# 判断一行是否"变化"时比较的字段
+COMPARE_FIELDS = (
+    "rank",
+    "org",
+    "org_country",
+    "agent_org",
+    "model_org",
+    "score",
+    "score_error",
+    "date",
+    "raw_hash",
+)
+
+State = Dict[str, Result]
+
+# 重建快照时加载的列（不含 created_at / updated_at 与 raw_json）；
+# 其余列访问时报错，而不是逐行补查
+STATE_COLUMNS = (
+    "bench",
+    "rank",
+    "agent",
+    "model",
+    "org",
+    "org_country",
+    "agent_org",
+    "model_org",
+    "model_id",
+    "org_id",
+    "score",
+    "score_error",
+    "date",
+    "raw_hash",
+    "scraped_date",
+    "change_type",
+    "row_key",
+)
+
+
+def storage_mode() -> str:
+    """
+    STORAGE_MODE=full（默认）：每个 scraped_date 保存整张榜单；
+    STORAGE_MODE=delta：只保存相对上一快照新增、删除或变化的行，读取时重建。
+    """
+    mode = os.getenv("STORAGE_MODE", FULL).lower()
+    if mode not in (FULL, DELTA):
+        raise ValueError(f"不支持的 STORAGE_MODE: {mode}，支持的类型: full, delta")
+    return mode
+
+
+def _identity(agent: Optional[str], model: Optional[str], n: int) -> str:
+    return hashlib.sha1(f"{agent}\x1f{model}\x1f{n}".encode("utf-8")).hexdigest()
+
+
+class _KeyGen:
+    """按出现顺序为 (agent, model) 编号，生成行的稳定标识；同名行以序号区分"""
+
+    def __init__(self) -> None:
+        self._seen: Counter = Counter()
+
+    def __call__(self, agent: Optional[str], model: Optional[str]) -> str:
+        n = self._seen[(agent, model)]
+        self._seen[(agent, model)] += 1
+        return _identity(agent, model, n)
+
+
+def _fields(row: Any) -> Tuple:
+    if isinstance(row, dict):
+        return tuple(row.get(f) for f in COMPARE_FIELDS)
+    return tuple(getattr(row, f) for f in COMPARE_FIELDS)
+
+
+def sort_rows(rows: Sequence[Result]) -> List[Result]:
+    """与查询接口一致的排序：rank 升序（空值在后），再按 score 降序"""
+    return sorted(
+        rows,
+        key=lambda r: (r.rank is None, r.rank or 0, r.score is None, -(r.score or 0.0)),
+    )
+
+
+def _snapshot_modes(session: Session, bench: BenchType) -> Dict[date, str]:
+    """bench 的所有快照日期及其存储方式；没有快照记录的历史日期视为 full"""
+    modes: Dict[date, str] = {
+        d: FULL
+        for d in session.execute(
+            select(Result.scraped_date).where(Result.bench == bench).distinct()
+        ).scalars()
+    }
+    for d, mode in session.execute(
+        select(Snapshot.scraped_date, Snapshot.storage_mode).where(Snapshot.bench == bench)
+    ):
+        modes[d] = mode or FULL
+    return modes
+
+
+def has_delta(session: Session, bench: BenchType) -> bool:
+    """bench 是否有按增量方式存储的快照"""
+    return any_delta(session, [bench])
+
+
+def any_delta(session: Session, benches: Optional[Sequence[BenchType]] = None) -> bool:
+    """
+    这些榜单（默认全部）中是否有按增量方式存储的快照。
+
+    读取时据此选择 SQL 查询或由变更记录重建，而不是看当前的 STORAGE_MODE：
+    切换回 full 之后，之前按增量写入的快照仍然只能重建读取。
+    """
+    stmt = select(Snapshot.id).where(Snapshot.storage_mode == DELTA)
+    if benches:
+        stmt = stmt.where(Snapshot.bench.in_(list(benches)))
+    return session.execute(stmt.limit(1)).first() is not None
+
+
+def iter_states(
+    session: Session,
+    bench: BenchType,
+    models: Optional[Sequence[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> Iterator[Tuple[date, State]]:
+    """
+    按日期升序重建 bench 的每个快照，产出 (scraped_date, {row_key: Result})。
+
+    full 快照直接作为当日状态；delta 快照在前一状态上应用 added / changed / removed。
+    models 非空时只重建这些模型的行（行标识包含 model，过滤不影响正确性）。
+    since 应为一个 full 快照日期（或为空），否则起点之前的状态会丢失。
+    """
+    modes = _snapshot_modes(session, bench)
+    dates = sorted(d for d in modes if (since is None or d >= since) and (until is None or d <= until))
+    if not dates:
+        return
+
+    stmt = (
+        select(Result)
+        .options(load_only(*(getattr(Result, c) for c in STATE_COLUMNS), raiseload=True))
+        .where(Result.bench == bench, Result.scraped_date.in_(dates))
+    )
+    if models:
+        stmt = stmt.where(Result.model.in_(list(models)))
+    stmt = stmt.order_by(Result.scraped_date, Result.id)
+    by_date: Dict[date, List[Result]] = {}
+    for r in session.execute(stmt).scalars():
+        by_date.setdefault(r.scraped_date, []).append(r)
+
+    state: State = {}
+    for d in dates:
+        rows = by_date.get(d, [])
+        if modes[d] == FULL:
+            keygen = _KeyGen()
+            state = {keygen(r.agent, r.model): r for r in rows if r.change_type != "removed"}
+        else:
+            state = dict(state)
+            for r in rows:
+                if r.change_type == "removed":
+                    state.pop(r.row_key, None)
+                else:
+                    state[r.row_key] = r
+        yield d, state
+
+
+def _last_full_date(modes: Dict[date, str], as_of: date) -> Optional[date]:
+    fulls = [d for d, m in modes.items() if m == FULL and d <= as_of]
+    return max(fulls) if fulls else None
+
+
+def rebuild(
+    session: Session,
+    bench: BenchType,
+    as_of: date,
+    models: Optional[Sequence[str]] = None,
+) -> List[Result]:
+    """重建 bench 在 as_of（含）之前最近一个快照的完整榜单"""
+    since = _last_full_date(_snapshot_modes(session, bench), as_of)
+    state: State = {}
+    for _, state in iter_states(session, bench, models, since=since, until=as_of):
+        pass
+    return sort_rows(list(state.values()))
+
+
+def iter_snapshots(
+    session: Session,
+    bench: BenchType,
+    models: Optional[Sequence[str]] = None,
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+) -> Iterator[Tuple[date, List[Result]]]:
+    """按日期升序产出 [since, until] 内每个快照的完整榜单，跳过重建结果为空的日期"""
+    start = _last_full_date(_snapshot_modes(session, bench), since) if since else None
+    for d, state in iter_states(session, bench, models, since=start, until=until):
+        if since and d < since:
+            continue
+        rows = sort_rows(list(state.values()))
+        if rows:
+            yield d, rows
+
+
+def latest_date(session: Session, bench: BenchType) -> Optional[date]:
+    modes = _snapshot_modes(session, bench)
+    return max(modes) if modes else None
+
+
+def history(
+    session: Session,
+    bench: BenchType,
+    models: Optional[Sequence[str]] = None,
+) -> List[Tuple[date, List[Result]]]:
+    """每个快照日期的完整榜单（按日期降序），跳过重建结果为空的日期"""
+    out = [(d, sort_rows(list(state.values()))) for d, state in iter_states(session, bench, models)]
+    return [(d, rows) for d, rows in reversed(out) if rows]
+
+
+def _removed(bench: BenchType, key: str, old: Result, scraped_date: date, now: datetime) -> Dict[str, Any]:
+    """上一状态中的 old 在 scraped_date 不再出现：removed 标记行"""
+    return {
+        "bench": bench,
+        # rank 置空：NULL 不参与唯一索引冲突
+        "rank": None,
+        "agent": old.agent,
+        "model": old.model,
+        "model_id": old.model_id,
+        "scraped_date": scraped_date,
+        "change_type": "removed",
+        "row_key": key,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+class DeltaWriter:
+    """
+    增量模式的写入器，接口与 BulkUpserter 一致。
+
+    只写入相对上一快照新增（added）、变化（changed）的行，
+    finish() 时为上一快照中存在、本次未出现的行写入 removed 标记。
+    重新采集同一天时先删除当天已写入的变更记录。
+    同一业务键（idx_unique_record）的重复行与全量模式一样合并：位置取第一次出现，内容取最后一次。
+    """
+
+    def __init__(self, session: Session, bench: BenchType, scraped_date: date) -> None:
+        self.session = session
+        self.bench = bench
+        self.scraped_date = scraped_date
+
+        modes = _snapshot_modes(session, bench)
+        earlier = [d for d in modes if d < scraped_date]
+        prev: State = {}
+        if earlier:
+            prev_date = max(earlier)
+            since = _last_full_date(modes, prev_date)
+            for _, prev in iter_states(session, bench, since=since, until=prev_date):
+                pass
+        self._prev = prev
+
+        session.execute(delete(Result).where(Result.bench == bench, Result.scraped_date == scraped_date))
+        self._keygen = _KeyGen()
+        # 业务键 -> 行标识
+        self._keys: Dict[RowKey, str] = {}
+        # 已写入变更记录的行标识
+        self._written: set[str] = set()
+
+    def upsert(self, rows: List[Dict[str, Any]], payloads: Optional[Dict[str, str]] = None) -> Tuple[int, int]:
+        """
+        写入一批行，返回 (inserted, updated)：inserted 为新增行数，updated 为变化行数
+        （与全量模式一样，重复行也计入 updated）。未变化的行不写库。
+        """
+        payloads = payloads or {}
+        deduped: Dict[str, Dict[str, Any]] = {}
+        # 之前的批次中已出现过的行：重写当天的变更记录
+        again: set[str] = set()
+        for row in rows:
+            bkey = business_key(row)
+            key = self._keys.get(bkey)
+            if key is None:
+                key = self._keys[bkey] = self._keygen(row["agent"], row["model"])
+            elif key not in deduped:
+                again.add(key)
+            deduped[key] = row
+        if again & self._written:
+            self.session.execute(delete(Result).where(
+                Result.bench == self.bench, Result.scraped_date == self.scraped_date,
+                Result.row_key.in_(sorted(again & self._written)),
+            ))
+            self._written -= again
+
+        changes: List[Dict[str, Any]] = []
+        used: Dict[str, str] = {}
+        added = changed = 0
+        for key, row in deduped.items():
+            old = self._prev.get(key)
+            if old is not None and _fields(old) == _fields(row):
+                continue
+            change = dict(row, row_key=key, change_type="added" if old is None else "changed")
+            if key not in again:
+                added += old is None
+                changed += old is not None
+            changes.append(change)
+            self._written.add(key)
+            if change["raw_hash"]:
+                used[change["raw_hash"]] = payloads[change["raw_hash"]]
+        store_payloads(self.session, used)
+        if changes:
+            self.session.execute(insert(Result), changes)
+        return added, changed + len(rows) - len(deduped) + len(again)
+
+    def finish(self) -> int:
+        """写入 removed 标记，返回被移除的行数"""
+        now = datetime.utcnow()
+        seen = set(self._keys.values())
+        removed = [
+            _removed(self.bench, key, old, self.scraped_date, now)
+            for key, old in self._prev.items()
+            if key not in seen
+        ]
+        if removed:
+            self.session.execute(insert(Result), removed)
+        return len(removed)
+
+
+def next_delta(session: Session, bench: BenchType, scraped_date: date) -> Optional[Tuple[date, State]]:
+    """
+    scraped_date 之后紧邻的快照按增量存储时，返回 (该日期, 重建出的完整榜单)，否则为 None。
+
+    它的变更记录是相对前一状态的，补采、重新采集或删除 scraped_date 都会改变前一状态。
+    在写入或删除 scraped_date 的数据之前调用，之后交给 rebase_next。
+    """
+    modes = _snapshot_modes(session, bench)
+    later = sorted(d for d in modes if d > scraped_date)
+    if not later or modes[later[0]] != DELTA:
+        return None
+    nxt = later[0]
+    state: State = {}
+    for _, state in iter_states(session, bench, since=_last_full_date(modes, nxt), until=nxt):
+        pass
+    # 复制出字段值：其后删除 / 改写 scraped_date 的行不影响这里记下的状态
+    return nxt, {key: {c: getattr(r, c) for c in STATE_COLUMNS} for key, r in state.items()}
+
+
+def rebase_next(session: Session, bench: BenchType, pending: Optional[Tuple[date, State]]) -> Optional[date]:
+    """
+    把 next_delta 记下的快照改写为相对现在的前一状态的变更，重建结果不变。
+    返回被改写的日期，不需要改写时为 None。
+    """
+    if pending is None:
+        return None
+    nxt, state = pending
+    # 会话关闭了 autoflush，先写出待提交的快照记录，保证按正确的存储方式重建前一状态
+    session.flush()
+    modes = _snapshot_modes(session, bench)
+    earlier = [d for d in modes if d < nxt]
+    prev: State = {}
+    if earlier:
+        prev_date = max(earlier)
+        for _, prev in iter_states(session, bench, since=_last_full_date(modes, prev_date), until=prev_date):
+            pass
+
+    now = datetime.utcnow()
+    rows: List[Dict[str, Any]] = []
+    for key, r in state.items():
+        old = prev.get(key)
+        if old is not None and _fields(old) == _fields(r):
+            continue
+        rows.append(dict(
+            r, scraped_date=nxt, row_key=key, change_type="added" if old is None else "changed",
+            created_at=now, updated_at=now,
+        ))
+    rows.extend(_removed(bench, key, old, nxt, now) for key, old in prev.items() if key not in state)
+
+    session.execute(delete(Result).where(Result.bench == bench, Result.scraped_date == nxt))
+    if rows:
+        session.execute(insert(Result), rows)
+    return nxt
+
+
+# ---- 增量模式下的读取：与全量模式的 SQL 查询语义一致 ----
+
+
+def bench_rows(session: Session, bench: BenchType, latest_only: bool) -> List[Result]:
+    """榜单的最新快照，或全部快照（按日期降序）"""
+    if latest_only:
+        d = latest_date(session, bench)
+        return rebuild(session, bench, d) if d else []
+    return [r for _, rows in history(session, bench) for r in rows]
+
+
+def models_rows(
+    session: Session,
+    models: Sequence[str],
+    latest_only: bool,
+    key: Callable[[Result], Any] = attrgetter("model"),
+) -> Dict[Any, List[Result]]:
+    """
+    多个模型在各榜单的数据，latest_only 时每个榜单取该模型出现的最近一个快照；
+    每个榜单只重建一次，再按 key 拆分。
+    key 默认为模型名；跨榜单查询传 model_id，同一规范模型的各种写法合为一组。
+    """
+    out: Dict[Any, List[Result]] = {}
+    for bench in sorted(BenchType, key=lambda b: b.name):
+        found: Dict[Any, List[Result]] = {}
+        for _, rows in history(session, bench, models):
+            by_model: Dict[Any, List[Result]] = {}
+            for r in rows:
+                by_model.setdefault(key(r), []).append(r)
+            for model, snap_rows in by_model.items():
+                if not (latest_only and model in found):
+                    found.setdefault(model, []).extend(snap_rows)
+        for model, rows in found.items():
+            out.setdefault(model, []).extend(rows)
+    return out
+
+
+def query_rows(
+    session: Session,
+    benches: Optional[Sequence[BenchType]] = None,
+    models: Optional[Sequence[str]] = None,
+    agents: Optional[Sequence[str]] = None,
+    orgs: Optional[Sequence[str]] = None,
+    nations: Optional[Sequence[str]] = None,
+) -> List[Tuple[date, Result]]:
+    """多维过滤全部历史快照，返回 (快照日期, 行)，按 delta_sort_key 排序"""
+    out: List[Tuple[date, Result]] = []
+    for bench in sorted(benches or list(BenchType), key=lambda b: b.name):
+        for d, rows in history(session, bench, models):
+            out.extend(
+                (d, r) for r in rows
+                if (not agents or r.agent in agents)
+                and (not orgs or r.org in orgs)
+                and (not nations or r.org_country in nations)
+            )
+    return sorted(out, key=lambda p: delta_sort_key(*p))
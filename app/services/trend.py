@@ -0,0 +1,89 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, timedelta
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from ..models import Result, BenchType, Identity
+from . import snapshots
+from .identities import MODEL, canonical_key, identity_ids, spellings
+
+# 降采样粒度：按天（不降采样）、按周（周一开始）、按月
+BUCKETS = ("day", "week", "month")
+
+# (scraped_date, 最好名次, 最高分)
+Point = Tuple[date, Optional[int], Optional[float]]
+
+
+def bucket_start(d: date, bucket: str) -> date:
+    if bucket == "week":
+        return d - timedelta(days=d.weekday())
+    if bucket == "month":
+        return d.replace(day=1)
+    return d
+
+
+def _daily_sql(session: Session, model: str) -> Dict[BenchType, List[Point]]:
+    """一条 GROUP BY 查询：每个 bench、每个快照日期该模型（各种写法）的最好名次与最高分"""
+    stmt = (
+        select(Result.bench, Result.scraped_date, func.min(Result.rank), func.max(Result.score))
+        .join(Identity, Identity.id == Result.model_id)
+        .where(Identity.kind == MODEL, Identity.key == canonical_key(MODEL, model))
+        .group_by(Result.bench, Result.scraped_date)
+        .order_by(Result.bench, Result.scraped_date)
+    )
+    out: Dict[BenchType, List[Point]] = {}
+    for bench, d, rank, score in session.execute(stmt):
+        out.setdefault(bench, []).append((d, rank, score))
+    return out
+
+
+def _daily_delta(session: Session, model: str) -> Dict[BenchType, List[Point]]:
+    out: Dict[BenchType, List[Point]] = {}
+    names = spellings(session, MODEL, list(identity_ids(session, MODEL, [model]).values()))
+    if not names:
+        return out
+    for bench in sorted(BenchType, key=lambda b: b.name):
+        points = []
+        for d, rows in reversed(snapshots.history(session, bench, names)):
+            ranks = [r.rank for r in rows if r.rank is not None]
+            scores = [r.score for r in rows if r.score is not None]
+            points.append((d, min(ranks) if ranks else None, max(scores) if scores else None))
+        if points:
+            out[bench] = points
+    return out
+
+
+def _downsample(points: List[Point], bucket: str) -> List[Point]:
+    """每个桶取最后一个快照的值，日期记为桶的起始日"""
+    if bucket == "day":
+        return points
+    last: Dict[date, Point] = {}
+    for d, rank, score in points:
+        last[bucket_start(d, bucket)] = (bucket_start(d, bucket), rank, score)
+    return list(last.values())
+
+
+def model_trend(session: Session, model: str, bucket: str = "day") -> List[Dict[str, Any]]:
+    """
+    模型在各榜单的成绩序列，每个点为 (日期, 名次, 分数, 名次变化)。
+
+    按规范模型匹配，各榜单的不同写法都计入；
+    同一快照中模型有多条记录（不同 agent 或写法）时取最好名次与最高分；
+    rank_change 为相对上一个点上升的名次数（下降为负），任一名次为空时为空。
+    """
+    if bucket not in BUCKETS:
+        raise ValueError("bucket 必须是 " + " | ".join(BUCKETS))
+    daily = _daily_delta(session, model) if snapshots.any_delta(session) else _daily_sql(session, model)
+
+    series = []
+    for bench in sorted(daily, key=lambda b: b.name):
+        points = []
+        prev: Optional[int] = None
+        for d, rank, score in _downsample(daily[bench], bucket):
+            change = prev - rank if prev is not None and rank is not None else None
+            points.append({"date": d.isoformat(), "rank": rank, "score": score, "rank_change": change})
+            prev = rank
+        series.append({"bench": bench.value, "points": points})
+    return series
@@ -0,0 +1,192 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime
+
+from sqlalchemy import select, update, insert, and_
+from sqlalchemy.orm import Session
+
+from ..models import Result, BenchType
+from .payloads import store_payloads
+
+# 与 idx_unique_record 保持一致的业务键
+KEY_COLUMNS = ("bench", "rank", "agent", "model", "scraped_date")
+
+# 冲突时需要覆盖的字段（created_at 保留首次写入时间）
+UPDATE_COLUMNS = (
+    "org",
+    "org_country",
+    "agent_org",
+    "model_org",
+    "model_id",
+    "org_id",
+    "score",
+    "score_error",
+    "date",
+    "raw_hash",
+    "raw_json",
+    "updated_at",
+)
+
+# 支持原生 upsert 的方言
+NATIVE_DIALECTS = {"sqlite", "mysql", "postgresql"}
+
+RowKey = Tuple[BenchType, Optional[int], Optional[str], Optional[str], date]
+
+
+def row_key(row: Dict[str, Any]) -> RowKey:
+    return tuple(row[c] for c in KEY_COLUMNS)  # type: ignore[return-value]
+
+
+def _native_insert(dialect: str):
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    return dialect_insert(Result.__table__)
+
+
+def _native_upsert_stmt(dialect: str):
+    """构造方言原生的 upsert 语句，冲突目标为 idx_unique_record"""
+    stmt = _native_insert(dialect)
+    if dialect == "mysql":
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in UPDATE_COLUMNS})
+    return stmt.on_conflict_do_update(
+        index_elements=list(KEY_COLUMNS),
+        set_={c: stmt.excluded[c] for c in UPDATE_COLUMNS},
+    )
+
+
+class BulkUpserter:
+    """
+    批量 upsert 引擎。
+
+    每个 (bench, scraped_date) 只预取一次当天已有的业务键到 dict，
+    之后每批数据只需一条 upsert 语句（或一条 insert + 一条按主键 update），
+    不再为每一行单独 SELECT。插入/更新计数基于预取的键，结果精确。
+
+    注意：唯一索引中 NULL 互不相等，rank/agent/model 含 NULL 的行
+    无法依赖 ON CONFLICT 去重，这些行始终走预取 dict 的路径。
+    """
+
+    def __init__(self, session: Session, scraped_date: date) -> None:
+        self.session = session
+        self.scraped_date = scraped_date
+        self.dialect = session.get_bind().dialect.name
+        # 业务键 -> 主键 id（本次新插入的行 id 未知，记为 None）
+        self._keys: Dict[RowKey, Optional[int]] = {}
+        self._loaded_benches: set[BenchType] = set()
+
+    def _prefetch(self, benches: Iterable[BenchType]) -> None:
+        missing = [b for b in benches if b not in self._loaded_benches]
+        if not missing:
+            return
+        stmt = select(Result.id, Result.bench, Result.rank, Result.agent, Result.model).where(
+            Result.scraped_date == self.scraped_date,
+            Result.bench.in_(missing),
+        )
+        for rid, bench, rank, agent, model in self.session.execute(stmt):
+            self._keys[(bench, rank, agent, model, self.scraped_date)] = rid
+        self._loaded_benches.update(missing)
+
+    def upsert(self, rows: List[Dict[str, Any]], payloads: Optional[Dict[str, str]] = None) -> Tuple[int, int]:
+        """
+        写入一批行（字段与 Result 列同名）。
+
+        payloads 为本批行引用的原始数据（hash -> 规范 JSON），先于结果行写入。
+
+        Returns:
+            (inserted, updated)
+        """
+        if not rows:
+            return 0, 0
+
+        store_payloads(self.session, payloads or {})
+
+        # 批内去重：同一业务键以最后一次出现为准，重复项计为更新
+        deduped: Dict[RowKey, Dict[str, Any]] = {}
+        for row in rows:
+            deduped[row_key(row)] = row
+        duplicates = len(rows) - len(deduped)
+
+        self._prefetch({k[0] for k in deduped})
+
+        new_rows: List[Dict[str, Any]] = []
+        existing_rows: List[Dict[str, Any]] = []
+        for key, row in deduped.items():
+            if key in self._keys:
+                existing_rows.append(row)
+            else:
+                new_rows.append(row)
+
+        if self.dialect in NATIVE_DIALECTS:
+            native = [r for r in deduped.values() if None not in row_key(r)]
+            if native:
+                self.session.execute(_native_upsert_stmt(self.dialect), native)
+            new_rows = [r for r in new_rows if None in row_key(r)]
+            existing_rows = [r for r in existing_rows if None in row_key(r)]
+
+        if new_rows:
+            self.session.execute(insert(Result), new_rows)
+        if existing_rows:
+            self._update_existing(existing_rows)
+
+        inserted = 0
+        for key in deduped:
+            if key not in self._keys:
+                self._keys[key] = None
+                inserted += 1
+        updated = len(deduped) - inserted + duplicates
+        return inserted, updated
+
+    def _update_existing(self, rows: List[Dict[str, Any]]) -> None:
+        by_id: List[Dict[str, Any]] = []
+        for row in rows:
+            rid = self._keys[row_key(row)]
+            values = {c: row[c] for c in UPDATE_COLUMNS}
+            if rid is not None:
+                by_id.append({"id": rid, **values})
+                continue
+            # 本次运行中刚插入、id 未知的行（极少见）：按业务键更新
+            conds = [
+                getattr(Result, c).is_(None) if row[c] is None else getattr(Result, c) == row[c]
+                for c in KEY_COLUMNS
+            ]
+            self.session.execute(update(Result).where(and_(*conds)).values(**values))
+        if by_id:
+            # ORM 按主键批量更新（executemany）
+            self.session.execute(update(Result), by_id)
+
+
+def build_row(
+    item: Dict[str, Any],
+    bench_type: BenchType,
+    org: Optional[str],
+    nation: Optional[str],
+    raw_hash: Optional[str],
+    scraped_date: date,
+    now: datetime,
+) -> Dict[str, Any]:
+    return {
+        "bench": bench_type,
+        "rank": item.get("rank"),
+        "agent": item.get("agent"),
+        "model": item.get("model"),
+        "org": org,
+        "org_country": nation,
+        "agent_org": item.get("agent_org"),
+        "model_org": item.get("model_org"),
+        # 由 IdentityResolver.assign 填写
+        "model_id": None,
+        "org_id": None,
+        "score": item.get("score"),
+        "score_error": item.get("score_error"),
+        "date": item.get("date"),
+        "raw_hash": raw_hash,
+        # 更新时顺带清掉旧版本逐行保存的原始数据
+        "raw_json": None,
+        "scraped_date": scraped_date,
+        "created_at": now,
+        "updated_at": now,
+    }
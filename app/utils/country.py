@@ -1,32 +1,111 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+from functools import lru_cache
 import os
+import re
 import yaml
 
-_DEFAULT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/org_countries.yaml"))
+MAPPING_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/org_countries.yaml"))
+
+# 按规则匹配的保留键，其余顶层键为组织名
+RULES_KEY = "_rules"
+# 每个解析器记住的组织名个数
+CACHE_SIZE = 4096
+
+
+def _lower(name: str) -> str:
+    return name.strip().lower()
 
 
 class OrgCountryResolver:
-    def __init__(self, mapping_path: str | None = None) -> None:
-        self.mapping_path = mapping_path or _DEFAULT_PATH
-        self._map = self._load_map()
+    """
+    组织 -> 国家。加载时把全部规则编译为一个字典和一条正则：
+
+    - 精确：org_countries.yaml 中的组织名（按 key 归一化，默认大小写不敏感）
+    - 别名：aliases（归一化写法 -> 规范组织名），规范名或同组其他写法有国家时一并收录
+    - 规则：_rules 中的 suffix / regex，按书写顺序取第一个命中的
+
+    值为空的组织视为已收录、国家未知。文件格式错误时抛出 ValueError；文件不存在时为空。
+    """
+
+    def __init__(
+        self,
+        mapping_path: str | None = None,
+        key: Callable[[str], str] = _lower,
+        aliases: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        self.mapping_path = mapping_path or MAPPING_PATH
+        self.key = key
+        self.mtime = os.path.getmtime(self.mapping_path) if os.path.exists(self.mapping_path) else None
+        self._map, self._pattern, self._countries = self._compile(self._load(), aliases or {})
+        self._lookup = lru_cache(maxsize=CACHE_SIZE)(self._resolve)
 
-    def _load_map(self) -> dict[str, str]:
+    def _load(self) -> dict:
+        if self.mtime is None:
+            return {}
         try:
-            if not os.path.exists(self.mapping_path):
-                return {}
             with open(self.mapping_path, "r", encoding="utf-8") as f:
                 data = yaml.safe_load(f) or {}
-            # normalize keys to lower case
-            return {str(k).strip().lower(): str(v).strip() for k, v in data.items() if k is not None and v is not None}
-        except Exception:
-            return {}
+        except (OSError, yaml.YAMLError) as e:
+            raise ValueError(f"无法读取 {self.mapping_path}: {e}") from e
+        if not isinstance(data, dict):
+            raise ValueError(f"{self.mapping_path} 应为 组织: 国家 的映射")
+        return data
+
+    def _compile(
+        self, data: dict, aliases: Mapping[str, str],
+    ) -> Tuple[Dict[str, Optional[str]], Optional[re.Pattern], List[Optional[str]]]:
+        exact: Dict[str, Optional[str]] = {}
+        for org, country in data.items():
+            if org is None or org == RULES_KEY:
+                continue
+            exact[self.key(str(org))] = (str(country).strip() or None) if country is not None else None
+
+        # 别名：按规范名分组，组内任一写法有国家即整组适用
+        groups: Dict[str, List[str]] = {}
+        for alias, canonical in aliases.items():
+            groups.setdefault(self.key(canonical), []).append(self.key(alias))
+        merged = dict(exact)
+        for canonical, spellings in groups.items():
+            members = [canonical, *spellings]
+            known = [exact[k] for k in members if k in exact]
+            if not known:
+                continue
+            country = next((c for c in known if c), None)
+            for k in members:
+                merged.setdefault(k, country)
+
+        # 规则：合成一条正则，第 i 条规则为命名组 r{i}；从开头匹配，按书写顺序尝试
+        parts: List[str] = []
+        countries: List[Optional[str]] = []
+        for i, rule in enumerate(data.get(RULES_KEY) or []):
+            if not isinstance(rule, dict) or ("suffix" in rule) == ("regex" in rule):
+                raise ValueError(f"{self.mapping_path}: {RULES_KEY}[{i}] 需要 suffix 或 regex 之一")
+            pattern = re.escape(_lower(str(rule["suffix"]))) + "$" if "suffix" in rule else str(rule["regex"])
+            try:
+                re.compile(pattern)
+            except re.error as e:
+                raise ValueError(f"{self.mapping_path}: {RULES_KEY}[{i}] 正则无效: {e}") from e
+            parts.append(f"(?P<r{i}>.*?(?:{pattern}))")
+            countries.append(str(rule.get("country") or "").strip() or None)
+        compiled = re.compile("|".join(parts), re.IGNORECASE | re.DOTALL) if parts else None
+        return merged, compiled, countries
+
+    def _resolve(self, org_name: str) -> Tuple[bool, Optional[str]]:
+        key = self.key(org_name)
+        if key in self._map:
+            return True, self._map[key]
+        if self._pattern is not None:
+            m = self._pattern.match(org_name.strip())
+            if m:
+                return True, self._countries[int(m.lastgroup[1:])]
+        return False, None
 
-    def refresh(self) -> None:
-        self._map = self._load_map()
+    def is_known(self, org_name: Optional[str]) -> bool:
+        """组织已收录（包括值为空、国家未知的）"""
+        return bool(org_name) and self._lookup(org_name)[0]
 
     def get_country(self, org_name: Optional[str]) -> Optional[str]:
         if not org_name:
             return None
-        key = org_name.strip().lower()
-        return self._map.get(key)
+        return self._lookup(org_name)[1]
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+按当前的组织-国家映射重算全部历史数据的 org_country
+
+data/org_countries.yaml（或 identity_aliases.yaml 中的组织别名）修改后运行，
+已入库的历史快照不必重新采集。按 org 分组，只更新国家有变化的组织：
+每批组织一条 UPDATE ... CASE，连同 latest_results、国家汇总（及列式文件）在一个事务中提交。
+中断后直接重新运行即可从未完成的部分继续。
+
+用法:
+    python scripts/backfill_org_country.py [--batch-size 200] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.db import DATABASE_URL
+from app.services.countries import backfill_org_country
+from app.services.ingest import init_db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200, help="每条 UPDATE 处理的组织数")
+    parser.add_argument("--dry-run", action="store_true", help="只列出将要修改的组织，不写库")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 50)
+    print("  回填 org_country")
+    print("=" * 50)
+    print(f"\n数据库: {DATABASE_URL}\n")
+
+    init_db()
+    started = time.perf_counter()
+
+    def progress(done: int, total: int, rows: int) -> None:
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        print(f"  [{done}/{total}] 组织，已更新 {rows} 行，{elapsed:.1f}s，{rate:,.0f} 行/s")
+
+    report = backfill_org_country(args.batch_size, args.dry_run, progress)
+    if not report.orgs:
+        print("✓ 所有行的 org_country 都与当前映射一致，无需回填\n")
+        return
+    for org, (old, new) in list(report.changes.items())[:20]:
+        print(f"  {org}: {old} -> {new}")
+    if report.orgs > 20:
+        print(f"  ... 共 {report.orgs} 个组织")
+    if args.dry_run:
+        print(f"\n（dry run）将修改 {report.orgs} 个组织\n")
+        return
+    rate = report.rows / report.elapsed_s if report.elapsed_s > 0 else 0.0
+    print(f"\n✓ 已更新 {report.orgs} 个组织、{report.rows} 行，用时 {report.elapsed_s:.1f}s（{rate:,.0f} 行/s）")
+    print("  运行中的服务的响应缓存在 RESPONSE_CACHE_TTL 后过期\n")
+
+
+if __name__ == "__main__":
+    main()
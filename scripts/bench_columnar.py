@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+分析查询基准：SQL（results 表 GROUP BY）vs 列式文件（pyarrow 向量化扫描）
+
+生成多年的合成榜单，同时写入临时 SQLite 库与 Parquet 分区目录，
+对同一组趋势查询（每个 bench + model + scraped_date 的最高分、最好名次、条目数）
+分别计时并核对两条路径的结果一致。
+
+用法:
+    python scripts/bench_columnar.py [--years 3] [--rows 200] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def generate(years: int, rows: int):
+    """逐天产出 (bench, scraped_date, 行)；每天少量分数变化，偶有新条目"""
+    from app.models import BenchType
+
+    rnd = random.Random(42)
+    start = date(2022, 1, 1)
+    days = (date(start.year + years, 1, 1) - start).days
+    for bench in BenchType:
+        board = [
+            {"agent": f"agent-{i}", "model": f"model-{i % 60}", "org": f"org-{i % 20}", "score": 80.0 - i * 0.3}
+            for i in range(rows)
+        ]
+        for d in range(days):
+            for _ in range(5):
+                r = rnd.choice(board)
+                r["score"] = round(r["score"] + rnd.choice([-0.5, 0.5]), 2)
+            if rnd.random() < 0.1:
+                n = len(board)
+                board[rnd.randrange(n)] = {
+                    "agent": f"agent-{n}-{d}", "model": f"model-{rnd.randrange(80)}", "org": "org-new", "score": 60.0,
+                }
+            board.sort(key=lambda r: -r["score"])
+            yield bench, start + timedelta(days=d), [
+                {**r, "rank": i + 1, "org_country": None, "agent_org": r["org"], "model_org": None,
+                 "score_error": None, "date": None}
+                for i, r in enumerate(board)
+            ]
+
+
+def load(years: int, rows: int) -> int:
+    from sqlalchemy import insert
+    from app.db import SessionLocal, engine, Base
+    from app.models import Result
+    from app.services import columnar
+
+    Base.metadata.create_all(bind=engine)
+    total = 0
+    now = datetime.utcnow()
+    with SessionLocal() as session:
+        for bench, d, board in generate(years, rows):
+            res = session.execute(
+                insert(Result).returning(Result.id),
+                [{**r, "bench": bench, "scraped_date": d, "created_at": now, "updated_at": now} for r in board],
+            ).scalars().all()
+            columnar.write_partition(bench, d, [{**r, "id": i} for r, i in zip(board, res)])
+            total += len(board)
+        session.commit()
+    return total
+
+
+def sql_trend(benches=None, models=None, since=None, until=None):
+    """与 columnar.trend 等价的 SQL 查询"""
+    from sqlalchemy import select, func
+    from app.db import SessionLocal
+    from app.models import Result
+
+    stmt = (
+        select(Result.bench, Result.model, Result.scraped_date,
+               func.max(Result.score), func.min(Result.rank), func.count())
+        .where(Result.model.is_not(None))
+        .group_by(Result.bench, Result.model, Result.scraped_date)
+    )
+    if benches:
+        stmt = stmt.where(Result.bench.in_(benches))
+    if models:
+        stmt = stmt.where(Result.model.in_(models))
+    if since:
+        stmt = stmt.where(Result.scraped_date >= since)
+    if until:
+        stmt = stmt.where(Result.scraped_date <= until)
+    with SessionLocal() as session:
+        rows = session.execute(stmt).all()
+    items = [
+        {"bench": b.value, "model": m, "scraped_date": d.isoformat(),
+         "best_score": s, "best_rank": r, "entries": n}
+        for b, m, d, s, r, n in rows
+    ]
+    return sorted(items, key=lambda x: (x["bench"], x["model"], x["scraped_date"]))
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=3, help="合成数据的年数")
+    parser.add_argument("--rows", type=int, default=200, help="每个榜单每天的行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询的重复次数（取中位数）")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # 数据库连接在导入 app.db 时根据环境变量创建
+    os.environ.update(
+        DB_TYPE="sqlite",
+        SQLITE_DB_PATH=os.path.join(tmp.name, "bench.db"),
+        COLUMNAR_DIR=os.path.join(tmp.name, "columnar"),
+        STORAGE_MODE="full",
+    )
+    sys.path.insert(0, ROOT)
+    from app.models import BenchType
+    from app.services import columnar
+
+    print("\n" + "=" * 60)
+    print("  分析查询基准: SQL vs 列式文件")
+    print("=" * 60)
+    print(f"\n{len(BenchType)} 个榜单 × {args.years} 年 × 每天 {args.rows} 行\n")
+
+    t0 = time.perf_counter()
+    total = load(args.years, args.rows)
+    print(f"生成数据 {total} 行，用时 {time.perf_counter() - t0:.1f}s\n")
+
+    # 首次查询需读取全部分区文件，之后只重读有变化的文件
+    cold_ms, _ = timed(lambda: columnar.trend(), 1)
+    print(f"列式首次加载（读取全部分区文件）: {cold_ms:.0f} ms\n")
+
+    last_year = date(2022 + args.years - 1, 1, 1)
+    cases = [
+        ("单模型全部历史", {"models": ["model-7"]}),
+        ("单榜单最近一年", {"benches": [BenchType.OSWORLD], "since": last_year}),
+        ("单月全部模型", {"since": date(2022, 6, 1), "until": date(2022, 6, 30)}),
+        ("全部数据", {}),
+    ]
+
+    print(f"{'查询':<20}{'分组数':>10}{'SQL (ms)':>12}{'列式 (ms)':>12}{'加速':>8}  一致")
+    for label, kw in cases:
+        sql_ms, sql_out = timed(lambda: sql_trend(**kw), args.repeat)
+        col_ms, col_out = timed(lambda: columnar.trend(**kw), args.repeat)
+        same = "✓" if sql_out == col_out else "✗"
+        print(f"{label:<20}{len(col_out):>10}{sql_ms:>12.1f}{col_ms:>12.1f}{sql_ms / col_ms:>7.1f}x  {same}")
+
+    db_kb = os.path.getsize(os.environ["SQLITE_DB_PATH"]) / 1024
+    col_kb = sum(
+        os.path.getsize(os.path.join(d, f))
+        for d, _, files in os.walk(os.environ["COLUMNAR_DIR"]) for f in files
+    ) / 1024
+    print(f"\n存储大小: SQLite {db_kb:.0f} KB，Parquet {col_kb:.0f} KB\n")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+查询接口序列化基准：逐行构造 ResultOut vs 按列取元组直接编码
+
+在临时 SQLite 库中生成指定行数的结果（带原始数据），对同一个查询分别计时：
+- 原路径：select(Result) 取 ORM 对象，逐行构造 ResultOut，再经 QueryResponse 校验并序列化
+- 新路径：只取输出的列（元组），orjson 直接编码为 JSON 字节（未安装 orjson 时用 pydantic-core）
+- 新路径 + include_raw：额外关联 raw_payloads 取原始数据
+分别给出从数据库读取的字节数（各列取值的大小之和）、取数与序列化两段的耗时，
+并核对前两条路径输出的字节完全一致。
+
+用法:
+    python scripts/bench_serialize.py [--rows 10000,100000] [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def load(rows: int) -> None:
+    from sqlalchemy import delete, insert
+    from app.db import SessionLocal
+    from app.models import BenchType, RawPayload, Result
+    from app.services.payloads import encode_payload, store_payloads
+
+    now = datetime.utcnow()
+    orgs = [("OpenAI", "美国"), ("智谱", "中国"), (None, None)]
+    with SessionLocal() as session:
+        session.execute(delete(Result))
+        session.execute(delete(RawPayload))
+        for start in range(0, rows, 5000):
+            batch, payloads = [], {}
+            for i in range(start, min(start + 5000, rows)):
+                row = {
+                    "bench": BenchType.TERMINAL_BENCH, "scraped_date": date(2025, 1, 1 + i // 2000 % 28),
+                    "rank": i % 2000 + 1, "agent": f"agent-{i % 500}", "model": f"model-{i % 300}",
+                    "org": orgs[i % 3][0], "org_country": orgs[i % 3][1], "agent_org": orgs[i % 3][0],
+                    "model_org": None, "score": round(80 - (i % 2000) * 0.031, 2),
+                    "score_error": 1.5 if i % 4 == 0 else None, "date": "2025-01-01",
+                    "created_at": now, "updated_at": now,
+                }
+                # 与爬虫写入的一致：整行单元格
+                raw_hash, payload = encode_payload({"row": [
+                    row["rank"], row["agent"], row["model"], row["date"], row["org"], None, f"{row['score']}%± 1.5",
+                ]})
+                payloads[raw_hash] = payload
+                batch.append({**row, "raw_hash": raw_hash})
+            store_payloads(session, payloads)
+            session.execute(insert(Result), batch)
+        session.commit()
+
+
+def db_bytes(stmt) -> int:
+    """不经类型转换直接执行语句，累加各列取值的大小：字符串按 UTF-8 字节数，数值按 8 字节"""
+    from app.db import engine
+
+    total = 0
+    with engine.connect() as conn:
+        for row in conn.exec_driver_sql(str(stmt.compile(engine))):
+            for v in row:
+                if isinstance(v, str):
+                    total += len(v.encode("utf-8"))
+                elif isinstance(v, bytes):
+                    total += len(v)
+                elif v is not None:
+                    total += 8
+    return total
+
+
+def orm_stmt():
+    from sqlalchemy import select
+    from app.models import Result
+
+    return select(Result).order_by(Result.id)
+
+
+def column_stmt(include_raw: bool = False):
+    from app.models import Result
+    from app.services.serialize import project
+
+    return project(Result, include_raw).order_by(Result.id)
+
+
+def fetch_orm():
+    from app.db import SessionLocal
+
+    with SessionLocal() as session:
+        return session.execute(orm_stmt()).scalars().all()
+
+
+def encode_orm(rows) -> bytes:
+    """user-020 之前查询接口的做法"""
+    from app.schemas import QueryResponse, ResultOut
+
+    items = [
+        ResultOut(
+            id=r.id, bench=r.bench.value, rank=r.rank, agent=r.agent, model=r.model, org=r.org,
+            nation=r.org_country, agent_org=r.agent_org, model_org=r.model_org,
+            score=r.score, score_error=r.score_error, date=r.date,
+        )
+        for r in rows
+    ]
+    return QueryResponse.model_validate({"total": len(items), "items": items}).model_dump_json().encode("utf-8")
+
+
+def fetch_columns(include_raw: bool = False):
+    from app.db import SessionLocal
+    from app.services.serialize import fetch_rows
+
+    with SessionLocal() as session:
+        return fetch_rows(session, column_stmt(include_raw))
+
+
+def encode_columns(rows, include_raw: bool = False) -> bytes:
+    from app.services.serialize import encode_results
+
+    return encode_results(rows, len(rows), include_raw=include_raw)
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), out
+
+
+def report(n, label: str, read: int, fetch_ms: float, enc_ms: float, base_ms: float = 0.0, same: str = "") -> None:
+    total_ms = fetch_ms + enc_ms
+    speedup = f"{base_ms / total_ms:>7.1f}x" if base_ms else " " * 8
+    print(f"{n:>8}  {label:<20}{read / 1024:>10.0f}{fetch_ms:>12.1f}{enc_ms:>14.1f}{total_ms:>12.1f}{speedup}  {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="10000,100000", help="逗号分隔的行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项的重复次数（取中位数）")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    # 数据库连接在导入 app.db 时根据环境变量创建
+    os.environ.update(DB_TYPE="sqlite", SQLITE_DB_PATH=os.path.join(tmp.name, "bench.db"), STORAGE_MODE="full")
+    sys.path.insert(0, ROOT)
+    from app.db import Base, engine
+    from app import models  # noqa: F401  注册表结构
+    from app.services import serialize
+
+    Base.metadata.create_all(bind=engine)
+    encoder = "orjson" if serialize.orjson is not None else "pydantic-core"
+
+    print("\n" + "=" * 60)
+    print("  查询接口序列化基准: ResultOut vs 列元组直接编码")
+    print("=" * 60)
+    print(f"\n编码器: {encoder}，每项取 {args.repeat} 次的中位数\n")
+    print(f"{'行数':>8}  {'路径':<20}{'库读取 (KB)':>10}{'取数 (ms)':>12}{'序列化 (ms)':>14}{'合计 (ms)':>12}{'加速':>8}  一致")
+
+    for n in [int(x) for x in args.rows.split(",") if x.strip()]:
+        load(n)
+        orm_fetch_ms, orm_rows = timed(fetch_orm, args.repeat)
+        orm_enc_ms, orm_body = timed(lambda: encode_orm(orm_rows), args.repeat)
+        col_fetch_ms, col_rows = timed(fetch_columns, args.repeat)
+        col_enc_ms, col_body = timed(lambda: encode_columns(col_rows), args.repeat)
+        raw_fetch_ms, raw_rows = timed(lambda: fetch_columns(True), args.repeat)
+        raw_enc_ms, raw_body = timed(lambda: encode_columns(raw_rows, True), args.repeat)
+        base_ms = orm_fetch_ms + orm_enc_ms
+        report(n, "ResultOut", db_bytes(orm_stmt()), orm_fetch_ms, orm_enc_ms)
+        report("", "列元组", db_bytes(column_stmt()), col_fetch_ms, col_enc_ms, base_ms,
+               "✓" if orm_body == col_body else "✗")
+        report("", "列元组 + include_raw", db_bytes(column_stmt(True)), raw_fetch_ms, raw_enc_ms, base_ms)
+
+    print(f"\n响应体大小（最后一组）: {len(col_body) / 1024:.0f} KB，include_raw 时 {len(raw_body) / 1024:.0f} KB\n")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+存储模式基准：全量快照（STORAGE_MODE=full）vs 增量变更（STORAGE_MODE=delta）
+
+用合成榜单模拟连续多天的采集（每天少量行变化），分别在两个临时 SQLite 库中入库，
+对比存储行数、库文件大小、入库耗时以及重建最新榜单 / 全部历史的读取耗时。
+
+用法:
+    python scripts/bench_storage.py [--rows 200] [--days 90] [--churn 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def run_mode(mode: str, rows: int, days: int, churn: int, db_path: str) -> dict:
+    """在子进程中运行（数据库连接在导入 app.db 时根据环境变量创建）"""
+    env = dict(os.environ, DB_TYPE="sqlite", SQLITE_DB_PATH=db_path, STORAGE_MODE=mode)
+    args = [sys.executable, __file__, "--worker", "--rows", str(rows), "--days", str(days), "--churn", str(churn)]
+    out = subprocess.run(args, env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["db_bytes"] = os.path.getsize(db_path)
+    return result
+
+
+def worker(rows: int, days: int, churn: int) -> None:
+    sys.path.insert(0, ROOT)
+    from datetime import date, timedelta
+    from sqlalchemy import select, func
+    from app.db import SessionLocal
+    from app.models import Result, BenchType
+    from app.scrapers import SCRAPERS, register_scraper
+    from app.services import snapshots
+    from app.services.ingest import run_ingest
+
+    rnd = random.Random(42)
+    board = [
+        {"agent": f"agent-{i}", "model": f"model-{i % 40}", "org": f"org-{i % 15}", "score": 80.0 - i * 0.3}
+        for i in range(rows)
+    ]
+    state = {"board": board, "next": rows}
+
+    def synthetic(url=None, timeout=None):
+        return [
+            {
+                "bench": "terminal-bench",
+                "rank": i + 1,
+                "agent": r["agent"],
+                "model": r["model"],
+                "org": r["org"],
+                "score": round(r["score"], 2),
+                "raw": {"row": [i + 1, r["agent"], r["model"], r["org"], round(r["score"], 2)]},
+            }
+            for i, r in enumerate(state["board"])
+        ]
+
+    def evolve():
+        b = [dict(r) for r in state["board"]]
+        for _ in range(churn):
+            op = rnd.random()
+            if op < 0.7:
+                rnd.choice(b)["score"] += rnd.choice([-0.5, 0.5])
+            elif op < 0.85 and len(b) > 1:
+                b.pop(rnd.randrange(len(b)))
+            else:
+                n = state["next"]
+                state["next"] += 1
+                b.append({"agent": f"agent-{n}", "model": f"model-{n % 40}", "org": f"org-{n % 15}", "score": 60.0})
+        b.sort(key=lambda r: -r["score"])
+        state["board"] = b
+
+    SCRAPERS.clear()
+    register_scraper("terminal-bench", synthetic, "synthetic://terminal-bench")
+
+    start = date(2024, 1, 1)
+    t0 = time.perf_counter()
+    for d in range(days):
+        run_ingest("terminal-bench", start + timedelta(days=d))
+        evolve()
+    ingest_s = time.perf_counter() - t0
+
+    with SessionLocal() as session:
+        stored = session.execute(select(func.count(Result.id))).scalar()
+        t0 = time.perf_counter()
+        latest = snapshots.bench_rows(session, BenchType.TERMINAL_BENCH, latest_only=True)
+        latest_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        full_history = snapshots.bench_rows(session, BenchType.TERMINAL_BENCH, latest_only=False)
+        history_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        "rows_stored": stored,
+        "ingest_s": ingest_s,
+        "latest_rows": len(latest),
+        "latest_ms": latest_s * 1000,
+        "history_rows": len(full_history),
+        "history_ms": history_s * 1000,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200, help="榜单行数")
+    parser.add_argument("--days", type=int, default=90, help="采集天数")
+    parser.add_argument("--churn", type=int, default=5, help="每天变化的行数")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.rows, args.days, args.churn)
+        return
+
+    print("\n" + "=" * 60)
+    print("  存储模式基准: full vs delta")
+    print("=" * 60)
+    print(f"\n榜单 {args.rows} 行 × {args.days} 天，每天变化约 {args.churn} 行\n")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("full", "delta"):
+            print(f"运行 {mode} ...")
+            results[mode] = run_mode(mode, args.rows, args.days, args.churn, os.path.join(tmp, f"{mode}.db"))
+
+    full, delta = results["full"], results["delta"]
+    print()
+    print(f"{'指标':<24}{'full':>14}{'delta':>14}{'delta/full':>12}")
+    rows = [
+        ("存储行数", "rows_stored", "{:.0f}"),
+        ("库文件大小 (KB)", "db_bytes", "{:.0f}"),
+        ("入库总耗时 (s)", "ingest_s", "{:.2f}"),
+        ("读最新榜单 (ms)", "latest_ms", "{:.1f}"),
+        ("读全部历史 (ms)", "history_ms", "{:.1f}"),
+    ]
+    for label, key, fmt in rows:
+        a, b = full[key], delta[key]
+        if key == "db_bytes":
+            a, b = a / 1024, b / 1024
+        ratio = f"{b / a:.2f}" if a else "-"
+        print(f"{label:<24}{fmt.format(a):>14}{fmt.format(b):>14}{ratio:>12}")
+
+    same = full["latest_rows"] == delta["latest_rows"] and full["history_rows"] == delta["history_rows"]
+    print(f"\n重建结果行数一致: {'✓' if same else '✗'}"
+          f"（最新 {delta['latest_rows']} 行，历史 {delta['history_rows']} 行）\n")
+
+
+if __name__ == "__main__":
+    main()
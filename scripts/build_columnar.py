@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+按数据库内容重写 COLUMNAR_DIR 下的全部列式文件
+
+首次启用列式存储、或文件丢失 / 与数据库不一致时运行。
+
+用法:
+    COLUMNAR_DIR=data/columnar python scripts/build_columnar.py [terminal-bench|osworld]
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.db import SessionLocal
+from app.models import BenchType
+from app.services import columnar
+
+
+def main():
+    benches = [BenchType(b) for b in sys.argv[1:]]
+    try:
+        root = columnar.require_dir()
+    except columnar.ColumnarUnavailable as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    with SessionLocal() as session:
+        written = columnar.rebuild_all(session, benches)
+    print(f"✓ 已写入 {written} 个快照到 {root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,12 @@ from datetime import date, timedelta
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.db import SessionLocal
-from app.models import Result
+from app.models import Result, BenchType
+from app.services.payloads import prune_payloads
+from app.services.latest import refresh_latest
+from app.services.rollups import refresh_rollups
+from app.services import columnar
+from app.services.ingest import delete_by_date as delete_by_date_all
 from sqlalchemy import select, delete, func
 
 
@@ -48,9 +53,16 @@ def keep_latest_only():
     with SessionLocal() as session:
         stmt = delete(Result).where(Result.scraped_date < latest_date)
         result = session.execute(stmt)
+        for bench in BenchType:
+            refresh_latest(session, bench)
+            refresh_rollups(session, bench)
+        pruned = prune_payloads(session)
         session.commit()
+        # 提交后再按数据库内容重写列式文件
+        if columnar.enabled():
+            columnar.rebuild_all(session)
         
-        print(f"\n✓ 已删除 {result.rowcount} 条旧数据")
+        print(f"\n✓ 已删除 {result.rowcount} 条旧数据（清理原始数据 {pruned} 条）")
         print(f"✓ 保留了 {latest_date} 的数据")
 
 
@@ -71,12 +83,10 @@ def delete_by_date(target_date: date):
             print("已取消")
             return
         
-        # 删除
-        stmt = delete(Result).where(Result.scraped_date == target_date)
-        result = session.execute(stmt)
-        session.commit()
+        # 其后的增量快照、汇总、列式文件与条件请求缓存一并处理
+        deleted = delete_by_date_all("all", target_date)
         
-        print(f"\n✓ 已删除 {result.rowcount} 条数据")
+        print(f"\n✓ 已删除 {deleted} 条数据")
 
 
 def main():
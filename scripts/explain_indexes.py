@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+检查各接口的查询是否用上了为其设计的索引
+
+依次调用各接口（以及入库时的预取、latest_results / 汇总表刷新），记录实际发出的 SQL，
+在当前配置的数据库（DB_TYPE，支持 sqlite / mysql / postgresql）上执行 EXPLAIN，
+核对用到的索引是否包含 app/services/indexes.py 中 CHECKS 期望的索引。
+
+PostgreSQL 上会关闭 enable_seqscan：数据量小时规划器倾向全表扫描，
+这里检查的是索引能否被用上。MySQL 在表很小时也可能选择全表扫描（type=ALL），
+建议在有一定数据量的库上运行，或用 --seed 向空库写入合成数据。
+
+用法:
+    python scripts/explain_indexes.py [--seed 60] [--verbose]
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# 关闭响应缓存，保证每次调用都会查询数据库
+os.environ["RESPONSE_CACHE_SIZE"] = "0"
+# 查询接口走同步引擎，语句才能被 capture(engine) 记录到（异步引擎发出的 SQL 与之相同）
+os.environ["DB_ASYNC"] = "0"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select, func, insert, inspect
+
+from app.db import SessionLocal, engine, DATABASE_URL, index_names
+from app.main import app
+from app.models import Result, BenchType
+from app.services.identities import ensure_identities
+from app.services.ingest import init_db
+from app.services.latest import refresh_latest
+from app.services.rollups import refresh_rollups
+from app.services.upsert import BulkUpserter
+from app.services.indexes import CHECKS, explain_all
+
+
+def seed(days: int, rows: int = 100) -> None:
+    """空库写入合成数据：每个榜单 days 天 × rows 行"""
+    now = datetime.utcnow()
+    start = date.today() - timedelta(days=days)
+    with SessionLocal() as session:
+        for bench in BenchType:
+            for d in range(days):
+                session.execute(insert(Result), [
+                    {
+                        "bench": bench, "rank": i + 1, "agent": f"agent-{i}", "model": f"model-{i % 30}",
+                        "org": f"org-{i % 12}", "org_country": f"nation-{i % 5}", "agent_org": f"org-{i % 12}",
+                        "score": 90.0 - i * 0.5 + d * 0.01, "scraped_date": start + timedelta(days=d),
+                        "created_at": now, "updated_at": now,
+                    }
+                    for i in range(rows)
+                ])
+            refresh_rollups(session, bench)
+        session.commit()
+    # 为合成数据解析规范模型 / 组织，再生成 latest_results（复制 model_id）
+    ensure_identities()
+    with SessionLocal() as session:
+        for bench in BenchType:
+            refresh_latest(session, bench)
+        session.commit()
+
+
+def rolled_back(fn):
+    def run():
+        with SessionLocal() as session:
+            fn(session)
+            session.rollback()
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="results 为空时写入多少天的合成数据")
+    parser.add_argument("--verbose", action="store_true", help="打印每条语句的执行计划")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("  索引使用检查")
+    print("=" * 60)
+    print(f"\n数据库: {DATABASE_URL}\n")
+
+    init_db()
+    with SessionLocal() as session:
+        count = session.execute(select(func.count(Result.id))).scalar()
+        if not count and args.seed:
+            seed(args.seed)
+            count = session.execute(select(func.count(Result.id))).scalar()
+        if not count:
+            print("✗ results 表为空，可用 --seed 写入合成数据")
+            sys.exit(1)
+        bench, d = session.execute(
+            select(Result.bench, func.max(Result.scraped_date)).group_by(Result.bench).order_by(func.count().desc())
+        ).first()
+        model = session.execute(
+            select(Result.model).where(Result.model.is_not(None), Result.bench == bench)
+            .group_by(Result.model).order_by(func.count().desc()).limit(1)
+        ).scalar()
+
+    with engine.connect() as conn:
+        existing = set()
+        for table in ("results", "latest_results", "org_rollups", "nation_rollups"):
+            existing |= index_names(conn, inspect(conn), table)
+
+    client = TestClient(app)
+    params = {"bench": bench.value, "model": model, "date": d.isoformat()}
+    runners = {
+        "ingest: 预取当天已有行": rolled_back(lambda s: BulkUpserter(s, d)._prefetch([bench])),
+        "ingest: 刷新 latest_results": rolled_back(lambda s: refresh_latest(s, bench)),
+        "ingest: 刷新汇总表": rolled_back(lambda s: refresh_rollups(s, bench, [d])),
+    }
+
+    def prepare(conn):
+        if conn.dialect.name == "postgresql":
+            conn.exec_driver_sql("SET enable_seqscan = off")
+
+    failed = 0
+    print(f"{'检查项':<52}{'结果':<6}用到的索引")
+    for check in CHECKS:
+        if check.name in runners:
+            run = runners[check.name]
+        else:
+            method, path = check.name.split(" ", 1)
+            url = path.format(**params)
+            # POST 批量接口的请求体
+            body = {"models": [model]} if method == "POST" else None
+            run = lambda method=method, url=url, body=body: client.request(method, url, json=body).raise_for_status()
+        wanted = [i for i in check.indexes if i in existing]
+        plans = explain_all(engine, run, prepare)
+        used = set().union(*(p.indexes for p in plans)) if plans else set()
+        scans = set().union(*(p.full_scans for p in plans)) if plans else set()
+        if not wanted:
+            status = "跳过"  # 期望的索引在当前数据库上不存在（如 MySQL 不建表达式索引）
+        elif used & set(wanted):
+            status = "✓"
+        else:
+            status = "✗"
+            failed += 1
+        note = ", ".join(sorted(used)) or "-"
+        if "results" in scans:
+            note += "  [results 全表扫描]"
+        print(f"{check.name:<52}{status:<6}{note}")
+        if args.verbose or status == "✗":
+            for p in plans:
+                print("    " + " ".join(p.statement.split())[:160])
+                for line in p.text.splitlines():
+                    print("      " + line)
+
+    print()
+    if failed:
+        print(f"✗ {failed} 项未用上期望的索引\n")
+        sys.exit(1)
+    print("✓ 全部查询都用上了期望的索引\n")
+
+
+if __name__ == "__main__":
+    main()
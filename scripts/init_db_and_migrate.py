@@ -3,21 +3,31 @@
 数据库初始化和数据迁移脚本
 
 功能：
-1. 创建数据库表结构
-2. 从 SQLite 迁移数据到 MySQL（可选）
-3. 验证数据完整性
+1. 创建数据库表结构（并为旧表补齐新增的列和索引）
+2. 把 results.raw_json 迁移到内容寻址的 raw_payloads 表
+3. 为各行解析跨榜单的规范模型 / 组织（--rebuild-identities 按修改后的别名表全部重新解析）
+4. 从 SQLite 迁移数据到 MySQL（可选）
+5. 验证数据完整性
+
+用法:
+    python scripts/init_db_and_migrate.py [--rebuild-identities]
 """
 
+import argparse
 import sys
 import os
-from datetime import date
+import json
 
 # 添加项目路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app.db import engine, SessionLocal, DATABASE_URL
-from app.models import Base, Result, BenchType
-from sqlalchemy import select, func, text
+from app.db import engine, SessionLocal, DATABASE_URL, upgrade_schema
+from app.models import Base, Result, BenchType, RawPayload, Snapshot
+from app.services.payloads import encode_payload, store_payloads
+from app.services.identities import ensure_identities, resolve_missing
+from app.services.latest import refresh_latest
+from app.services.rollups import refresh_rollups
+from sqlalchemy import select, update, func, text
 
 
 def create_tables():
@@ -29,7 +39,15 @@ def create_tables():
     
     try:
         Base.metadata.create_all(bind=engine)
+        changes = upgrade_schema()
         print("✓ 表结构创建成功\n")
+        for name in changes:
+            if name.startswith("-"):
+                print(f"  - 删除旧索引: {name[1:]}")
+            elif name.endswith(":varchar"):
+                print(f"  ~ 枚举列改为字符串: {name.rsplit(':', 1)[0]}")
+            else:
+                print(f"  + 补齐: {name}")
         
         # 显示创建的表
         with engine.connect() as conn:
@@ -99,8 +117,63 @@ def check_data():
         print(f"✗ 检查数据失败: {e}")
 
 
+def migrate_raw_payloads(batch_size: int = 1000):
+    """
+    把旧版本逐行保存在 results.raw_json 中的原始数据迁移到 raw_payloads。
+
+    每行计算规范 JSON 的内容哈希，相同内容只存一份；results 改为引用哈希并清空 raw_json。
+    可重复执行：只处理 raw_json 非空且 raw_hash 为空的行。
+    """
+    print("\n" + "=" * 50)
+    print("  迁移原始数据到 raw_payloads")
+    print("=" * 50 + "\n")
+
+    migrated = 0
+    last_id = 0
+    try:
+        with SessionLocal() as session:
+            while True:
+                stmt = (
+                    select(Result.id, Result.raw_json)
+                    .where(Result.id > last_id, Result.raw_json.is_not(None), Result.raw_hash.is_(None))
+                    .order_by(Result.id)
+                    .limit(batch_size)
+                )
+                rows = session.execute(stmt).all()
+                if not rows:
+                    break
+
+                payloads = {}
+                updates = []
+                for rid, raw_json in rows:
+                    try:
+                        raw = json.loads(raw_json)
+                    except ValueError:
+                        # 无法解析的旧数据保持原样
+                        continue
+                    raw_hash, payload = encode_payload(raw)
+                    payloads[raw_hash] = payload
+                    updates.append({"id": rid, "raw_hash": raw_hash, "raw_json": None})
+
+                store_payloads(session, payloads)
+                if updates:
+                    session.execute(update(Result), updates)
+                session.commit()
+
+                migrated += len(updates)
+                last_id = rows[-1][0]
+                print(f"  已迁移 {migrated} 行...")
+
+            distinct = session.execute(select(func.count(RawPayload.hash))).scalar()
+        print(f"\n✓ 迁移完成: {migrated} 行，raw_payloads 共 {distinct} 条")
+    except Exception as e:
+        print(f"✗ 迁移失败: {e}")
+        import traceback
+        traceback.print_exc()
+
+
 def migrate_from_sqlite(sqlite_path: str):
-    """从 SQLite 迁移数据到当前数据库"""
+    """从 SQLite 迁移数据到当前数据库（含快照元数据与增量快照的变更记录）"""
     if DATABASE_URL.startswith("sqlite"):
         print("当前使用的就是 SQLite，无需迁移")
         return
@@ -120,6 +193,11 @@ def migrate_from_sqlite(sqlite_path: str):
         # 连接 SQLite
         sqlite_engine = create_engine_temp(f"sqlite:///{sqlite_path}")
         SqliteSession = sessionmaker(bind=sqlite_engine)
+
+        # 旧版本的 SQLite 库缺少后来新增的表和列（raw_payloads、snapshots、raw_hash、
+        # change_type / row_key、model_id / org_id 等），先按与目标库相同的方式补齐
+        Base.metadata.create_all(bind=sqlite_engine)
+        upgrade_schema(sqlite_engine)
         
         with SqliteSession() as src_session, SessionLocal() as dst_session:
             # 读取 SQLite 数据
@@ -132,6 +210,29 @@ def migrate_from_sqlite(sqlite_path: str):
             
             print(f"找到 {len(results)} 条记录")
             print("开始迁移...")
+
+            # 先复制被引用的原始数据
+            payloads = {
+                p.hash: p.payload
+                for p in src_session.execute(select(RawPayload)).scalars()
+            }
+            store_payloads(dst_session, payloads)
+
+            # 快照元数据，含每个快照的存储方式：增量快照的变更记录只有配合它才能重建
+            for snap in src_session.execute(select(Snapshot)).scalars():
+                exists = dst_session.execute(
+                    select(Snapshot.id).where(Snapshot.bench == snap.bench, Snapshot.scraped_date == snap.scraped_date)
+                ).first()
+                if not exists:
+                    dst_session.add(Snapshot(
+                        bench=snap.bench,
+                        scraped_date=snap.scraped_date,
+                        meta_json=snap.meta_json,
+                        row_count=snap.row_count,
+                        storage_mode=snap.storage_mode,
+                        created_at=snap.created_at,
+                        updated_at=snap.updated_at,
+                    ))
             
             migrated = 0
             for r in results:
@@ -143,6 +244,8 @@ def migrate_from_sqlite(sqlite_path: str):
                         Result.agent == r.agent,
                         Result.model == r.model,
                         Result.scraped_date == r.scraped_date,
+                        # 增量快照的 removed 标记名次为空，按行标识区分
+                        Result.row_key == r.row_key,
                     )
                 ).scalar_one_or_none()
                 
@@ -161,12 +264,20 @@ def migrate_from_sqlite(sqlite_path: str):
                         score_error=r.score_error,
                         date=r.date,
                         raw_json=r.raw_json,
+                        raw_hash=r.raw_hash,
                         scraped_date=r.scraped_date,
+                        change_type=r.change_type,
+                        row_key=r.row_key,
                         created_at=r.created_at,
                     )
                     dst_session.add(new_record)
                     migrated += 1
             
+            dst_session.flush()
+            resolve_missing(dst_session)
+            for bench in BenchType:
+                refresh_latest(dst_session, bench)
+                refresh_rollups(dst_session, bench)
             dst_session.commit()
             print(f"\n✓ 迁移完成: {migrated} 条新记录")
             
@@ -176,7 +287,26 @@ def migrate_from_sqlite(sqlite_path: str):
         traceback.print_exc()
 
 
+def resolve_identities(rebuild: bool = False):
+    """解析规范模型 / 组织：补上缺失的，rebuild 时全部重新解析"""
+    print("\n" + "=" * 50)
+    print("  解析规范模型 / 组织")
+    print("=" * 50 + "\n")
+    resolved = ensure_identities(rebuild=rebuild)
+    if rebuild:
+        print(f"✓ 已按当前别名表重新解析: {resolved} 种写法")
+    elif resolved:
+        print(f"✓ 补上 {resolved} 种写法的规范实体")
+    else:
+        print("✓ 所有行都已解析，无需处理")
+
+
 def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rebuild-identities", action="store_true",
+                        help="修改 data/identity_aliases.yaml 后，按新规则重新解析全部规范模型 / 组织")
+    args = parser.parse_args()
+
     print("\n" + "=" * 50)
     print("  LLM Leaderboard 数据库初始化工具")
     print("=" * 50)
@@ -185,10 +315,16 @@ def main():
     if not create_tables():
         sys.exit(1)
     
-    # 2. 检查数据
+    # 2. 迁移逐行保存的原始数据
+    migrate_raw_payloads()
+
+    # 3. 解析规范模型 / 组织
+    resolve_identities(args.rebuild_identities)
+    
+    # 4. 检查数据
     check_data()
     
-    # 3. 询问是否迁移
+    # 5. 询问是否迁移
     if not DATABASE_URL.startswith("sqlite"):
         sqlite_path = "llm_leaderboard.db"
         if os.path.exists(sqlite_path):
@@ -196,6 +332,7 @@ def main():
             response = input(f"\n发现 SQLite 数据库文件 ({sqlite_path})，是否迁移数据？[y/N]: ")
             if response.lower() == 'y':
                 migrate_from_sqlite(sqlite_path)
+                migrate_raw_payloads()
                 check_data()
     
     print("\n" + "=" * 50)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+查询接口压测：同步会话 + 线程池（DB_ASYNC=0）vs 异步引擎（DB_ASYNC=1）
+
+对每种模式各启动一个 uvicorn 进程，连接同一个 SQLite 库，
+用 httpx.AsyncClient 以给定并发持续请求一组查询接口，
+输出每种模式的吞吐（req/s）与延迟分位数。默认关闭响应缓存，测的是数据库路径。
+
+用法:
+    python scripts/load_test.py --db llm_leaderboard.db [--concurrency 50] [--duration 15]
+    python scripts/load_test.py --seed 30        # 临时库写入 30 天合成数据
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seed(db_path: str, days: int) -> None:
+    """在 db_path 写入合成数据（子进程中执行，避免本进程的数据库连接指向它）"""
+    code = (
+        "import sys; from app.services.ingest import init_db; from scripts.explain_indexes import seed;"
+        "init_db(); seed(int(sys.argv[1]))"
+    )
+    env = {**os.environ, "DB_TYPE": "sqlite", "SQLITE_DB_PATH": db_path}
+    subprocess.run([sys.executable, "-c", code, str(days)], cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def targets(db_path: str) -> list:
+    """从库中挑出数据最多的 bench 与其中最常见的模型，组成压测的 URL 列表"""
+    import sqlite3
+
+    with sqlite3.connect(db_path) as conn:
+        bench, = conn.execute("SELECT bench FROM results GROUP BY bench ORDER BY count(*) DESC LIMIT 1").fetchone()
+        model, = conn.execute(
+            "SELECT model FROM results WHERE bench = ? AND model IS NOT NULL "
+            "GROUP BY model ORDER BY count(*) DESC LIMIT 1", (bench,)
+        ).fetchone()
+    from app.models import BenchType
+    bench = BenchType[bench].value
+    return [
+        f"/api/benches/{bench}/models",
+        f"/api/models/{model}/benches",
+        f"/api/models/{model}/trend?bucket=week",
+        f"/api/query?bench={bench}&limit=50",
+        "/api/stats/orgs",
+        "/api/health",
+    ]
+
+
+def start_server(db_path: str, port: int, async_db: bool, cache: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DB_TYPE": "sqlite",
+        "SQLITE_DB_PATH": db_path,
+        "DB_ASYNC": "1" if async_db else "0",
+        "RESPONSE_CACHE_SIZE": str(cache),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("服务启动超时")
+
+
+async def drive(base: str, urls: list, concurrency: int, duration: float) -> dict:
+    """concurrency 个协程循环请求 urls，持续 duration 秒"""
+    latencies = []
+    errors = 0
+    stop = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+        async def worker(i: int):
+            nonlocal errors
+            n = i
+            while time.perf_counter() < stop:
+                url = urls[n % len(urls)]
+                n += 1
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(url)
+                    ok = r.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                else:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] if latencies else 0.0
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="压测用的 SQLite 库（不修改其中数据）")
+    parser.add_argument("--seed", type=int, default=30, help="未指定 --db 时在临时库写入多少天的合成数据")
+    parser.add_argument("--concurrency", type=int, default=50, help="并发请求数")
+    parser.add_argument("--duration", type=float, default=15, help="每种模式的压测时长（秒）")
+    parser.add_argument("--cache", type=int, default=0, help="服务端响应缓存大小（默认 0，关闭缓存）")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    tmp = None
+    db_path = args.db
+    if not db_path:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "load.db")
+        print(f"写入 {args.seed} 天合成数据 ...")
+        seed(db_path, args.seed)
+    db_path = os.path.abspath(db_path)
+    urls = targets(db_path)
+
+    print("\n" + "=" * 60)
+    print("  查询接口压测: 线程池 vs 异步引擎")
+    print("=" * 60)
+    print(f"\n数据库: {db_path}")
+    print(f"并发 {args.concurrency}，每种模式 {args.duration:.0f}s，响应缓存 {args.cache}")
+    for url in urls:
+        print(f"  GET {url}")
+    print()
+
+    # 先压一遍做预热（SQLite 页缓存、导入），不计入结果
+    results = {}
+    for label, async_db in (("预热", False), ("同步 + 线程池", False), ("异步引擎", True)):
+        port = free_port()
+        proc = start_server(db_path, port, async_db, args.cache)
+        try:
+            duration = 3 if label == "预热" else args.duration
+            results[label] = asyncio.run(drive(f"http://127.0.0.1:{port}", urls, args.concurrency, duration))
+        finally:
+            proc.terminate()
+            proc.wait()
+    results.pop("预热")
+
+    print(f"{'模式':<16}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'p99 (ms)':>12}{'失败':>8}")
+    for label, r in results.items():
+        print(f"{label:<16}{r['rps']:>10.1f}{r['p50']:>12.1f}{r['p95']:>12.1f}{r['p99']:>12.1f}{r['errors']:>8}")
+    base, new = results["同步 + 线程池"]["rps"], results["异步引擎"]["rps"]
+    if base:
+        print(f"\n异步 / 线程池 吞吐比: {new / base:.2f}x\n")
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,8 @@ echo "✓ 健康检查通过"
 
 echo ""
 echo "[2/6] 触发数据采集..."
-SCRAPE_RESULT=$(curl -fsS -X POST "$BASE/api/scrape?bench=all")
-echo "$SCRAPE_RESULT" | python3 -c "import sys, json; d=json.load(sys.stdin); print(f'✓ 采集完成: 新增={d[\"inserted\"]}, 更新={d[\"updated\"]}, 总数={d[\"total\"]}')"
+SCRAPE_RESULT=$(curl -fsS -X POST "$BASE/api/scrape?bench=all&wait=true")
+echo "$SCRAPE_RESULT" | python3 -c "import sys, json; d=json.load(sys.stdin)['result']; print(f'✓ 采集完成: 新增={d[\"inserted\"]}, 更新={d[\"updated\"]}, 总数={d[\"total\"]}')"
 
 echo ""
 echo "[3/6] 查询 Terminal-Bench 榜单..."
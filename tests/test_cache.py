@@ -0,0 +1,32 @@
+"""响应缓存：按条目数与总字节数淘汰，过大的响应不缓存"""
+from app.services.cache import ResponseCache
+
+
+def test_evicts_by_total_bytes():
+    cache = ResponseCache(maxsize=100, ttl=0, maxbytes=100, max_entry_bytes=60)
+    gen = cache.generation
+    cache.put("a", b"x" * 40, gen)
+    cache.put("b", b"x" * 40, gen)
+    assert cache.get("a") is not None
+    # 超出总字节数：淘汰最久未用的 b
+    cache.put("c", b"x" * 40, gen)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 80
+
+
+def test_skips_oversized_bodies():
+    cache = ResponseCache(maxsize=100, ttl=0, maxbytes=100, max_entry_bytes=60)
+    entry = cache.put("big", b"x" * 61, cache.generation)
+    assert entry.etag
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_replace_and_bump_keep_byte_count():
+    cache = ResponseCache(maxsize=100, ttl=0, maxbytes=100, max_entry_bytes=60)
+    cache.put("a", b"x" * 50, cache.generation)
+    cache.put("a", b"x" * 20, cache.generation)
+    assert cache.stats()["bytes"] == 20
+    cache.bump()
+    assert cache.stats()["bytes"] == 0
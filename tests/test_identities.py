@@ -0,0 +1,21 @@
+"""模型名匹配键：发布日期保留在键中，带日期写法只按别名表合并"""
+from app.services.identities import MODEL, AliasRules, model_key
+
+
+def test_dated_snapshots_stay_distinct():
+    assert model_key("gpt-4o-2024-05-13") != model_key("gpt-4o-2024-08-06")
+    assert model_key("gpt-4o-2024-05-13") != model_key("gpt-4o")
+    assert model_key("GPT-5 (2025-08-07)") == model_key("gpt-5-2025-08-07")
+
+
+def test_spelling_variants_merge():
+    assert model_key("claude-3-5-sonnet") == model_key("Claude Sonnet 3.5")
+    assert model_key("anthropic/claude-4.5-sonnet") == model_key("Claude Sonnet 4.5")
+
+
+def test_dated_alias_from_rules(tmp_path):
+    path = tmp_path / "aliases.yaml"
+    path.write_text("models:\n  Claude Sonnet 4.5: [claude-sonnet-4-5-20250929]\n", encoding="utf-8")
+    rules = AliasRules(str(path))
+    assert rules.canonical(MODEL, "claude-sonnet-4-5-20250929") == rules.canonical(MODEL, "claude sonnet 4.5")
+    assert rules.canonical(MODEL, "claude-sonnet-4-5-20251001")[1] == "claude-sonnet-4-5-20251001"
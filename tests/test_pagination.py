@@ -0,0 +1,39 @@
+"""游标：类型不对的游标返回 400，而不是在比较或 SQL 中出错"""
+from fastapi.testclient import TestClient
+import pytest
+
+from app.main import app
+from app.services.ingest import init_db
+from app.services.pagination import DELTA_KEY_SIZE, FULL_KEY_SIZE, decode_cursor, encode_cursor
+
+VALID = ["TERMINAL_BENCH", 0, 1, 0, -50.5, 3]
+
+
+def test_round_trip():
+    assert decode_cursor(encode_cursor(VALID), FULL_KEY_SIZE) == tuple(VALID)
+    assert decode_cursor(encode_cursor(VALID + ["2025-01-01"]), DELTA_KEY_SIZE) == tuple(VALID) + ("2025-01-01",)
+
+
+@pytest.mark.parametrize("key", [
+    ["NOPE", 0, 1, 0, -50.5, 3],
+    [["TERMINAL_BENCH"], 0, 1, 0, -50.5, 3],
+    ["TERMINAL_BENCH", "0", 1, 0, -50.5, 3],
+    ["TERMINAL_BENCH", 2, 1, 0, -50.5, 3],
+    ["TERMINAL_BENCH", 0, "1", 0, -50.5, 3],
+    ["TERMINAL_BENCH", 0, 1, 0, "-50.5", 3],
+    ["TERMINAL_BENCH", 0, 1, 0, -50.5, True],
+    ["TERMINAL_BENCH", 0, 1, 0, -50.5, 3.5],
+    VALID + [20250101],
+    VALID + ["2025-13-01"],
+])
+def test_rejects_wrong_types(key):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(key), len(key))
+
+
+def test_query_returns_400():
+    init_db()
+    client = TestClient(app)
+    for key in (["TERMINAL_BENCH", 0, "x", 0, -50.5, 3], ["TERMINAL_BENCH", 0, 1, 0, -50.5]):
+        resp = client.get("/api/query", params={"cursor": encode_cursor(key)})
+        assert resp.status_code == 400
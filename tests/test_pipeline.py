@@ -0,0 +1,109 @@
+"""fetch_all 对接本地 stub HTTP 服务：超时、部分失败、全部失败"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+
+from app.scrapers.http_client import HttpClient, HttpConfig, set_client
+from app.services.pipeline import fetch_all
+
+TABLE = (
+    '<html><body><div id="nd-home-layout"><div><div><div><div><table>'
+    "<tr><th>Rank</th><th>Agent</th><th>Model</th><th>Date</th><th>Agent Org</th><th>Model Org</th><th>Accuracy</th></tr>"
+    "<tr><td>1</td><td>Agent A</td><td>gpt-5</td><td>2025-10-01</td><td>OpenAI</td><td>OpenAI</td><td>60.3%± 1.1</td></tr>"
+    "<tr><td>2</td><td>Agent B</td><td>claude-sonnet-4-5</td><td>2025-10-02</td><td>Anthropic</td><td>Anthropic</td><td>50.5%</td></tr>"
+    "</table></div></div></div></div></div></body></html>"
+).encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(2)
+        if self.path in ("/ok", "/slow"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(TABLE)))
+            self.end_headers()
+            try:
+                self.wfile.write(TABLE)
+            except (BrokenPipeError, ConnectionResetError):
+                # /slow：客户端已超时断开
+                pass
+        else:
+            self.send_response(404 if self.path == "/missing" else 500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # 不重试，失败立即返回
+    set_client(HttpClient(HttpConfig(retries=0)))
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    set_client(None)
+    server.shutdown()
+    server.server_close()
+
+
+def _close(results):
+    for r in results:
+        r.close()
+
+
+def test_partial_failure_keeps_other_sources(stub):
+    results = fetch_all(
+        ["terminal-bench", "osworld"],
+        urls={"terminal-bench": stub + "/ok", "osworld": stub + "/missing"},
+    )
+    try:
+        tb, osw = results
+        assert (tb.name, tb.status) == ("terminal-bench", "ok")
+        assert [(i["rank"], i["model"], i["score"]) for i in tb.items] == [
+            (1, "gpt-5", 60.3), (2, "claude-sonnet-4-5", 50.5),
+        ]
+        assert tb.validators is not None and tb.validators.body_hash
+        assert (osw.name, osw.status) == ("osworld", "error")
+        assert "404" in osw.error
+    finally:
+        _close(results)
+
+
+def test_timeout_does_not_wait_for_slow_source(stub):
+    started = time.perf_counter()
+    results = fetch_all(
+        ["osworld", "terminal-bench"],
+        timeouts={"osworld": 0.3, "terminal-bench": 5},
+        urls={"terminal-bench": stub + "/ok", "osworld": stub + "/slow"},
+    )
+    elapsed = time.perf_counter() - started
+    try:
+        osw, tb = results
+        assert osw.status == "timeout" and osw.failed
+        assert osw.latency_ms == 300.0
+        assert tb.status == "ok" and len(list(tb.items)) == 2
+        assert elapsed < 1.5
+    finally:
+        _close(results)
+
+
+def test_all_sources_failing_returns_errors(stub):
+    results = fetch_all(
+        ["terminal-bench", "osworld"],
+        urls={"terminal-bench": stub + "/error", "osworld": "http://127.0.0.1:1/unreachable"},
+    )
+    assert [r.status for r in results] == ["error", "error"]
+    assert all(r.failed and r.error for r in results)
+    assert "500" in results[0].error
+    assert "ConnectionError" in results[1].error
+
+
+def test_no_sources():
+    assert fetch_all([]) == []
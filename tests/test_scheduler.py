@@ -0,0 +1,226 @@
+"""定时采集：假时钟推进 tick()，覆盖抖动、重启恢复、过期错开与多进程认领"""
+from concurrent.futures import Future
+from datetime import date, datetime, timedelta
+import random
+
+import pytest
+from sqlalchemy import delete
+
+from app.db import SessionLocal, engine
+from app.models import FetchState, ScheduleState
+from app.services.jobs import FAILED, SUCCEEDED, Job
+from app.services.scheduler import ERROR_RETRY, RUNNING_POLL, STARTUP_SPREAD, Scheduler, ScheduleStore
+
+T0 = datetime(2025, 10, 1, 12, 0, 0)
+HOUR = 3600.0
+
+
+class FakeClock:
+    def __init__(self, now=T0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+class MemoryStore:
+    """与 ScheduleStore 相同的接口，状态保存在内存中"""
+
+    def __init__(self, states=None, fetched=None):
+        self.states = dict(states or {})
+        self.fetched = dict(fetched or {})
+
+    def load(self):
+        return dict(self.states), dict(self.fetched)
+
+    def save(self, entry):
+        self.states[entry.name] = ScheduleState(
+            source=entry.name, last_run_at=entry.last_run, next_run_at=entry.next_run,
+            last_status=entry.last_status, last_error=entry.last_error,
+            last_job_id=entry.job.id if entry.job else None,
+        )
+
+    def claim(self, name, now, next_run):
+        state = self.states.get(name)
+        if state is not None and state.next_run_at is not None and state.next_run_at > now:
+            return False
+        self.states[name] = ScheduleState(
+            source=name, last_run_at=now, next_run_at=next_run, last_status="running",
+        )
+        return True
+
+
+class StubQueue:
+    """submit 返回未完成的任务，由测试调用 finish 结束"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def __call__(self, name):
+        job = Job(id=f"j{len(self.jobs)}", bench=name, scraped_date=date(2025, 10, 1), force=False, future=Future())
+        self.jobs.append(job)
+        return job
+
+    def finish(self, job, status=SUCCEEDED, error=None):
+        job.status, job.error = status, error
+        job.future.set_result(job)
+
+
+def make(intervals=None, store=None, clock=None, jitter=0.1, seed=0):
+    submit = StubQueue()
+    scheduler = Scheduler(
+        intervals or {"terminal-bench": HOUR}, jitter=jitter, clock=clock or FakeClock(),
+        rng=random.Random(seed), submit=submit, store=store or MemoryStore(),
+    )
+    return scheduler, submit
+
+
+def test_first_run_then_jittered_interval():
+    for seed in range(20):
+        scheduler, _ = make(clock=FakeClock(), seed=seed)
+        entry = scheduler.entries["terminal-bench"]
+        # 没有任何记录：启动后 STARTUP_SPREAD 内错开执行
+        assert T0 <= entry.next_run <= T0 + timedelta(seconds=min(STARTUP_SPREAD, HOUR * 0.1))
+        scheduler.clock.now = entry.next_run
+        assert scheduler.tick() == ["terminal-bench"]
+        delay = (entry.next_run - scheduler.clock.now).total_seconds()
+        assert HOUR * 0.9 <= delay <= HOUR * 1.1
+
+
+def test_not_due_and_running_job_not_resubmitted():
+    clock = FakeClock()
+    scheduler, submit = make(clock=clock, jitter=0.0)
+    clock.advance(STARTUP_SPREAD)
+    assert scheduler.tick() == ["terminal-bench"]
+    clock.advance(HOUR / 2)
+    assert scheduler.tick() == []
+
+    # 到期时上次采集仍在进行：不重复提交，RUNNING_POLL 秒后再检查
+    clock.advance(HOUR)
+    assert scheduler.tick() == []
+    assert scheduler.seconds_until_next() == RUNNING_POLL
+    submit.finish(submit.jobs[0])
+    assert scheduler.entries["terminal-bench"].last_status == "ok"
+    assert scheduler.tick() == ["terminal-bench"]
+    assert len(submit.jobs) == 2
+
+
+def test_restart_resumes_from_stored_state():
+    clock = FakeClock()
+    store = MemoryStore()
+    scheduler, submit = make(clock=clock, store=store, jitter=0.0)
+    clock.advance(STARTUP_SPREAD)
+    scheduler.tick()
+    submit.finish(submit.jobs[0], FAILED, "boom")
+    next_run = scheduler.entries["terminal-bench"].next_run
+
+    # 重启：沿用记录的下次运行时间与上次结果，不立即补采
+    clock.advance(600)
+    restarted, _ = make(clock=clock, store=store, jitter=0.0)
+    entry = restarted.entries["terminal-bench"]
+    assert entry.next_run == next_run
+    assert (entry.last_status, entry.last_error) == ("failed", "boom")
+    assert restarted.tick() == []
+    clock.now = next_run
+    assert restarted.tick() == ["terminal-bench"]
+
+    # 间隔调短：不必等到按旧间隔算出的时间
+    shorter, _ = make(intervals={"terminal-bench": 600.0}, clock=clock, store=store, jitter=0.0)
+    assert shorter.entries["terminal-bench"].next_run == clock.now + timedelta(seconds=600)
+
+
+def test_overdue_entries_spread_after_restart():
+    names = [f"bench-{i}" for i in range(10)]
+    past = T0 - timedelta(days=1)
+    store = MemoryStore({n: ScheduleState(source=n, last_run_at=past, next_run_at=past) for n in names})
+    clock = FakeClock()
+    scheduler, _ = make({n: HOUR for n in names}, store=store, clock=clock)
+    runs = sorted(e.next_run for e in scheduler.entries.values())
+    assert all(T0 <= t <= T0 + timedelta(seconds=STARTUP_SPREAD) for t in runs)
+    assert len(set(runs)) == len(runs)
+    assert scheduler.tick() == []
+
+    # 逐秒推进，每个榜单在各自的时间提交一次
+    started = []
+    for _ in range(int(STARTUP_SPREAD) + 1):
+        started += scheduler.tick()
+        clock.advance(1)
+    assert sorted(started) == sorted(names)
+
+
+def test_fallback_to_last_fetch():
+    store = MemoryStore(fetched={"terminal-bench": T0 - timedelta(minutes=30)})
+    scheduler, _ = make(store=store, jitter=0.0)
+    assert scheduler.entries["terminal-bench"].next_run == T0 + timedelta(minutes=30)
+
+
+def test_only_one_process_claims():
+    clock = FakeClock()
+    store = MemoryStore()
+    a, submit_a = make(clock=clock, store=store, jitter=0.0)
+    b, submit_b = make(clock=clock, store=store, jitter=0.0)
+    clock.advance(STARTUP_SPREAD)
+    assert a.tick() + b.tick() == ["terminal-bench"]
+    assert len(submit_a.jobs) + len(submit_b.jobs) == 1
+    # 未认领的一方跟随记录的下次运行时间
+    assert b.entries["terminal-bench"].next_run == a.entries["terminal-bench"].next_run
+    assert b.entries["terminal-bench"].last_status == "running"
+
+
+def test_submit_error_recorded_and_retried():
+    clock = FakeClock()
+    store = MemoryStore()
+    calls = []
+
+    def submit(name):
+        calls.append(name)
+        if len(calls) == 1:
+            raise RuntimeError("queue unavailable")
+        return StubQueue()(name)
+
+    scheduler = Scheduler({"terminal-bench": HOUR}, jitter=0.0, clock=clock, submit=submit, store=store)
+    clock.advance(STARTUP_SPREAD)
+    assert scheduler.tick() == []
+    entry = scheduler.entries["terminal-bench"]
+    assert (entry.last_status, entry.last_error) == ("failed", "queue unavailable")
+    assert store.states["terminal-bench"].last_status == "failed"
+    assert entry.next_run == clock.now + timedelta(seconds=ERROR_RETRY)
+    clock.advance(ERROR_RETRY)
+    assert scheduler.tick() == ["terminal-bench"]
+
+
+@pytest.fixture
+def db_store():
+    for model in (ScheduleState, FetchState):
+        model.__table__.create(engine, checkfirst=True)
+    with SessionLocal() as session:
+        session.execute(delete(ScheduleState))
+        session.commit()
+    return ScheduleStore()
+
+
+def test_db_claim_is_conditional(db_store):
+    next_run = T0 + timedelta(hours=1)
+    assert db_store.claim("terminal-bench", T0, next_run)
+    # 下次运行时间未到：其他进程认领失败
+    assert not db_store.claim("terminal-bench", T0, next_run)
+    assert not db_store.claim("terminal-bench", T0 + timedelta(minutes=59), next_run)
+    assert db_store.claim("terminal-bench", next_run, next_run + timedelta(hours=1))
+
+    states, _ = db_store.load()
+    state = states["terminal-bench"]
+    assert (state.last_run_at, state.next_run_at, state.last_status) == (next_run, next_run + timedelta(hours=1), "running")
+
+
+def test_db_store_two_schedulers(db_store):
+    clock = FakeClock()
+    a, submit_a = make(clock=clock, store=db_store, jitter=0.0)
+    b, submit_b = make(clock=clock, store=db_store, jitter=0.0)
+    clock.advance(STARTUP_SPREAD)
+    assert a.tick() + b.tick() == ["terminal-bench"]
+    assert len(submit_a.jobs) == 1 and not submit_b.jobs
+    submit_a.finish(submit_a.jobs[0])
+    assert db_store.load()[0]["terminal-bench"].last_status == "ok"
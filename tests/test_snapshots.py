@@ -0,0 +1,86 @@
+"""增量存储：乱序补采、删除与重复行，重建结果与当天采集到的榜单一致"""
+from datetime import date
+import itertools
+
+import pytest
+
+from app.db import SessionLocal
+from app.models import BenchType
+from app.scrapers import SCRAPERS, register_scraper
+from app.services import snapshots
+from app.services.ingest import delete_by_date, run_ingest
+
+_names = (f"delta-test-{i}" for i in itertools.count())
+
+
+@pytest.fixture
+def board(monkeypatch):
+    """注册一个临时榜单，返回 (榜单名, 设置下次采集内容的函数)"""
+    monkeypatch.setenv("STORAGE_MODE", "delta")
+    name = next(_names)
+    current = {"items": []}
+
+    def fetch(url, timeout):
+        return [
+            {"bench": name, "rank": rank, "agent": agent, "model": f"m-{agent}", "org": "OpenAI", "score": score}
+            for rank, agent, score in current["items"]
+        ]
+
+    register_scraper(name, fetch, "http://stub")
+    yield name, lambda *items: current.update(items=items)
+    SCRAPERS.pop(name, None)
+
+
+def ingest(board, day, *items):
+    name, set_items = board
+    set_items(*items)
+    run_ingest(name, date(2025, 1, day), force=True)
+
+
+def rows(board, day):
+    with SessionLocal() as session:
+        return [(r.rank, r.agent, r.score) for r in snapshots.rebuild(session, BenchType(board[0]), date(2025, 1, day))]
+
+
+def test_out_of_order_ingest_keeps_later_snapshots(board):
+    ingest(board, 1, (1, "A", 90.0), (2, "B", 80.0))
+    ingest(board, 3, (1, "A", 90.0), (2, "B", 80.0), (3, "C", 70.0))
+    # 补采更早的日期：其后的增量快照仍是当天的完整榜单
+    ingest(board, 2, (1, "A", 91.0))
+    assert rows(board, 1) == [(1, "A", 90.0), (2, "B", 80.0)]
+    assert rows(board, 2) == [(1, "A", 91.0)]
+    assert rows(board, 3) == [(1, "A", 90.0), (2, "B", 80.0), (3, "C", 70.0)]
+
+    # 重新采集中间的日期、再删除它，其后的快照都不变
+    ingest(board, 2, (1, "B", 85.0), (2, "D", 60.0))
+    assert rows(board, 3) == [(1, "A", 90.0), (2, "B", 80.0), (3, "C", 70.0)]
+    delete_by_date(board[0], date(2025, 1, 2))
+    assert rows(board, 2) == [(1, "A", 90.0), (2, "B", 80.0)]
+    assert rows(board, 3) == [(1, "A", 90.0), (2, "B", 80.0), (3, "C", 70.0)]
+
+
+def test_backfill_before_removal(board):
+    ingest(board, 1, (1, "A", 90.0), (2, "B", 80.0))
+    ingest(board, 3, (1, "A", 90.0))
+    # 补采的这天仍有 B：其后一天需要记下 B 被移除
+    ingest(board, 2, (1, "A", 91.0), (2, "B", 80.0))
+    assert rows(board, 2) == [(1, "A", 91.0), (2, "B", 80.0)]
+    assert rows(board, 3) == [(1, "A", 90.0)]
+
+
+def test_duplicate_rows_merged_like_full_mode(board):
+    ingest(board, 1, (1, "A", 90.0), (2, "B", 80.0))
+    # 同一 (rank, agent, model) 出现两次：以最后一次为准，与全量模式一致
+    ingest(board, 2, (1, "A", 90.0), (2, "B", 80.0), (1, "A", 95.0))
+    assert rows(board, 2) == [(1, "A", 95.0), (2, "B", 80.0)]
+    ingest(board, 3, (1, "A", 95.0), (2, "B", 80.0))
+    assert rows(board, 3) == [(1, "A", 95.0), (2, "B", 80.0)]
+
+
+def test_duplicate_rows_across_batches(board, monkeypatch):
+    monkeypatch.setattr("app.services.ingest.BATCH_SIZE", 2)
+    ingest(board, 1, (1, "A", 90.0), (2, "B", 80.0), (3, "C", 70.0))
+    ingest(board, 2, (1, "A", 91.0), (2, "B", 80.0), (3, "C", 70.0), (1, "A", 92.0), (2, "B", 80.0))
+    assert rows(board, 2) == [(1, "A", 92.0), (2, "B", 80.0), (3, "C", 70.0)]
+    ingest(board, 3, (1, "A", 90.0), (2, "B", 80.0), (3, "C", 70.0), (2, "B", 81.0))
+    assert rows(board, 3) == [(1, "A", 90.0), (2, "B", 81.0), (3, "C", 70.0)]